@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Varias cuentas de Adobe
+Cada cuenta con sus propios navegadores y perfiles, límite de trabajos por
+hora y pausa propia si falla repetidamente
+"""
+
+import hashlib
+import re
+import time
+from collections import deque
+
+from retries import BREAKER_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+
+# Trabajos por hora de cada cuenta (0 = sin límite)
+ACCOUNT_JOBS_PER_HOUR = 0
+
+# Pausa máxima de una cuenta que sigue fallando
+ACCOUNT_MAX_COOLDOWN = 3600
+
+# Perfil de Chrome por defecto (igual que en automation.js)
+PROFILE_PREFIX = 'ChromeProfile'
+
+
+class Account:
+    """
+    Una cuenta de Adobe y su estado en el pool.
+
+    `active` son los trabajos que tiene en curso; `wait_time()` dice cuánto
+    falta para que pueda tomar otro según su límite por hora y su pausa por
+    fallos. Tras `threshold` fallos seguidos la cuenta se pausa `cooldown`
+    segundos (el doble cada vez que vuelve a fallar); el resto de cuentas
+    siguen trabajando. JobPool la usa bajo su Condition.
+    """
+
+    def __init__(self, email, password, sessions=None, jobs_per_hour=0,
+                 primary=False):
+        self.email = email
+        self.password = password
+        self.sessions = sessions
+        self.jobs_per_hour = jobs_per_hour
+        # La cuenta del login principal conserva los perfiles de siempre
+        self.primary = primary
+        self.active = 0
+        self.completed = 0
+        self.threshold = BREAKER_THRESHOLD
+        self.cooldown = BREAKER_COOLDOWN_SECONDS
+        self._starts = deque()
+        self._failures = 0
+        self._suspended_until = 0
+
+    @property
+    def tag(self):
+        """Identificador estable de la cuenta para el nombre del perfil"""
+        local = re.sub(r'[^A-Za-z0-9]+', '', self.email.split('@')[0])[:12]
+        digest = hashlib.sha1(self.email.lower().encode('utf-8')).hexdigest()[:6]
+        return f"{local}-{digest}"
+
+    def profile(self, slot, prefix=PROFILE_PREFIX):
+        """Perfil de Chrome del navegador `slot` de esta cuenta"""
+        base = prefix if self.primary else f"{prefix}-{self.tag}"
+        return base if slot == 0 else f"{base}-{slot}"
+
+    def session_count(self, default):
+        return max(1, int(self.sessions or default))
+
+    def load(self, default):
+        """Fracción de sus navegadores ocupados"""
+        return self.active / self.session_count(default)
+
+    def wait_time(self, now=None):
+        """Segundos hasta que puede tomar otro trabajo (0 = ya)"""
+        now = time.monotonic() if now is None else now
+        wait = max(0, self._suspended_until - now)
+        if self.jobs_per_hour:
+            while self._starts and now - self._starts[0] >= 3600:
+                self._starts.popleft()
+            if len(self._starts) >= self.jobs_per_hour:
+                wait = max(wait, self._starts[0] + 3600 - now)
+        return wait
+
+    def started(self):
+        self.active += 1
+        self._starts.append(time.monotonic())
+
+    def finished(self):
+        self.active = max(0, self.active - 1)
+
+    def record_success(self):
+        self.completed += 1
+        self._failures = 0
+        self._suspended_until = 0
+
+    def record_failure(self):
+        """Cuenta un fallo; devuelve los segundos de pausa si se suspende"""
+        self._failures += 1
+        if self._failures < self.threshold:
+            return 0
+        extra = self._failures - self.threshold
+        pause = min(self.cooldown * 2 ** extra, ACCOUNT_MAX_COOLDOWN)
+        self._suspended_until = time.monotonic() + pause
+        return pause
+
+
+class AccountPool:
+    """
+    Cuentas disponibles y reparto de los carriles del pool entre ellas.
+
+    La cuenta del login (`email`/`password` de settings) va siempre
+    primero; `settings['accounts']` añade las demás como dicts con
+    `email`, `password` y opcionalmente `sessions` (navegadores, por
+    defecto `concurrency`) y `jobs_per_hour`.
+    """
+
+    def __init__(self):
+        self.accounts = []
+
+    @classmethod
+    def from_settings(cls, settings):
+        pool = cls()
+        pool.update(settings)
+        return pool
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def update(self, settings):
+        """Relee las cuentas conservando el estado de las que siguen"""
+        existing = {account.email.lower(): account for account in self.accounts}
+        default_rate = int(settings.get('account_jobs_per_hour', ACCOUNT_JOBS_PER_HOUR) or 0)
+        entries = [{'email': settings.get('email', ''),
+                    'password': settings.get('password', ''), 'primary': True}]
+        entries += list(settings.get('accounts') or [])
+
+        accounts = []
+        seen = set()
+        for entry in entries:
+            email = (entry.get('email') or '').strip()
+            key = email.lower()
+            if key in seen or (not email and not entry.get('primary')):
+                continue
+            seen.add(key)
+            account = existing.get(key) or Account(email, entry.get('password', ''))
+            account.password = entry.get('password') or account.password
+            account.sessions = entry.get('sessions')
+            account.jobs_per_hour = int(entry.get('jobs_per_hour', default_rate) or 0)
+            account.primary = bool(entry.get('primary'))
+            account.threshold = max(1, int(settings.get('breaker_threshold',
+                                                        BREAKER_THRESHOLD)))
+            account.cooldown = settings.get('breaker_cooldown_seconds',
+                                            BREAKER_COOLDOWN_SECONDS)
+            accounts.append(account)
+        self.accounts = accounts
+
+    def lanes(self, default_sessions):
+        """
+        (cuenta, navegador) de cada carril remoto, alternando cuentas: con
+        pocos trabajos cada uno va a una cuenta distinta.
+        """
+        lanes = []
+        slot = 0
+        while True:
+            row = [(account, slot) for account in self.accounts
+                   if slot < account.session_count(default_sessions)]
+            if not row:
+                return lanes
+            lanes.extend(row)
+            slot += 1
@@ -6,14 +6,23 @@ Aplicación de escritorio con diseño moderno de Platzi
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import json
-import subprocess
+import getpass
+import queue
 import threading
 from pathlib import Path
-import base64
 import os
 import sys
 
+from config import (load_settings, save_settings, load_credentials,
+                    save_credentials, load_accounts, save_accounts)
+from job_pool import JobPool, DONE, FAILED, MAX_CONCURRENCY
+from job_store import JobStore
+from job_table import JobRows, JobTable
+from media_scan import MediaScanner, estimate_batch, format_duration
+from metrics import RunMetrics, describe_summary, list_runs
+from pipeline import Pipeline
+from scheduler import PRIORITIES
+
 # Configurar encoding UTF-8 para Windows (solo si hay consola)
 if sys.platform == 'win32':
     try:
@@ -35,11 +44,13 @@ PLATZI_BLUE_LIGHT = "#2e4a6d"
 PLATZI_WHITE = "#ffffff"
 PLATZI_GRAY = "#a6b6cc"
 
-# Configuración
-CONFIG_DIR = Path(__file__).parent / "config"
-CONFIG_DIR.mkdir(exist_ok=True)
-CONFIG_FILE = CONFIG_DIR / "settings.json"
-CREDENTIALS_FILE = CONFIG_DIR / "credentials.json"
+# Despacho de actualizaciones desde threads de trabajo
+UI_POLL_MS = 100
+MAX_LOG_LINES = 2000
+
+# Refresco de la vista de la cola y trabajos que muestra como mucho
+QUEUE_POLL_MS = 1000
+QUEUE_VIEW_LIMIT = 200
 
 
 class AdobePodcastApp:
@@ -56,10 +67,29 @@ class AdobePodcastApp:
         self.download_path_var = tk.StringVar()
         self.auto_download_var = tk.BooleanVar(value=True)
         self.keep_original_var = tk.BooleanVar(value=True)
+        self.remux_video_var = tk.BooleanVar(value=True)
         self.speech_level_var = tk.IntVar(value=70)
         self.background_level_var = tk.IntVar(value=10)
+        self.concurrency_var = tk.IntVar(value=1)
+        self.owner_var = tk.StringVar()
+        self.priority_var = tk.StringVar(value='normal')
+        self.cache_max_gb = 20
         self.logged_in = False
         self.selected_files = []
+        self.scanner = MediaScanner()
+        self.job_store = JobStore()
+        self.current_jobs = []
+        self.pool = None
+        self.active_pipeline = None
+        self._run_lock = threading.Lock()
+        self._queue_jobs = []
+        self.ui_queue = queue.Queue()
+        self._progress_job = None
+        # Filas de la tabla de trabajos y cambios pendientes de aplicar
+        # (agrupados por archivo: solo cuenta el último de cada ciclo)
+        self.job_rows = JobRows()
+        self._row_updates = {}
+        self._row_lock = threading.Lock()
         
         # Cargar configuración
         self.load_config()
@@ -73,6 +103,12 @@ class AdobePodcastApp:
         
         # Centrar ventana
         self.center_window()
+        
+        # Cerrar los navegadores de los workers al salir
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Atender las actualizaciones de la interfaz pedidas por los threads
+        self.root.after(UI_POLL_MS, self.process_ui_queue)
     
     def setup_styles(self):
         """Configura los estilos personalizados"""
@@ -243,9 +279,15 @@ Esta aplicación NO comparte tus credenciales."""
         user_card = self.create_card(self.content_frame,
                                     f"👤 Sesión: {self.email_var.get()}")
         
-        logout_btn = self.create_button(user_card, "🚪 Cerrar Sesión",
+        user_buttons = tk.Frame(user_card, bg=PLATZI_DARK_2)
+        user_buttons.pack(pady=10)
+        
+        self.create_button(user_buttons, "👥 Cuentas", self.show_accounts,
+                           secondary=True).pack(side='left', padx=5)
+        
+        logout_btn = self.create_button(user_buttons, "🚪 Cerrar Sesión",
                                        self.do_logout, secondary=True)
-        logout_btn.pack(pady=10)
+        logout_btn.pack(side='left', padx=5)
         
         # Configuración
         config_card = self.create_card(self.content_frame,
@@ -282,9 +324,51 @@ Esta aplicación NO comparte tus credenciales."""
                       selectcolor=PLATZI_BLUE,
                       font=('Segoe UI', 10),
                       activebackground=PLATZI_DARK_2,
+                      activeforeground=PLATZI_WHITE).pack(anchor='w',
+                                                         pady=(0, 5))
+        
+        tk.Checkbutton(config_card, text="Reinsertar el audio en los videos",
+                      variable=self.remux_video_var,
+                      bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                      selectcolor=PLATZI_BLUE,
+                      font=('Segoe UI', 10),
+                      activebackground=PLATZI_DARK_2,
                       activeforeground=PLATZI_WHITE).pack(anchor='w',
                                                          pady=(0, 15))
         
+        # Sesiones en paralelo
+        concurrency_frame = tk.Frame(config_card, bg=PLATZI_DARK_2)
+        concurrency_frame.pack(fill='x', pady=(0, 15))
+        
+        tk.Label(concurrency_frame, text="⚡ Sesiones en paralelo:",
+                bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                font=('Segoe UI', 10)).pack(side='left')
+        
+        tk.Spinbox(concurrency_frame, from_=1, to=MAX_CONCURRENCY,
+                  textvariable=self.concurrency_var, width=5,
+                  bg=PLATZI_WHITE, fg=PLATZI_DARK,
+                  font=('Segoe UI', 10)).pack(side='left', padx=(10, 0))
+        
+        # Usuario y prioridad del lote en la cola compartida
+        batch_frame = tk.Frame(config_card, bg=PLATZI_DARK_2)
+        batch_frame.pack(fill='x', pady=(0, 15))
+        
+        tk.Label(batch_frame, text="🧑 Usuario:",
+                bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                font=('Segoe UI', 10)).pack(side='left')
+        
+        tk.Entry(batch_frame, textvariable=self.owner_var, width=14,
+                bg=PLATZI_WHITE, fg=PLATZI_DARK,
+                font=('Segoe UI', 10)).pack(side='left', padx=(10, 20))
+        
+        tk.Label(batch_frame, text="🚩 Prioridad:",
+                bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                font=('Segoe UI', 10)).pack(side='left')
+        
+        ttk.Combobox(batch_frame, textvariable=self.priority_var,
+                     values=list(PRIORITIES), state='readonly',
+                     width=10).pack(side='left', padx=(10, 0))
+        
         # Ajustes de Adobe Podcast
         tk.Label(config_card, text="🎚️ Ajustes de Adobe Podcast",
                 bg=PLATZI_DARK_2, fg=PLATZI_GREEN,
@@ -354,18 +438,50 @@ Esta aplicación NO comparte tus credenciales."""
                                         self.select_files)
         select_btn.pack(pady=10)
         
-        # Lista de archivos
-        self.files_listbox = tk.Listbox(upload_card, height=6,
+        # Tabla de archivos y trabajos (las filas sobreviven a esta pantalla)
+        self.job_table = JobTable(upload_card, self.job_rows,
+                                  bg=PLATZI_DARK_2, fg=PLATZI_GRAY)
+        self.job_table.pack(fill='both', expand=True, pady=(10, 10))
+        
+        # Progreso del lote
+        self.progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(upload_card, variable=self.progress_var,
+                        maximum=100).pack(fill='x', pady=(0, 5))
+        self.progress_label = tk.Label(upload_card, text="",
+                                       bg=PLATZI_DARK_2, fg=PLATZI_GRAY,
+                                       font=('Segoe UI', 9))
+        self.progress_label.pack(anchor='w')
+        
+        # Cola de trabajos en espera (orden real de entrega)
+        tk.Label(upload_card, text="⏳ Cola:",
+                bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                font=('Segoe UI', 10)).pack(anchor='w', pady=(10, 5))
+        
+        self.queue_listbox = tk.Listbox(upload_card, height=6,
                                         bg=PLATZI_WHITE, fg=PLATZI_DARK,
-                                        font=('Segoe UI', 9),
-                                        selectmode='extended')
-        self.files_listbox.pack(fill='both', expand=True, pady=(10, 10))
+                                        font=('Consolas', 9),
+                                        selectmode='browse',
+                                        exportselection=False)
+        self.queue_listbox.pack(fill='both', expand=True)
+        
+        queue_buttons = tk.Frame(upload_card, bg=PLATZI_DARK_2)
+        queue_buttons.pack(pady=(5, 0))
+        for text, command in (("⬆ Subir", lambda: self.move_queued(-1)),
+                              ("⬇ Bajar", lambda: self.move_queued(1)),
+                              ("⏸ Retener/Soltar", self.toggle_hold),
+                              ("⏯ Pausar cola", self.toggle_pause)):
+            self.create_button(queue_buttons, text, command,
+                               secondary=True, small=True).pack(side='left', padx=3)
         
         # Botón de procesar
         process_btn = self.create_button(upload_card, "🎬 Procesar Videos",
                                          self.process_videos)
         process_btn.pack(pady=10)
         
+        metrics_btn = self.create_button(upload_card, "📈 Métricas",
+                                         self.show_metrics, secondary=True)
+        metrics_btn.pack(pady=(0, 10))
+        
         # Log de progreso
         log_card = self.create_card(self.content_frame, "📊 Registro")
         
@@ -376,6 +492,10 @@ Esta aplicación NO comparte tus credenciales."""
                                                   wrap='word')
         self.log_text.pack(fill='both', expand=True, pady=10)
         self.log(">> Sistema iniciado correctamente")
+        
+        # Ofrecer reanudar un lote interrumpido
+        self.root.after(200, self.offer_resume)
+        self.root.after(QUEUE_POLL_MS, self.refresh_queue)
     
     def create_card(self, parent, title):
         """Crea un card con estilo Platzi"""
@@ -423,66 +543,50 @@ Esta aplicación NO comparte tus credenciales."""
     
     def load_config(self):
         """Carga la configuración"""
-        if CONFIG_FILE.exists():
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                self.download_path_var.set(
-                    config.get("download_path",
-                              str(Path.home() / "Downloads" / "AdobePodcast")))
-                self.auto_download_var.set(config.get("auto_download", True))
-                self.keep_original_var.set(config.get("keep_original", True))
-                self.speech_level_var.set(config.get("speech_level", 70))
-                self.background_level_var.set(config.get("background_level", 10))
-        else:
-            self.download_path_var.set(
-                str(Path.home() / "Downloads" / "AdobePodcast"))
+        config = load_settings()
+        self.download_path_var.set(config["download_path"])
+        self.auto_download_var.set(config["auto_download"])
+        self.keep_original_var.set(config["keep_original"])
+        self.remux_video_var.set(config["remux_video"])
+        self.speech_level_var.set(config["speech_level"])
+        self.background_level_var.set(config["background_level"])
+        self.concurrency_var.set(config["concurrency"])
+        self.owner_var.set(config["owner"] or getpass.getuser())
+        self.priority_var.set(config["priority"])
+        self.cache_max_gb = config["cache_max_gb"]
     
     def save_config(self):
         """Guarda la configuración"""
-        config = {
+        config = load_settings()
+        config.update({
             "download_path": self.download_path_var.get(),
             "auto_download": self.auto_download_var.get(),
             "keep_original": self.keep_original_var.get(),
+            "remux_video": self.remux_video_var.get(),
             "speech_level": self.speech_level_var.get(),
-            "background_level": self.background_level_var.get()
-        }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+            "background_level": self.background_level_var.get(),
+            "concurrency": self.concurrency_var.get(),
+            "owner": self.owner_var.get(),
+            "priority": self.priority_var.get(),
+            "cache_max_gb": self.cache_max_gb
+        })
+        save_settings(config)
         messagebox.showinfo("Exito", "Configuracion guardada")
         self.log(">> Configuracion guardada")
         self.log(f">> Speech: {self.speech_level_var.get()}%, Background: {self.background_level_var.get()}%")
     
     def load_credentials(self):
         """Carga las credenciales guardadas"""
-        if CREDENTIALS_FILE.exists():
-            with open(CREDENTIALS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if data.get("remember"):
-                    email_b64 = data.get("email", "")
-                    password_b64 = data.get("password", "")
-                    if email_b64:
-                        self.email_var.set(
-                            base64.b64decode(email_b64).decode('utf-8'))
-                    if password_b64:
-                        self.password_var.set(
-                            base64.b64decode(password_b64).decode('utf-8'))
-                    self.remember_var.set(True)
+        email, password = load_credentials()
+        if email or password:
+            self.email_var.set(email)
+            self.password_var.set(password)
+            self.remember_var.set(True)
     
     def save_credentials(self):
         """Guarda las credenciales"""
-        if self.remember_var.get():
-            data = {
-                "email": base64.b64encode(
-                    self.email_var.get().encode('utf-8')).decode('utf-8'),
-                "password": base64.b64encode(
-                    self.password_var.get().encode('utf-8')).decode('utf-8'),
-                "remember": True
-            }
-        else:
-            data = {"email": "", "password": "", "remember": False}
-        
-        with open(CREDENTIALS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        save_credentials(self.email_var.get(), self.password_var.get(),
+                         self.remember_var.get())
     
     def do_login(self):
         """Realiza el login"""
@@ -502,12 +606,34 @@ Esta aplicación NO comparte tus credenciales."""
         
         # Mostrar pantalla principal
         self.show_main_screen()
+        
+        # Abrir navegadores y sesión en segundo plano para el primer lote
+        self.pool = JobPool(self.current_settings(),
+                            concurrency=self.concurrency_var.get(),
+                            on_log=lambda job, message: self.log(message))
+        self.pool.warm_up()
     
     def do_logout(self):
         """Cierra sesión"""
         self.logged_in = False
+        self.shutdown_pool()
         self.show_login_screen()
     
+    def shutdown_pool(self):
+        """Cierra los workers y sus navegadores en segundo plano"""
+        if self.pool:
+            pool, self.pool = self.pool, None
+            threading.Thread(target=pool.shutdown, daemon=True).start()
+    
+    def on_close(self):
+        """Cierra la aplicación deteniendo los workers"""
+        # La ventana se cierra ya; el hilo (no daemon) hace que el proceso
+        # espere a que los navegadores se cierren antes de salir
+        if self.pool:
+            pool, self.pool = self.pool, None
+            threading.Thread(target=pool.shutdown).start()
+        self.root.destroy()
+    
     def browse_folder(self):
         """Abre diálogo para seleccionar carpeta"""
         folder = filedialog.askdirectory(
@@ -529,19 +655,111 @@ Esta aplicación NO comparte tus credenciales."""
         
         if files:
             self.selected_files = list(files)
-            self.files_listbox.delete(0, tk.END)
-            for file in self.selected_files:
-                filename = Path(file).name
-                size_mb = Path(file).stat().st_size / (1024 * 1024)
-                self.files_listbox.insert(
-                    tk.END, f"{filename} ({size_mb:.2f} MB)")
+            self.show_files()
             self.log(f">> {len(self.selected_files)} archivo(s) seleccionado(s)")
     
+    def show_files(self):
+        """
+        Muestra los archivos seleccionados en la tabla.
+
+        El tamaño y la duración se leen en segundo plano (en recursos de red
+        cada archivo puede tardar) y cada fila se completa al llegar su dato.
+        """
+        self.job_rows.set_files(self.selected_files)
+        self.scanner.scan(
+            self.selected_files,
+            on_result=lambda index, info: self.call_in_ui(
+                self.show_file_info, index, info),
+            on_done=lambda infos: self.call_in_ui(self.show_estimate, infos))
+    
+    def show_file_info(self, index, info):
+        """Completa la fila del archivo con su tamaño y duración"""
+        self.job_rows.scanned(info)
+    
+    def show_estimate(self, infos):
+        """Resume el volumen y el tiempo estimado del lote seleccionado"""
+        if [info['path'] for info in infos] != list(self.selected_files):
+            return
+        concurrency = self.concurrency_var.get()
+        estimate = estimate_batch(infos, concurrency)
+        summary = (f"{estimate['files']} archivo(s) · "
+                   f"{format_duration(estimate['duration'])} de audio · "
+                   f"{estimate['upload_bytes'] / (1024 * 1024):.0f} MB a subir · "
+                   f"~{format_duration(estimate['seconds'])} con "
+                   f"{concurrency} sesión(es)")
+        self.log(f">> Estimación: {summary}")
+        if self.progress_label.winfo_exists():
+            self.progress_label.config(text=summary)
+    
+    def offer_resume(self):
+        """Pregunta si se reanuda el lote que quedó a medias"""
+        pending = [entry for entry in self.job_store.unfinished()
+                   if Path(entry['source']).exists()]
+        if not pending:
+            return
+        
+        if not messagebox.askyesno(
+                "Reanudar",
+                f"Hay {len(pending)} archivo(s) sin terminar de una sesión "
+                "anterior.\n¿Deseas reanudar su procesamiento?"):
+            self.job_store.clear()
+            return
+        
+        self.selected_files = [entry['source'] for entry in pending]
+        self.show_files()
+        self.log(f">> Reanudando {len(pending)} archivo(s) pendiente(s)")
+        self.start_processing(pending)
+    
     def log(self, message):
-        """Añade mensaje al log"""
-        if hasattr(self, 'log_text'):
-            self.log_text.insert(tk.END, f"{message}\n")
+        """Añade mensaje al log (seguro desde cualquier thread)"""
+        self.ui_queue.put(('log', message))
+    
+    def call_in_ui(self, func, *args):
+        """Ejecuta `func(*args)` en el thread de Tk"""
+        self.ui_queue.put(('call', (func, args)))
+    
+    def process_ui_queue(self):
+        """
+        Aplica las actualizaciones pendientes desde el main loop de Tk.
+
+        Las líneas de log de un mismo ciclo se insertan de una sola vez y el
+        registro se recorta a MAX_LOG_LINES para que no crezca sin límite.
+        """
+        lines = []
+        calls = []
+        try:
+            while True:
+                kind, payload = self.ui_queue.get_nowait()
+                if kind == 'log':
+                    lines.append(payload)
+                else:
+                    calls.append(payload)
+        except queue.Empty:
+            pass
+        
+        if lines and hasattr(self, 'log_text') and self.log_text.winfo_exists():
+            self.log_text.insert(tk.END, "\n".join(lines[-MAX_LOG_LINES:]) + "\n")
+            total = int(self.log_text.index('end-1c').split('.')[0])
+            if total > MAX_LOG_LINES:
+                self.log_text.delete('1.0', f'{total - MAX_LOG_LINES}.0')
             self.log_text.see(tk.END)
+        
+        job, self._progress_job = self._progress_job, None
+        if job:
+            self.update_progress(job)
+        
+        with self._row_lock:
+            updates, self._row_updates = self._row_updates, {}
+        for job in updates.values():
+            self.job_rows.update_job(job)
+        
+        for func, args in calls:
+            try:
+                func(*args)
+            except Exception as e:
+                self.log(f">> Error en la interfaz: {e}")
+        
+        self.root.after(UI_POLL_MS, self.process_ui_queue)
     
     def process_videos(self):
         """Procesa los videos seleccionados"""
@@ -550,64 +768,329 @@ Esta aplicación NO comparte tus credenciales."""
                                   "Por favor selecciona videos primero")
             return
         
-        # Ejecutar en thread separado
-        thread = threading.Thread(target=self.run_automation)
+        self.start_processing()
+    
+    def start_processing(self, resume_entries=None):
+        """Lanza el procesamiento en un thread separado"""
+        # Las variables de Tk solo se leen desde el thread principal
+        pipeline = self.build_pipeline()
+        files = list(self.selected_files)
+        thread = threading.Thread(target=self.run_automation,
+                                  args=(pipeline, files, resume_entries))
         thread.daemon = True
         thread.start()
     
-    def run_automation(self):
-        """Ejecuta el script de automatización"""
+    def current_settings(self):
+        """Configuración actual del pipeline (incluye credenciales)"""
+        # Las claves sin control en la ventana (reintentos, mejora local...)
+        # se toman de settings.json
+        settings = load_settings()
+        settings.update({
+            "email": self.email_var.get(),
+            "password": self.password_var.get(),
+            "download_path": self.download_path_var.get(),
+            "auto_download": self.auto_download_var.get(),
+            "keep_original": self.keep_original_var.get(),
+            "remux_video": self.remux_video_var.get(),
+            "speech_level": self.speech_level_var.get(),
+            "background_level": self.background_level_var.get(),
+            "concurrency": self.concurrency_var.get(),
+            "owner": self.owner_var.get().strip(),
+            "priority": self.priority_var.get(),
+            "accounts": load_accounts(),
+            "cache_max_gb": self.cache_max_gb
+        })
+        return settings
+    
+    def build_pipeline(self):
+        """Crea el pipeline con la configuración actual"""
+        return Pipeline(self.current_settings(), on_log=self.log,
+                        on_status=self.on_job_status,
+                        on_progress=self.on_job_progress,
+                        store=self.job_store, pool=self.pool)
+    
+    def show_accounts(self):
+        """Ventana de cuentas adicionales entre las que se reparten los trabajos"""
+        accounts = load_accounts()
+        
+        window = tk.Toplevel(self.root)
+        window.title("👥 Cuentas de Adobe")
+        window.configure(bg=PLATZI_DARK_2)
+        window.geometry("560x420")
+        
+        tk.Label(window, text=f"Principal: {self.email_var.get()}  ·  "
+                              "los trabajos se reparten entre todas",
+                 bg=PLATZI_DARK_2, fg=PLATZI_GRAY,
+                 font=('Segoe UI', 9)).pack(anchor='w', padx=15, pady=(15, 5))
+        
+        columns = ('email', 'sessions', 'rate')
+        headings = ('Email', 'Sesiones', 'Trabajos/hora')
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=8)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=300 if column == 'email' else 100,
+                        anchor='w' if column == 'email' else 'e')
+        tree.pack(fill='both', expand=True, padx=15, pady=5)
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            for entry in accounts:
+                tree.insert('', tk.END, values=(
+                    entry['email'],
+                    entry.get('sessions') or self.concurrency_var.get(),
+                    entry.get('jobs_per_hour') or "sin límite"))
+        
+        form = tk.Frame(window, bg=PLATZI_DARK_2)
+        form.pack(fill='x', padx=15, pady=5)
+        email_var = tk.StringVar()
+        password_var = tk.StringVar()
+        sessions_var = tk.IntVar(value=self.concurrency_var.get())
+        rate_var = tk.IntVar(value=0)
+        for row, (label, widget) in enumerate((
+                ("Email:", tk.Entry(form, textvariable=email_var)),
+                ("Contraseña:", tk.Entry(form, textvariable=password_var, show='•')),
+                ("Sesiones:", tk.Spinbox(form, from_=1, to=MAX_CONCURRENCY,
+                                         textvariable=sessions_var, width=5)),
+                ("Trabajos/hora (0 = sin límite):",
+                 tk.Spinbox(form, from_=0, to=1000, textvariable=rate_var, width=5)))):
+            tk.Label(form, text=label, bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                     font=('Segoe UI', 10)).grid(row=row, column=0, sticky='w', pady=2)
+            widget.grid(row=row, column=1, sticky='we', padx=(10, 0), pady=2)
+        form.columnconfigure(1, weight=1)
+        
+        def add():
+            email = email_var.get().strip()
+            if not email or not password_var.get():
+                messagebox.showerror("Error", "Ingresa email y contraseña",
+                                     parent=window)
+                return
+            emails = [entry['email'].lower() for entry in accounts]
+            if email.lower() in emails + [self.email_var.get().lower()]:
+                messagebox.showerror("Error", "Esa cuenta ya está en la lista",
+                                     parent=window)
+                return
+            accounts.append({"email": email, "password": password_var.get(),
+                             "sessions": sessions_var.get(),
+                             "jobs_per_hour": rate_var.get()})
+            save_accounts(accounts)
+            email_var.set("")
+            password_var.set("")
+            refresh()
+            self.log(f">> Cuenta añadida: {email} (se usará en el próximo lote)")
+        
+        def remove():
+            selection = tree.selection()
+            if not selection:
+                return
+            removed = accounts.pop(tree.index(selection[0]))
+            save_accounts(accounts)
+            refresh()
+            self.log(f">> Cuenta eliminada: {removed['email']}")
+        
+        buttons = tk.Frame(window, bg=PLATZI_DARK_2)
+        buttons.pack(pady=10)
+        self.create_button(buttons, "➕ Añadir", add,
+                           small=True).pack(side='left', padx=5)
+        self.create_button(buttons, "🗑️ Eliminar", remove, secondary=True,
+                           small=True).pack(side='left', padx=5)
+        refresh()
+    
+    def show_metrics(self):
+        """Ventana con el resumen por fase de un lote y su exportación"""
+        runs = list_runs()
+        if not runs:
+            messagebox.showinfo("Métricas", "Aún no hay lotes registrados")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("📈 Métricas de ejecución")
+        window.configure(bg=PLATZI_DARK_2)
+        window.geometry("640x400")
+        
+        run_var = tk.StringVar(value=runs[0])
+        ttk.Combobox(window, textvariable=run_var, values=runs,
+                     state='readonly').pack(fill='x', padx=15, pady=(15, 5))
+        
+        totals = tk.Label(window, text="", bg=PLATZI_DARK_2, fg=PLATZI_WHITE,
+                          font=('Segoe UI', 10), justify='left')
+        totals.pack(anchor='w', padx=15, pady=5)
+        
+        columns = ('phase', 'count', 'mean', 'p50', 'p95', 'max')
+        headings = ('Fase', 'N', 'Media (s)', 'p50 (s)', 'p95 (s)', 'Máx (s)')
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=8)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=140 if column == 'phase' else 80,
+                        anchor='w' if column == 'phase' else 'e')
+        tree.pack(fill='both', expand=True, padx=15, pady=5)
+        
+        def refresh(*_):
+            summary = RunMetrics(run_var.get()).summary()
+            tree.delete(*tree.get_children())
+            for phase, stats in summary['phases'].items():
+                tree.insert('', tk.END, values=(
+                    phase, stats['count'], f"{stats['mean']:.1f}",
+                    f"{stats['p50']:.1f}", f"{stats['p95']:.1f}",
+                    f"{stats['max']:.1f}"))
+            totals.config(text="\n".join(describe_summary(summary)[:2]))
+        
+        def export(kind):
+            path = filedialog.asksaveasfilename(
+                parent=window, defaultextension=f".{kind}",
+                initialfile=f"{run_var.get()}.{kind}",
+                filetypes=[(kind.upper(), f"*.{kind}")])
+            if not path:
+                return
+            run = RunMetrics(run_var.get())
+            if kind == 'csv':
+                run.export_csv(path)
+            else:
+                run.export_json(path)
+            self.log(f">> Métricas exportadas: {path}")
+        
+        buttons = tk.Frame(window, bg=PLATZI_DARK_2)
+        buttons.pack(pady=10)
+        self.create_button(buttons, "📄 Exportar CSV", lambda: export('csv'),
+                           secondary=True).pack(side='left', padx=5)
+        self.create_button(buttons, "🧾 Exportar JSON", lambda: export('json'),
+                           secondary=True).pack(side='left', padx=5)
+        
+        run_var.trace_add('write', refresh)
+        refresh()
+    
+    def refresh_queue(self):
+        """Muestra los trabajos en espera conservando la selección"""
+        if not hasattr(self, 'queue_listbox') or not self.queue_listbox.winfo_exists():
+            return
+        selected = self.selected_queued()
+        jobs, total, paused = (self.pool.queue_view(QUEUE_VIEW_LIMIT)
+                               if self.pool else ([], 0, False))
+        names = {value: name for name, value in PRIORITIES.items()}
+        lines = [f"{'⏸ ' if job.held else ''}{job.name} · {job.owner} · "
+                 f"{names.get(job.priority, job.priority)}" for job in jobs]
+        hidden = total - len(jobs)
+        if hidden > 0:
+            lines.append(f"… y {hidden} más")
+            jobs = jobs + [None]
+        if paused:
+            lines.insert(0, "— cola en pausa —")
+            jobs = [None] + jobs
+        if lines != list(self.queue_listbox.get(0, tk.END)):
+            self.queue_listbox.delete(0, tk.END)
+            self.queue_listbox.insert(tk.END, *lines)
+        self._queue_jobs = jobs
+        if selected in jobs:
+            index = jobs.index(selected)
+            self.queue_listbox.selection_clear(0, tk.END)
+            self.queue_listbox.selection_set(index)
+            self.queue_listbox.see(index)
+        # Tiempo transcurrido de las filas en curso
+        self.job_table.refresh_visible()
+        self.root.after(QUEUE_POLL_MS, self.refresh_queue)
+    
+    def selected_queued(self):
+        """Trabajo seleccionado en la vista de la cola, o None"""
+        selection = self.queue_listbox.curselection()
+        if not selection or selection[0] >= len(self._queue_jobs):
+            return None
+        return self._queue_jobs[selection[0]]
+    
+    def move_queued(self, offset):
+        """Adelanta o retrasa el trabajo seleccionado dentro de su usuario"""
+        job = self.selected_queued()
+        if job and self.pool and not self.pool.move(job, offset):
+            self.log(f">> [{job.name}] no se puede mover más "
+                     "(solo entre trabajos del mismo usuario y prioridad)")
+    
+    def toggle_hold(self):
+        """Retiene o suelta el trabajo seleccionado"""
+        job = self.selected_queued()
+        if job and self.pool:
+            self.pool.hold(job, not job.held)
+            self.log(f">> [{job.name}] " + ("retenido" if job.held else "liberado"))
+    
+    def toggle_pause(self):
+        """Pausa o reanuda la entrega de trabajos de la cola"""
+        if self.pool:
+            self.pool.pause(not self.pool.paused)
+    
+    def on_job_status(self, job):
+        """Registra los cambios de estado de cada trabajo"""
+        if job.status == DONE:
+            elapsed = f" en {job.elapsed:.0f}s" if job.elapsed else ""
+            phases = ", ".join(f"{phase} {seconds:.0f}s"
+                               for phase, seconds in job.timings.items())
+            output = f" → {Path(job.output_path).name}" if job.output_path else ""
+            self.log(f">> [{job.name}] completado{elapsed}"
+                     + (f" ({phases})" if phases else "") + output)
+        elif job.status == FAILED:
+            self.log(f">> [{job.name}] error: {job.error}")
+        self.on_job_progress(job)
+    
+    def on_job_progress(self, job):
+        """Pide actualizar la barra de progreso y la fila (se agrupa por ciclo)"""
+        self._progress_job = job
+        if job.parent is None:
+            with self._row_lock:
+                self._row_updates[job.source] = job
+    
+    def update_progress(self, job):
+        """Actualiza la barra de progreso del lote"""
+        jobs = self.current_jobs
+        if not jobs or not hasattr(self, 'progress_var'):
+            return
+        if not self.progress_label.winfo_exists():
+            return
+        done = sum(1 for j in jobs if j.status in (DONE, FAILED))
+        self.progress_var.set(sum(j.percent if j.status != FAILED else 100
+                                  for j in jobs) / len(jobs))
+        self.progress_label.config(
+            text=f"{done}/{len(jobs)} archivo(s) · {job.name}: {job.status} "
+                 f"{job.percent:.0f}%")
+    
+    def run_automation(self, pipeline, files, resume_entries=None):
+        """Ejecuta el pipeline de procesamiento sobre los archivos"""
         try:
             self.log(">> Iniciando procesamiento...")
             
-            # Preparar argumentos
-            files_json = json.dumps(self.selected_files)
-            script_path = Path(__file__).parent / "automation.js"
-            
-            cmd = [
-                'node',
-                str(script_path),
-                '--email', self.email_var.get(),
-                '--password', self.password_var.get(),
-                '--files', files_json,
-                '--download-path', self.download_path_var.get(),
-                '--speech-level', str(self.speech_level_var.get()),
-                '--background-level', str(self.background_level_var.get())
-            ]
-            
-            # Ejecutar con encoding UTF-8
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                encoding='utf-8',
-                errors='replace',  # Reemplazar caracteres no decodificables
-                bufsize=1
-            )
-            
-            # Leer salida
-            for line in process.stdout:
-                line = line.strip()
-                if line:
-                    # Limpiar timestamp si existe
-                    if ']' in line:
-                        line = line.split(']', 1)[-1].strip()
-                    self.log(line)
+            # Consultar caché y extraer audio de los videos
+            if resume_entries:
+                jobs = [pipeline.resume_job(entry) for entry in resume_entries]
+            else:
+                jobs = pipeline.prepare_jobs(files)
             
-            process.wait()
+            # Con un lote en marcha los trabajos se suman a su cola y se
+            # reparten con los demás según usuario y prioridad
+            active = self.active_pipeline
+            if active is not None and active.add(jobs):
+                self.current_jobs = self.current_jobs + jobs
+                success = active.wait_jobs(jobs)
+            else:
+                # Un solo lote a la vez usa el pool
+                with self._run_lock:
+                    self.current_jobs = jobs
+                    self.active_pipeline = pipeline
+                    try:
+                        success = pipeline.run(jobs)
+                    finally:
+                        self.active_pipeline = None
+            # Los trabajos terminados ya no hacen falta para reanudar
+            self.job_store.compact()
             
-            if process.returncode == 0:
+            if success:
                 self.log(">> Procesamiento completado!")
-                messagebox.showinfo("Exito",
-                                   "Videos procesados correctamente")
+                self.call_in_ui(messagebox.showinfo, "Exito",
+                                "Videos procesados correctamente")
             else:
-                error = process.stderr.read()
-                self.log(f">> Error: {error}")
-                messagebox.showerror("Error", f"Error: {error}")
+                failed = [job for job in jobs if job.status == FAILED]
+                self.log(f">> {len(failed)} archivo(s) con error")
+                self.call_in_ui(
+                    messagebox.showerror, "Error",
+                    "Error en: " + ", ".join(job.name for job in failed))
         
         except Exception as e:
             self.log(f">> Error: {str(e)}")
-            messagebox.showerror("Error", str(e))
+            self.call_in_ui(messagebox.showerror, "Error", str(e))
 
 
 def main():
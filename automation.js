@@ -5,7 +5,9 @@
 
 const puppeteer = require('puppeteer');
 const fs = require('fs');
+const os = require('os');
 const path = require('path');
+const readline = require('readline');
 const yargs = require('yargs/yargs');
 const { hideBin } = require('yargs/helpers');
 
@@ -19,15 +21,20 @@ const argv = yargs(hideBin(process.argv))
     })
     .option('password', {
         alias: 'p',
-        description: 'Contraseña de Adobe',
-        type: 'string',
-        demandOption: true
+        description: 'Contraseña de Adobe (mejor en la variable ADOBE_PASSWORD: ' +
+                     'los argumentos son visibles en la lista de procesos)',
+        type: 'string'
     })
-    .option('files', {
-        alias: 'f',
-        description: 'Archivos a procesar (JSON array)',
-        type: 'string',
-        demandOption: true
+    .option('manifest', {
+        alias: 'm',
+        description: 'Trabajos a procesar, uno por línea (ruta o JSON como el ' +
+                     'comando "job" de --serve); "-" lee de stdin a medida que llegan',
+        type: 'string'
+    })
+    .option('serve', {
+        description: 'Mantener el navegador abierto y leer trabajos JSON por stdin',
+        type: 'boolean',
+        default: false
     })
     .option('download-path', {
         alias: 'd',
@@ -45,29 +52,160 @@ const argv = yargs(hideBin(process.argv))
         type: 'number',
         default: 10
     })
+    .option('url', {
+        description: 'URL de la página de mejora (permite usar una página local de pruebas)',
+        type: 'string',
+        default: 'https://podcast.adobe.com/enhance'
+    })
+    .option('profile', {
+        description: 'Nombre del perfil de Chrome (uno por worker en paralelo)',
+        type: 'string',
+        default: 'ChromeProfile'
+    })
+    .option('job-id', {
+        description: 'Identificador del trabajo incluido en cada evento JSON',
+        type: 'string',
+        default: ''
+    })
+    .option('headless', {
+        description: 'Ejecutar Chrome sin ventana',
+        type: 'boolean',
+        default: false
+    })
+    .check(args => {
+        if (!args.serve && !args.manifest) {
+            throw new Error('Se requiere --manifest o --serve');
+        }
+        if (!args.password && !process.env.ADOBE_PASSWORD) {
+            throw new Error('Falta la contraseña: define ADOBE_PASSWORD');
+        }
+        return true;
+    })
     .help()
     .alias('help', 'h')
     .argv;
 
 // Constantes
-const ADOBE_PODCAST_URL = 'https://podcast.adobe.com/enhance';
+const ADOBE_PODCAST_URL = argv.url;
 const LOGIN_TIMEOUT = 60000;
 const UPLOAD_TIMEOUT = 300000;
-const PROCESSING_TIMEOUT = 600000;
+const PROCESSING_TIMEOUT = 900000;
+const DOWNLOAD_TIMEOUT = 300000;
+const SETTLE_TIMEOUT = 10000;
+
+/**
+ * Se ejecuta dentro de la página con waitForFunction({ polling: 'mutation' }).
+ * Devuelve un valor truthy cuando el procesamiento terminó (sliders Speech y
+ * Background + botón Download habilitado) o cuando la página muestra un error.
+ */
+function detectProcessingState() {
+    const sliders = Array.from(document.querySelectorAll('input[type="range"]'));
+    const sliderLabel = s => ((s.parentElement?.textContent || '') + ' ' +
+                              (s.getAttribute('aria-label') || '')).toLowerCase();
+    const hasSpeech = sliders.some(s => /speech|voz/.test(sliderLabel(s)));
+    const hasBackground = sliders.some(s => /background|fondo/.test(sliderLabel(s)));
+
+    const downloadBtn = Array.from(document.querySelectorAll('button, a, div[role="button"], span[role="button"]'))
+        .find(btn => (btn.textContent || '').trim().toLowerCase() === 'download');
+    let downloadReady = false;
+    if (downloadBtn) {
+        const style = window.getComputedStyle(downloadBtn);
+        downloadReady = style.display !== 'none' &&
+                        style.visibility !== 'hidden' &&
+                        parseFloat(style.opacity) > 0 &&
+                        !downloadBtn.hasAttribute('disabled') &&
+                        downloadBtn.getAttribute('aria-disabled') !== 'true' &&
+                        style.pointerEvents !== 'none';
+    }
+    if (hasSpeech && hasBackground && downloadReady) {
+        return { ready: true };
+    }
+
+    // Errores de procesamiento: palabra clave cerca de "processing/upload/enhance"
+    const allText = (document.body.textContent || '').toLowerCase();
+    const hasError = ['error', 'failed', 'unsuccessful', 'problema'].some(keyword => {
+        const index = allText.indexOf(keyword);
+        if (index === -1) return false;
+        const context = allText.substring(Math.max(0, index - 50), index + 50);
+        return context.includes('processing') || context.includes('upload') ||
+               context.includes('enhance');
+    });
+    return hasError ? { error: true } : false;
+}
+
+/** Se ejecuta en la página: true cuando los sliders muestran los valores pedidos */
+function slidersApplied(speech, background) {
+    const sliders = Array.from(document.querySelectorAll('input[type="range"]'));
+    const valueFor = pattern => {
+        const slider = sliders.find(s => pattern.test(
+            ((s.parentElement?.textContent || '') + ' ' + (s.getAttribute('aria-label') || '')).toLowerCase()));
+        return slider ? Number(slider.value) : null;
+    };
+    return valueFor(/speech|voz/) === Number(speech) &&
+           valueFor(/background|fondo/) === Number(background);
+}
 
 class AdobePodcastAutomation {
-    constructor(email, password, downloadPath, speechLevel = 70, backgroundLevel = 10) {
+    constructor(email, password, downloadPath, speechLevel = 70, backgroundLevel = 10,
+                profileName = 'ChromeProfile', headless = false, jobId = '') {
         this.email = email;
         this.password = password;
         this.downloadPath = downloadPath;
         this.speechLevel = speechLevel;
         this.backgroundLevel = backgroundLevel;
+        this.profileName = profileName;
+        this.headless = headless;
+        this.jobId = jobId;
+        this.currentPhase = 'startup';
+        this.phaseStartedAt = Date.now();
         this.browser = null;
         this.page = null;
+        this.cdp = null;
+        this.pageCdp = null;
+        this.busy = false;
+        this.pageDirty = false;
+        this.downloads = new Map();
+        this.downloadWaiters = [];
+        this.results = [];
+        // Límite de cada fase en ms; los trabajos de --serve pueden cambiarlos
+        this.timeouts = {
+            uploading: UPLOAD_TIMEOUT,
+            processing: PROCESSING_TIMEOUT,
+            downloading: DOWNLOAD_TIMEOUT
+        };
+    }
+
+    /**
+     * Protocolo de eventos: una línea JSON por evento en stdout.
+     * Campos comunes: event, job, ts (ms epoch). Ver protocol.py.
+     */
+    emit(event, data = {}) {
+        process.stdout.write(JSON.stringify({ event, job: this.jobId, ts: Date.now(), ...data }) + '\n');
     }
 
     log(message) {
-        console.log(`[${new Date().toISOString()}] ${message}`);
+        this.emit('log', { message });
+    }
+
+    // Cambio de fase (login, uploading, processing, downloading) con la duración de la anterior
+    phase(name, data = {}) {
+        const now = Date.now();
+        this.emit('phase', {
+            phase: name,
+            previous: this.currentPhase,
+            previous_ms: now - this.phaseStartedAt,
+            ...data
+        });
+        this.currentPhase = name;
+        this.phaseStartedAt = now;
+    }
+
+    progress(percent, data = {}) {
+        this.emit('progress', { phase: this.currentPhase, percent, ...data });
+    }
+
+    error(message, data = {}) {
+        this.emit('error', { phase: this.currentPhase, message, ...data });
     }
 
     async init() {
@@ -81,8 +219,10 @@ class AdobePodcastAutomation {
         // Detectar Chrome instalado
         const chromeExecutable = this.findChromeExecutable();
         
-        // Ruta del perfil de usuario (temporal para evitar conflictos)
-        const userDataDir = path.join(process.env.LOCALAPPDATA || process.env.APPDATA, 'AdobePodcastEnhancer', 'ChromeProfile');
+        // Ruta del perfil de usuario (uno por worker para evitar conflictos de bloqueo)
+        const appDataDir = process.env.LOCALAPPDATA || process.env.APPDATA ||
+                           path.join(os.homedir(), '.config');
+        const userDataDir = path.join(appDataDir, 'AdobePodcastEnhancer', this.profileName);
         
         // Crear directorio del perfil si no existe
         if (!fs.existsSync(userDataDir)) {
@@ -92,7 +232,7 @@ class AdobePodcastAutomation {
         this.log('🌐 Usando Chrome instalado en tu sistema');
 
         this.browser = await puppeteer.launch({
-            headless: false,
+            headless: this.headless,
             executablePath: chromeExecutable,
             userDataDir: userDataDir, // Usa un perfil persistente
             defaultViewport: null,
@@ -134,25 +274,134 @@ class AdobePodcastAutomation {
             });
         });
         
-        // Configurar descargas
-        const client = await this.page.target().createCDPSession();
-        await client.send('Page.setDownloadBehavior', {
-            behavior: 'allow',
-            downloadPath: this.downloadPath
+        // Configurar descargas con eventos Browser.downloadProgress
+        const client = await this.browser.target().createCDPSession();
+        this.cdp = client;
+        await this.setDownloadPath(this.downloadPath);
+        client.on('Browser.downloadWillBegin', event => {
+            this.downloads.set(event.guid, { suggestedFilename: event.suggestedFilename });
+        });
+        client.on('Browser.downloadProgress', event => {
+            if (event.state === 'completed' || event.state === 'canceled') {
+                const info = this.downloads.get(event.guid) || {};
+                this.downloads.delete(event.guid);
+                info.totalBytes = event.totalBytes;
+                info.receivedBytes = event.receivedBytes;
+                const waiter = this.downloadWaiters.shift();
+                if (waiter) waiter(event.state, { guid: event.guid, ...info });
+            }
         });
 
         this.log('✅ Navegador Chrome iniciado con perfil persistente');
     }
 
+    async setDownloadPath(downloadPath) {
+        if (!fs.existsSync(downloadPath)) {
+            fs.mkdirSync(downloadPath, { recursive: true });
+        }
+        // allowAndName: Chrome guarda cada descarga como <downloadPath>/<guid>,
+        // sin colisiones con archivos existentes ni sufijos " (1)"
+        await this.cdp.send('Browser.setDownloadBehavior', {
+            behavior: 'allowAndName',
+            downloadPath,
+            eventsEnabled: true
+        });
+        this.downloadPath = downloadPath;
+    }
+
+    /**
+     * Limita la subida y la descarga de la pestaña (bytes/s, -1 = sin límite).
+     * Python reparte el límite global entre los navegadores y envía a cada
+     * uno su parte con el comando "throttle".
+     */
+    async setThrottle(upload, download) {
+        if (!this.pageCdp) {
+            this.pageCdp = await this.page.target().createCDPSession();
+            await this.pageCdp.send('Network.enable');
+        }
+        await this.pageCdp.send('Network.emulateNetworkConditions', {
+            offline: false,
+            latency: 0,
+            uploadThroughput: upload > 0 ? upload : -1,
+            downloadThroughput: download > 0 ? download : -1
+        });
+    }
+
+    /**
+     * Promesa que se resuelve con la siguiente descarga completada.
+     * Debe crearse antes del click en Download para no perder el evento.
+     */
+    waitForDownload(timeout) {
+        let waiter;
+        let timer;
+        const promise = new Promise((resolve, reject) => {
+            waiter = (state, info) => {
+                clearTimeout(timer);
+                if (state === 'completed') {
+                    resolve(info);
+                } else {
+                    reject(new Error(`Descarga cancelada: ${info.suggestedFilename || info.guid}`));
+                }
+            };
+            timer = setTimeout(() => {
+                this.downloadWaiters = this.downloadWaiters.filter(w => w !== waiter);
+                reject(new Error('Tiempo de espera de la descarga agotado'));
+            }, timeout);
+            this.downloadWaiters.push(waiter);
+        });
+        promise.cancel = () => {
+            clearTimeout(timer);
+            this.downloadWaiters = this.downloadWaiters.filter(w => w !== waiter);
+        };
+        // Evitar "unhandled rejection" si la promesa se cancela sin esperarla
+        promise.catch(() => {});
+        return promise;
+    }
+
+    /**
+     * Verifica una descarga completada y le da su nombre definitivo.
+     * El archivo debe existir con el tamaño anunciado por Chrome; se renombra
+     * a `<outputStem><extensión sugerida>` (reemplazando uno anterior).
+     */
+    async saveDownload(info, outputStem) {
+        const tempPath = path.join(this.downloadPath, info.guid);
+        let stat = await fs.promises.stat(tempPath).catch(() => null);
+        if (!stat) {
+            throw new Error(`La descarga no aparece en ${this.downloadPath}`);
+        }
+        if (stat.size === 0) {
+            throw new Error('La descarga está vacía');
+        }
+        if (info.totalBytes && stat.size !== info.totalBytes) {
+            throw new Error(`Descarga incompleta: ${stat.size} de ${info.totalBytes} bytes`);
+        }
+
+        const suggested = info.suggestedFilename || 'enhanced.wav';
+        const extension = path.extname(suggested);
+        const stem = outputStem || path.basename(suggested, extension);
+        const output = path.join(this.downloadPath, stem + extension);
+        await fs.promises.rename(tempPath, output);
+        return { output, bytes: stat.size };
+    }
+
+    /** Rechaza `promise` si no termina en `timeout` ms */
+    withTimeout(promise, timeout, message) {
+        let timer;
+        const expired = new Promise((_, reject) => {
+            timer = setTimeout(() => reject(new Error(message)), timeout);
+        });
+        return Promise.race([promise, expired]).finally(() => clearTimeout(timer));
+    }
+
     findChromeExecutable() {
         // Rutas comunes de Chrome en Windows
         const possiblePaths = [
             'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe',
             'C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe',
-            path.join(process.env.LOCALAPPDATA, 'Google\\Chrome\\Application\\chrome.exe'),
-            path.join(process.env.PROGRAMFILES, 'Google\\Chrome\\Application\\chrome.exe'),
-            path.join(process.env['PROGRAMFILES(X86)'], 'Google\\Chrome\\Application\\chrome.exe')
-        ];
+            process.env.LOCALAPPDATA && path.join(process.env.LOCALAPPDATA, 'Google\\Chrome\\Application\\chrome.exe'),
+            process.env.PROGRAMFILES && path.join(process.env.PROGRAMFILES, 'Google\\Chrome\\Application\\chrome.exe'),
+            process.env['PROGRAMFILES(X86)'] && path.join(process.env['PROGRAMFILES(X86)'], 'Google\\Chrome\\Application\\chrome.exe')
+        ].filter(Boolean);
 
         for (const chromePath of possiblePaths) {
             if (fs.existsSync(chromePath)) {
@@ -168,6 +417,7 @@ class AdobePodcastAutomation {
 
     async login() {
         try {
+            this.phase('login');
             this.log('🔐 Verificando sesión en Adobe...');
             
             // Navegar a Adobe Podcast
@@ -178,8 +428,12 @@ class AdobePodcastAutomation {
 
             this.log('📄 Página cargada');
 
-            // Esperar un momento para que la página cargue completamente
-            await new Promise(resolve => setTimeout(resolve, 3000));
+            // Esperar a que aparezca el uploader o un botón de sesión (sin pausa fija)
+            await this.page.waitForFunction(() => !!(
+                document.querySelector('input[type="file"]') ||
+                Array.from(document.querySelectorAll('button, a')).some(b =>
+                    /sign in|log in|sign out|logout|iniciar sesión|get started/i.test(b.textContent))
+            ), { polling: 'mutation', timeout: SETTLE_TIMEOUT }).catch(() => {});
             
             // Verificar si ya estamos logueados
             const currentUrl = this.page.url();
@@ -332,12 +586,14 @@ class AdobePodcastAutomation {
                 this.log(`⚠️ URL actual: ${finalUrl}`);
             }
             
-            // Esperar un poco más para asegurar que todo cargue
-            await new Promise(resolve => setTimeout(resolve, 3000));
+            // Esperar a que el uploader esté disponible
+            await this.page.waitForSelector('input[type="file"]', {
+                timeout: SETTLE_TIMEOUT
+            }).catch(() => {});
 
             return true;
         } catch (error) {
-            this.log(`❌ Error en login: ${error.message}`);
+            this.error(`Error en login: ${error.message}`);
             
             // Tomar screenshot del error
             try {
@@ -351,365 +607,297 @@ class AdobePodcastAutomation {
         }
     }
 
-    async uploadAndProcess(videoFiles) {
-        try {
-            const files = JSON.parse(videoFiles);
-            this.log(`📤 Subiendo ${files.length} archivo(s)...`);
+    /**
+     * Sube, procesa y descarga un único archivo en la pestaña actual.
+     * Emite el evento "done" con el resultado y lo devuelve.
+     */
+    async processFile(filePath, outputStem = null) {
+        const fileName = path.basename(filePath);
 
-            for (let i = 0; i < files.length; i++) {
-                const filePath = files[i];
-                const fileName = path.basename(filePath);
-                
-                this.log(`📁 Procesando archivo ${i + 1}/${files.length}: ${fileName}`);
+        // Buscar el input de archivo (puede estar oculto)
+        let fileInput = await this.page.$('input[type="file"]');
+        
+        if (!fileInput) {
+            this.log('⚠️ No se encontró input de archivo, buscando botón de upload...');
+            
+            // Hacer clic en cualquier botón que diga "upload" o similar
+            await this.page.evaluate(() => {
+                const buttons = Array.from(document.querySelectorAll('button, a, div[role="button"]'));
+                const uploadBtn = buttons.find(b => {
+                    const text = b.textContent.toLowerCase();
+                    return text.includes('upload') || text.includes('select') || text.includes('choose');
+                });
+                if (uploadBtn) uploadBtn.click();
+            });
+            
+            fileInput = await this.page.waitForSelector('input[type="file"]', {
+                timeout: SETTLE_TIMEOUT
+            }).catch(() => null);
+        }
 
-                // Buscar el input de archivo (puede estar oculto)
-                let fileInput = await this.page.$('input[type="file"]');
+        // Subir archivo
+        const fileStartedAt = Date.now();
+        const bytes = fs.statSync(filePath).size;
+        if (fileInput) {
+            this.phase('uploading', { file: fileName, bytes });
+            await this.withTimeout(fileInput.uploadFile(filePath), this.timeouts.uploading,
+                                   'Tiempo de espera de la subida agotado');
+            this.progress(100, { file: fileName, bytes });
+            this.log(`⬆️ Archivo subido: ${fileName}`);
+        } else {
+            this.error('No se pudo encontrar el input de archivo', { file: fileName });
+            this.emit('done', { file: fileName, success: false, duration_ms: Date.now() - fileStartedAt });
+            return { success: false };
+        }
+        
+        // Esperar a que comience el procesamiento
+        this.phase('processing', { file: fileName });
+        
+        // Hacer zoom al 80% para ver todos los elementos (botón Download y sliders)
+        await this.page.evaluate(() => {
+            document.body.style.zoom = '0.8';
+        });
+        
+        this.log('🔄 Procesamiento en curso... (esto puede tardar varios minutos)');
+        
+        // Detectar el fin del procesamiento con un MutationObserver en la página:
+        // se evalúa solo cuando cambia el DOM, sin sondeos fijos
+        let downloadSuccess = false;
+        let output = null;
+        let outputBytes = null;
+        let failedPhase = null;
+        // Fuera del try: si algo falla antes de esperarla, el finally la
+        // cancela y no se queda con el evento de descarga del siguiente trabajo
+        let download = null;
+        const processingStart = Date.now();
+        const heartbeat = setInterval(() => {
+            const elapsed = Date.now() - processingStart;
+            // Progreso estimado: la página no expone un porcentaje real
+            this.progress(Math.min(95, Math.round(100 * elapsed / this.timeouts.processing)), {
+                file: fileName,
+                elapsed_ms: elapsed
+            });
+        }, 5000);
+        
+        try {
+            const state = await this.page.waitForFunction(detectProcessingState, {
+                polling: 'mutation',
+                timeout: this.timeouts.processing
+            }).then(handle => handle.jsonValue());
+            
+            if (state.error) {
+                throw new Error('Error detectado en el procesamiento');
+            }
+            
+            this.log(`✅ ¡Procesamiento completado! Sliders y botón Download detectados`);
+            
+            // Ajustar los sliders ANTES de descargar
+            this.log(`🎚️ Ajustando Speech a ${this.speechLevel}% y Background a ${this.backgroundLevel}%...`);
+            
+            await this.page.evaluate((speech, background) => {
+                // Buscar sliders por múltiples métodos
+                const sliders = Array.from(document.querySelectorAll('input[type="range"], [role="slider"]'));
                 
-                if (!fileInput) {
-                    this.log('⚠️ No se encontró input de archivo, buscando botón de upload...');
-                    
-                    // Hacer clic en cualquier botón que diga "upload" o similar
-                    await this.page.evaluate(() => {
-                        const buttons = Array.from(document.querySelectorAll('button, a, div[role="button"]'));
-                        const uploadBtn = buttons.find(b => {
-                            const text = b.textContent.toLowerCase();
-                            return text.includes('upload') || text.includes('select') || text.includes('choose');
-                        });
-                        if (uploadBtn) uploadBtn.click();
-                    });
+                sliders.forEach(slider => {
+                    const label = slider.parentElement?.textContent?.toLowerCase() || 
+                                 slider.getAttribute('aria-label')?.toLowerCase() || '';
                     
-                    await new Promise(resolve => setTimeout(resolve, 1000));
-                    fileInput = await this.page.$('input[type="file"]');
-                }
-
-                // Subir archivo
-                if (fileInput) {
-                    await fileInput.uploadFile(filePath);
-                    this.log(`⬆️ Archivo subido: ${fileName}`);
-                } else {
-                    this.log('❌ No se pudo encontrar el input de archivo');
-                    continue;
-                }
-                
-                // Esperar a que comience el procesamiento
-                this.log('⏳ Esperando inicio de procesamiento...');
-                await new Promise(resolve => setTimeout(resolve, 5000));
-                
-                // Hacer zoom al 80% para ver todos los elementos (botón Download y sliders)
-                this.log('🔍 Ajustando zoom a 80% para mejor visibilidad...');
-                await this.page.evaluate(() => {
-                    document.body.style.zoom = '0.8';
+                    if (label.includes('speech') || label.includes('voz')) {
+                        // Ajustar Speech
+                        slider.value = speech;
+                        slider.dispatchEvent(new Event('input', { bubbles: true }));
+                        slider.dispatchEvent(new Event('change', { bubbles: true }));
+                    } else if (label.includes('background') || label.includes('fondo')) {
+                        // Ajustar Background
+                        slider.value = background;
+                        slider.dispatchEvent(new Event('input', { bubbles: true }));
+                        slider.dispatchEvent(new Event('change', { bubbles: true }));
+                    }
                 });
-                await new Promise(resolve => setTimeout(resolve, 1000));
+            }, this.speechLevel, this.backgroundLevel);
+            
+            // Esperar a que la página refleje los valores (sin pausa fija)
+            await this.page.waitForFunction(slidersApplied, {
+                polling: 'mutation',
+                timeout: SETTLE_TIMEOUT
+            }, this.speechLevel, this.backgroundLevel).catch(() => {
+                this.log('⚠️ No se pudo confirmar el valor de los sliders, continuando...');
+            });
+            this.log('✅ Ajustes aplicados');
+            
+            // Registrar la espera de la descarga antes del click para no perder eventos
+            download = this.waitForDownload(this.timeouts.downloading);
+            
+            // Hacer clic en el botón de descarga
+            const clicked = await this.page.evaluate(() => {
+                // Buscar el botón "Download" y hacer click
+                const allButtons = Array.from(document.querySelectorAll('button, a, div[role="button"], span[role="button"]'));
                 
-                // Verificar que estemos en la interfaz de procesamiento correcta
-                const processingUIReady = await this.page.evaluate(() => {
-                    // Buscar elementos que indican que estamos en la interfaz de procesamiento
-                    const pageText = document.body.textContent || '';
-                    const hasEnhanceUI = pageText.includes('Enhance Speech') || 
-                                        pageText.includes('Original') || 
-                                        pageText.includes('Enhanced') ||
-                                        document.querySelector('[data-test-id*="enhance"]') !== null;
-                    return hasEnhanceUI;
+                let downloadBtn = allButtons.find(btn => {
+                    const text = (btn.textContent || '').trim();
+                    return text === 'Download' || text.toLowerCase() === 'download';
                 });
                 
-                if (!processingUIReady) {
-                    this.log('⚠️ La interfaz de procesamiento no se ha cargado, esperando...');
-                    await new Promise(resolve => setTimeout(resolve, 5000));
+                if (!downloadBtn) {
+                    downloadBtn = allButtons.find(btn => {
+                        const text = (btn.textContent || '').toLowerCase();
+                        const ariaLabel = (btn.getAttribute('aria-label') || '').toLowerCase();
+                        return text.includes('download') || ariaLabel.includes('download');
+                    });
                 }
                 
-                this.log('🔄 Procesamiento en curso... (esto puede tardar varios minutos)');
-                
-                // Detectar cuando el procesamiento termine - buscar botón de descarga
-                let downloadSuccess = false;
-                const maxAttempts = 180; // 15 minutos (5 segundos * 180)
-                
-                for (let attempt = 0; attempt < maxAttempts; attempt++) {
-                    try {
-                        // CLAVE: Los sliders Speech/Background SOLO aparecen cuando el procesamiento Enhanced termina
-                        const processingStatus = await this.page.evaluate(() => {
-                            // Buscar los sliders Speech y Background
-                            const allSliders = Array.from(document.querySelectorAll('input[type="range"]'));
-                            
-                            // DEBUG: Información detallada de todos los sliders encontrados
-                            const slidersDebug = allSliders.map(s => ({
-                                parentText: s.parentElement?.textContent?.substring(0, 100) || '',
-                                ariaLabel: s.getAttribute('aria-label') || '',
-                                id: s.id || '',
-                                className: s.className || '',
-                                value: s.value || ''
-                            }));
-                            
-                            const speechSlider = allSliders.find(s => {
-                                const parent = s.parentElement;
-                                const label = (parent?.textContent || '').toLowerCase();
-                                const ariaLabel = (s.getAttribute('aria-label') || '').toLowerCase();
-                                return label.includes('speech') || ariaLabel.includes('speech') || 
-                                       label.includes('voz') || ariaLabel.includes('voz');
-                            });
-                            
-                            const backgroundSlider = allSliders.find(s => {
-                                const parent = s.parentElement;
-                                const label = (parent?.textContent || '').toLowerCase();
-                                const ariaLabel = (s.getAttribute('aria-label') || '').toLowerCase();
-                                return label.includes('background') || ariaLabel.includes('background') ||
-                                       label.includes('fondo') || ariaLabel.includes('fondo');
-                            });
-                            
-                            // Si ambos sliders existen Y están visibles = procesamiento terminado
-                            const slidersReady = !!(speechSlider && backgroundSlider);
-                            
-                            // Buscar el botón Download
-                            const allButtons = Array.from(document.querySelectorAll('button, a, div[role="button"], span[role="button"]'));
-                            const downloadBtn = allButtons.find(btn => {
-                                const text = (btn.textContent || '').trim();
-                                return text === 'Download' || text.toLowerCase() === 'download';
-                            });
-                            
-                            let downloadBtnReady = false;
-                            if (downloadBtn) {
-                                const style = window.getComputedStyle(downloadBtn);
-                                const isVisible = style.display !== 'none' && 
-                                                 style.visibility !== 'hidden' &&
-                                                 parseFloat(style.opacity) > 0;
-                                const isEnabled = !downloadBtn.hasAttribute('disabled') && 
-                                                 downloadBtn.getAttribute('aria-disabled') !== 'true' &&
-                                                 style.pointerEvents !== 'none';
-                                downloadBtnReady = isVisible && isEnabled;
-                            }
-                            
-                            // Debugging info - solo botones del área de trabajo, no la navegación principal
-                            const workArea = document.querySelector('main, [role="main"], .enhance-container, #enhance') || document.body;
-                            const workAreaButtons = Array.from(workArea.querySelectorAll('button, a, div[role="button"], span[role="button"]'));
-                            const visibleButtons = workAreaButtons
-                                .filter(b => {
-                                    const style = window.getComputedStyle(b);
-                                    const text = b.textContent.trim();
-                                    return style.display !== 'none' && 
-                                           parseFloat(style.opacity) > 0 &&
-                                           text.length > 0 && 
-                                           text.length < 50 &&
-                                           !text.includes('Plans') && // Excluir navegación
-                                           !text.includes('Forums') &&
-                                           !text.includes('Affiliates');
-                                })
-                                .map(b => b.textContent.trim());
-                            
-                            return {
-                                enhancedReady: slidersReady && downloadBtnReady,
-                                hasSpeechSlider: !!speechSlider,
-                                hasBackgroundSlider: !!backgroundSlider,
-                                slidersCount: allSliders.length,
-                                slidersDebug: slidersDebug,
-                                downloadBtnReady,
-                                downloadBtnExists: !!downloadBtn,
-                                availableButtons: [...new Set(visibleButtons)].slice(0, 10), // Eliminar duplicados
-                                pageUrl: window.location.href,
-                                pageTitle: document.title
-                            };
-                        });
-                        
-                        if (processingStatus.enhancedReady) {
-                            this.log(`✅ ¡Procesamiento completado! Sliders y botón Download detectados`);
-                            this.log(`📊 Speech: ${processingStatus.hasSpeechSlider}, Background: ${processingStatus.hasBackgroundSlider}, Download: ${processingStatus.downloadBtnReady}`);
-                            
-                            // Ajustar los sliders ANTES de descargar
-                            this.log(`🎚️ Ajustando Speech a ${this.speechLevel}% y Background a ${this.backgroundLevel}%...`);
-                            
-                            await this.page.evaluate((speech, background) => {
-                                // Buscar sliders por múltiples métodos
-                                const sliders = Array.from(document.querySelectorAll('input[type="range"], [role="slider"]'));
-                                
-                                sliders.forEach(slider => {
-                                    const label = slider.parentElement?.textContent?.toLowerCase() || 
-                                                 slider.getAttribute('aria-label')?.toLowerCase() || '';
-                                    
-                                    if (label.includes('speech') || label.includes('voz')) {
-                                        // Ajustar Speech
-                                        slider.value = speech;
-                                        slider.dispatchEvent(new Event('input', { bubbles: true }));
-                                        slider.dispatchEvent(new Event('change', { bubbles: true }));
-                                    } else if (label.includes('background') || label.includes('fondo')) {
-                                        // Ajustar Background
-                                        slider.value = background;
-                                        slider.dispatchEvent(new Event('input', { bubbles: true }));
-                                        slider.dispatchEvent(new Event('change', { bubbles: true }));
-                                    }
-                                });
-                            }, this.speechLevel, this.backgroundLevel);
-                            
-                            // Esperar a que los cambios se apliquen
-                            await new Promise(resolve => setTimeout(resolve, 2000));
-                            this.log('✅ Ajustes aplicados');
-                            
-                            // Hacer clic en el botón de descarga
-                            const clicked = await this.page.evaluate(() => {
-                                // Buscar el botón "Download" y hacer click
-                                const allButtons = Array.from(document.querySelectorAll('button, a, div[role="button"], span[role="button"]'));
-                                
-                                let downloadBtn = allButtons.find(btn => {
-                                    const text = (btn.textContent || '').trim();
-                                    return text === 'Download' || text.toLowerCase() === 'download';
-                                });
-                                
-                                if (!downloadBtn) {
-                                    downloadBtn = allButtons.find(btn => {
-                                        const text = (btn.textContent || '').toLowerCase();
-                                        const ariaLabel = (btn.getAttribute('aria-label') || '').toLowerCase();
-                                        return text.includes('download') || ariaLabel.includes('download');
-                                    });
-                                }
-                                
-                                if (downloadBtn && !downloadBtn.hasAttribute('disabled')) {
-                                    downloadBtn.click();
-                                    return true;
-                                }
-                                return false;
-                            });
-                            
-                            if (clicked) {
-                                this.log('💾 Click en botón de descarga ejecutado');
-                                
-                                // Esperar a que el archivo se descargue (más tiempo)
-                                this.log('⏳ Esperando descarga del archivo...');
-                                await new Promise(resolve => setTimeout(resolve, 10000));
-                                
-                                this.log(`✅ Archivo descargado: ${fileName}`);
-                                downloadSuccess = true;
-                                break;
-                            } else {
-                                this.log('⚠️ No se pudo hacer click en el botón');
-                            }
-                        }
-                        
-                        // Verificar si hay un error
-                        const hasError = await this.page.evaluate(() => {
-                            const errorKeywords = ['error', 'failed', 'unsuccessful', 'problema'];
-                            const allText = document.body.textContent.toLowerCase();
-                            
-                            return errorKeywords.some(keyword => {
-                                const index = allText.indexOf(keyword);
-                                if (index !== -1) {
-                                    // Verificar que no sea parte de otro texto normal
-                                    const context = allText.substring(Math.max(0, index - 50), index + 50);
-                                    return context.includes('processing') || 
-                                           context.includes('upload') ||
-                                           context.includes('enhance');
-                                }
-                                return false;
-                            });
-                        });
-                        
-                        if (hasError) {
-                            this.log('❌ Error detectado en el procesamiento');
-                            break;
-                        }
-                        
-                        // Mostrar progreso cada 6 intentos (30 segundos)
-                        if (attempt % 6 === 0 && attempt > 0) {
-                            const seconds = attempt * 5;
-                            const minutes = Math.floor(seconds / 60);
-                            const remainingSeconds = seconds % 60;
-                            this.log(`⏳ Esperando procesamiento... (${minutes}m ${remainingSeconds}s)`);
-                            this.log(`🔍 Estado: ${processingStatus.slidersCount} sliders, Download=${processingStatus.downloadBtnExists ? 'Sí' : 'No'}`);
-                            this.log(`📍 URL: ${processingStatus.pageUrl}`);
-                            
-                            // Mostrar info de sliders encontrados
-                            if (processingStatus.slidersDebug && processingStatus.slidersDebug.length > 0) {
-                                this.log(`🎚️ Sliders encontrados:`);
-                                processingStatus.slidersDebug.forEach((s, i) => {
-                                    this.log(`  ${i+1}. Label: "${s.parentText.substring(0, 40)}", Value: ${s.value}`);
-                                });
-                            }
-                            
-                            // Solo mostrar algunos botones relevantes para debugging (no todos)
-                            if (processingStatus.availableButtons && processingStatus.availableButtons.length > 0) {
-                                const relevantButtons = processingStatus.availableButtons
-                                    .filter(b => b.toLowerCase().includes('download') || 
-                                               b.toLowerCase().includes('enhanced') || 
-                                               b.toLowerCase().includes('original'))
-                                    .slice(0, 5);
-                                if (relevantButtons.length > 0) {
-                                    this.log(`📋 Botones relevantes: ${relevantButtons.join(', ')}`);
-                                }
-                            }
-                            
-                            // Tomar screenshot cada 2 minutos para debugging
-                            if (minutes % 2 === 0 && remainingSeconds === 0 && minutes > 0) {
-                                const screenshotPath = path.join(this.downloadPath, `debug_${Date.now()}.png`);
-                                await this.page.screenshot({ path: screenshotPath, fullPage: true });
-                                this.log(`📸 Screenshot guardado: ${screenshotPath}`);
-                            }
-                        }
-                        
-                        // Esperar 5 segundos antes del siguiente intento
-                        await new Promise(resolve => setTimeout(resolve, 5000));
-                        
-                    } catch (err) {
-                        this.log(`⚠️ Error en intento ${attempt}: ${err.message}`);
-                        // Continuar con el siguiente intento
-                    }
+                if (downloadBtn && !downloadBtn.hasAttribute('disabled')) {
+                    downloadBtn.click();
+                    return true;
                 }
+                return false;
+            });
+            
+            if (clicked) {
+                this.log('💾 Click en botón de descarga ejecutado');
+                this.phase('downloading', { file: fileName });
                 
-                if (!downloadSuccess) {
-                    this.log(`⚠️ No se pudo descargar automáticamente: ${fileName}`);
-                    this.log('💡 Por favor descarga manualmente desde la página');
-                    
-                    // Tomar screenshot para debug
-                    try {
-                        const screenshotPath = path.join(this.downloadPath, `error_${Date.now()}.png`);
-                        await this.page.screenshot({ path: screenshotPath, fullPage: true });
-                        this.log(`📸 Screenshot guardado: ${screenshotPath}`);
-                    } catch (e) {
-                        // Ignorar error de screenshot
-                    }
-                }
+                // Esperar el evento Browser.downloadProgress "completed"
+                this.log('⏳ Esperando descarga del archivo...');
+                const result = await download;
+                const saved = await this.saveDownload(result, outputStem);
+                output = saved.output;
+                outputBytes = saved.bytes;
                 
-                // Esperar entre archivos
-                if (i < files.length - 1) {
-                    this.log('⏳ Preparando siguiente archivo...');
-                    
-                    // Recargar la página para procesar el siguiente archivo
-                    this.log('🔄 Recargando página para siguiente archivo...');
-                    await this.page.goto(ADOBE_PODCAST_URL, {
-                        waitUntil: 'networkidle2',
-                        timeout: 30000
-                    });
-                    
-                    await new Promise(resolve => setTimeout(resolve, 3000));
-                    this.log('✅ Página lista para siguiente archivo');
-                }
+                this.log(`✅ Archivo descargado: ${path.basename(output)}`);
+                downloadSuccess = true;
+            } else {
+                this.error('No se pudo hacer click en el botón', { file: fileName });
             }
+        } catch (err) {
+            failedPhase = this.currentPhase;
+            this.error(err.message, { file: fileName });
+        } finally {
+            clearInterval(heartbeat);
+            // Sin efecto si la descarga ya llegó: su waiter salió de la cola
+            download?.cancel();
+        }
+        
+        if (!downloadSuccess) {
+            this.log(`⚠️ No se pudo descargar automáticamente: ${fileName}`);
+            this.log('💡 Por favor descarga manualmente desde la página');
+            
+            // Tomar screenshot para debug
+            try {
+                const screenshotPath = path.join(this.downloadPath, `error_${Date.now()}.png`);
+                await this.page.screenshot({ path: screenshotPath, fullPage: true });
+                this.log(`📸 Screenshot guardado: ${screenshotPath}`);
+            } catch (e) {
+                // Ignorar error de screenshot
+            }
+        }
+        
+        this.emit('done', {
+            file: fileName,
+            success: downloadSuccess,
+            output,
+            failed_phase: downloadSuccess ? null : (failedPhase || this.currentPhase),
+            bytes,
+            output_bytes: outputBytes,
+            duration_ms: Date.now() - fileStartedAt
+        });
+        const result = { file: filePath, success: downloadSuccess, output, bytes: outputBytes };
+        this.results.push(result);
+        return result;
+    }
 
-            this.log('🎉 ¡Procesamiento completado para todos los archivos!');
-            this.log(`📊 Total procesado: ${files.length} archivo(s)`);
-            return true;
+    // Recargar la página para dejar el uploader listo para otro archivo
+    async reloadPage() {
+        this.log('🔄 Recargando página para siguiente archivo...');
+        await this.page.goto(ADOBE_PODCAST_URL, {
+            waitUntil: 'networkidle2',
+            timeout: 30000
+        });
+        
+        await this.page.waitForSelector('input[type="file"]', {
+            timeout: SETTLE_TIMEOUT
+        }).catch(() => {});
+        this.log('✅ Página lista para siguiente archivo');
+    }
 
-        } catch (error) {
-            this.log(`❌ Error en procesamiento: ${error.message}`);
-            throw error;
+    /**
+     * Línea del manifiesto -> mensaje "job" (null si está vacía, es un
+     * comentario o no es válida). Una ruta sola usa los ajustes de la línea
+     * de comando; una línea JSON acepta los mismos campos que en --serve.
+     */
+    parseManifestLine(line) {
+        const text = line.trim();
+        if (!text || text.startsWith('#')) return null;
+
+        let message = { file: text };
+        if (text.startsWith('{')) {
+            try {
+                message = JSON.parse(text);
+            } catch (e) {
+                this.error(`Línea no válida en el manifiesto: ${text.substring(0, 100)}`);
+                return null;
+            }
+        }
+        if (!message.file) {
+            this.error(`Línea del manifiesto sin "file": ${text.substring(0, 100)}`);
+            return null;
         }
+        if (!message.output_stem) {
+            const stem = path.basename(message.file, path.extname(message.file));
+            message.output_stem = `${stem}_enhanced`;
+        }
+        return message;
     }
 
-    async downloadAll() {
-        try {
-            this.log('📥 Verificando descargas...');
-            
-            // Listar archivos en el directorio de descargas
-            const files = fs.readdirSync(this.downloadPath);
-            
-            this.log(`📊 Total de archivos descargados: ${files.length}`);
-            
-            files.forEach(file => {
-                this.log(`  📄 ${file}`);
-            });
+    /**
+     * Procesa los trabajos del manifiesto según se leen: con "-" (stdin)
+     * se pueden seguir añadiendo mientras el navegador trabaja, y el
+     * tamaño del lote no depende del límite de la línea de comandos.
+     */
+    async uploadAndProcess(manifest) {
+        const stream = manifest === '-'
+            ? process.stdin
+            : fs.createReadStream(manifest, { encoding: 'utf8' });
+        const input = readline.createInterface({ input: stream, crlfDelay: Infinity });
+        const results = [];
+        let count = 0;
 
-            return files;
+        for await (const line of input) {
+            const message = this.parseManifestLine(line);
+            if (!message) continue;
+            count++;
+            this.log(`📁 Procesando archivo ${count}: ${path.basename(message.file)}`);
+            // runJob captura los errores: un fallo no detiene los siguientes
+            await this.runJob(message);
+            results.push(...this.results);
+        }
+        this.results = results;
 
-        } catch (error) {
-            this.log(`❌ Error verificando descargas: ${error.message}`);
-            return [];
+        this.log('🎉 ¡Procesamiento completado para todos los archivos!');
+        this.log(`📊 Total procesado: ${count} archivo(s)`);
+        return true;
+    }
+
+    /**
+     * Correspondencia archivo original -> descarga de este lote.
+     * Solo se comprueban las rutas registradas por processFile, sin listar
+     * la carpeta de descargas (que puede contener miles de archivos).
+     */
+    async downloadAll() {
+        this.log('📥 Verificando descargas...');
+        const downloads = [];
+        for (const result of this.results) {
+            if (!result.success) continue;
+            const stat = await fs.promises.stat(result.output).catch(() => null);
+            if (stat && stat.size === result.bytes) {
+                downloads.push({ file: result.file, output: result.output, bytes: stat.size });
+                this.log(`  📄 ${path.basename(result.file)} → ${path.basename(result.output)}`);
+            } else {
+                this.log(`  ⚠️ ${path.basename(result.output)} ya no está en la carpeta de descargas`);
+            }
         }
+        this.log(`📊 Total de archivos descargados: ${downloads.length}/${this.results.length}`);
+        return downloads;
     }
 
     async close() {
@@ -720,11 +908,105 @@ class AdobePodcastAutomation {
         }
     }
 
-    async run(videoFiles) {
+    /**
+     * Modo worker: inicia el navegador y la sesión una sola vez y atiende
+     * comandos JSON por stdin, uno por línea:
+     *   {"cmd": "job", "id", "file", "speech_level"?, "background_level"?, "download_path"?,
+     *    "output_stem"?, "timeouts"?}
+     *   {"cmd": "ping"}      -> evento "pong" con el estado del navegador
+     *   {"cmd": "throttle", "upload", "download"} -> límite en bytes/s, al momento
+     *   {"cmd": "shutdown"}  -> cierra el navegador al terminar el trabajo en curso
+     * Los trabajos se procesan en orden de llegada en la misma pestaña.
+     */
+    async serve() {
+        await this.init();
+        await this.login();
+
+        this.browser.on('disconnected', () => {
+            this.error('Navegador desconectado');
+            process.exit(2);
+        });
+
+        let queue = Promise.resolve();
+        const shutdown = () => queue
+            .then(() => this.close())
+            .then(() => process.exit(0));
+
+        const input = readline.createInterface({ input: process.stdin });
+        input.on('line', line => {
+            let message;
+            try {
+                message = JSON.parse(line);
+            } catch (e) {
+                this.error(`Comando no válido: ${line.substring(0, 100)}`);
+                return;
+            }
+
+            if (message.cmd === 'ping') {
+                this.emit('pong', {
+                    connected: this.browser.isConnected(),
+                    busy: this.busy,
+                    url: this.page.url()
+                });
+            } else if (message.cmd === 'throttle') {
+                // Fuera de la cola: cambia el límite del trabajo en curso
+                this.setThrottle(message.upload, message.download).catch(error => {
+                    this.error(`No se pudo limitar el ancho de banda: ${error.message}`);
+                });
+            } else if (message.cmd === 'job') {
+                queue = queue.then(() => this.runJob(message));
+            } else if (message.cmd === 'shutdown') {
+                shutdown();
+            } else {
+                this.error(`Comando desconocido: ${message.cmd}`);
+            }
+        });
+        // Si el proceso padre cierra stdin, terminar ordenadamente
+        input.on('close', shutdown);
+
+        this.phase('idle');
+        this.emit('ready', { profile: this.profileName });
+    }
+
+    async runJob(message) {
+        this.jobId = message.id || '';
+        this.busy = true;
+        this.results = [];
+        try {
+            if (message.speech_level !== undefined) this.speechLevel = message.speech_level;
+            if (message.background_level !== undefined) this.backgroundLevel = message.background_level;
+            if (message.timeouts) {
+                Object.assign(this.timeouts, message.timeouts);
+            }
+            if (message.download_path && message.download_path !== this.downloadPath) {
+                await this.setDownloadPath(message.download_path);
+            }
+            if (this.pageDirty) {
+                await this.reloadPage();
+            }
+            this.pageDirty = true;
+            await this.processFile(message.file, message.output_stem);
+        } catch (error) {
+            this.error(`Error en procesamiento: ${error.message}`);
+            this.emit('done', {
+                file: path.basename(message.file || ''),
+                success: false,
+                failed_phase: this.currentPhase
+            });
+            // Una excepción puede dejar la pestaña a medias: recargarla siempre
+            this.pageDirty = true;
+        } finally {
+            this.phase('idle');
+            this.busy = false;
+            this.jobId = '';
+        }
+    }
+
+    async run(manifest) {
         try {
             await this.init();
             await this.login();
-            await this.uploadAndProcess(videoFiles);
+            await this.uploadAndProcess(manifest);
             const downloads = await this.downloadAll();
             
             this.log('🎉 Proceso completado exitosamente');
@@ -735,7 +1017,7 @@ class AdobePodcastAutomation {
             };
 
         } catch (error) {
-            this.log(`❌ Error general: ${error.message}`);
+            this.error(`Error general: ${error.message}`);
             return {
                 success: false,
                 error: error.message
@@ -750,20 +1032,28 @@ class AdobePodcastAutomation {
 (async () => {
     const automation = new AdobePodcastAutomation(
         argv.email,
-        argv.password,
+        argv.password || process.env.ADOBE_PASSWORD,
         argv['download-path'],
         argv['speech-level'],
-        argv['background-level']
+        argv['background-level'],
+        argv.profile,
+        argv.headless,
+        argv['job-id']
     );
 
-    const result = await automation.run(argv.files);
-    
-    if (result.success) {
-        console.log('✅ SUCCESS');
-        process.exit(0);
-    } else {
-        console.error('❌ FAILED');
-        process.exit(1);
+    if (argv.serve) {
+        try {
+            await automation.serve();
+        } catch (error) {
+            automation.error(`Error iniciando el worker: ${error.message}`);
+            await automation.close();
+            process.exit(1);
+        }
+        return;
     }
+
+    const result = await automation.run(argv.manifest);
+    automation.emit('result', result);
+    process.exit(result.success ? 0 : 1);
 })();
 
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Reparto del ancho de banda
+Turnos de subida (primero el archivo más pequeño) y límite global de
+subida y descarga repartido entre los navegadores
+"""
+
+import itertools
+import threading
+
+# Valores por defecto (configurables en settings.json); 0 = sin límite
+UPLOAD_LIMIT_MBPS = 0
+DOWNLOAD_LIMIT_MBPS = 0
+MAX_CONCURRENT_UPLOADS = 0
+
+# Parte mínima de cada transferencia para que ninguna quede parada (bytes/s)
+MIN_RATE = 16 * 1024
+
+# Valor de CDP (Network.emulateNetworkConditions) para "sin límite"
+UNLIMITED = -1
+
+
+def mbps_to_rate(mbps):
+    """Mbit/s a bytes/s"""
+    return int(float(mbps or 0) * 1000 * 1000 / 8)
+
+
+def rate(size, seconds):
+    """Bytes/s de una transferencia, o None si no hay datos"""
+    if not size or not seconds:
+        return None
+    return size / seconds
+
+
+def describe_rate(bytes_per_second):
+    return f"{bytes_per_second * 8 / (1000 * 1000):.1f} Mbit/s"
+
+
+def _share(limit, count):
+    if not limit or not count:
+        return UNLIMITED
+    return max(MIN_RATE, limit // count)
+
+
+class BandwidthManager:
+    """
+    Reparto del enlace entre las transferencias de un JobPool.
+
+    - Turnos de subida: como mucho `max_concurrent_uploads` subidas a la
+      vez y, con cola, el turno es para el archivo más pequeño, que antes
+      pasa a esperar al servidor y deja el enlace libre. El turno se
+      devuelve al acabar la subida (`release_upload()`), no el trabajo: la
+      subida de un trabajo se solapa con el procesamiento de otro.
+    - Límite global: `upload_limit_mbps` y `download_limit_mbps` se
+      reparten a partes iguales entre las transferencias en curso de cada
+      sentido. Cada vez que una empieza o acaba se llama a
+      `apply(clave, subida, descarga)` (bytes/s, UNLIMITED sin límite) con
+      las claves cuya parte cambió.
+
+    La clave es la del worker: uno solo transfiere un archivo a la vez.
+    Los límites se leen de `settings` en cada uso.
+    """
+
+    def __init__(self, settings, apply=None, on_log=None):
+        self.settings = settings
+        self.apply = apply or (lambda key, upload, download: None)
+        self.on_log = on_log or (lambda message: None)
+        self._cond = threading.Condition()
+        self._send_locks = {}  # clave -> Lock de sus envíos a apply
+        self._order = itertools.count()
+        self._waiting = {}  # clave -> (bytes, orden de llegada)
+        self._uploads = {}  # clave -> bytes
+        self._downloads = set()
+        self._applied = {}  # clave -> (subida, descarga) ya enviados
+
+    def limits(self):
+        """(subida, descarga) en bytes/s; 0 = sin límite"""
+        settings = self.settings
+        return (mbps_to_rate(settings.get('upload_limit_mbps', UPLOAD_LIMIT_MBPS)),
+                mbps_to_rate(settings.get('download_limit_mbps', DOWNLOAD_LIMIT_MBPS)))
+
+    def _turn(self, key):
+        slots = int(self.settings.get('max_concurrent_uploads', MAX_CONCURRENT_UPLOADS) or 0)
+        if slots and len(self._uploads) >= slots:
+            return False
+        return min(self._waiting, key=self._waiting.get) == key
+
+    def acquire_upload(self, key, size, stopped=None):
+        """
+        Espera el turno para subir `size` bytes. Devuelve False si
+        `stopped` se activa durante la espera.
+        """
+        with self._cond:
+            self._waiting[key] = (size, next(self._order))
+            waiting = False
+            try:
+                while not self._turn(key):
+                    if stopped is not None and stopped.is_set():
+                        return False
+                    if not waiting:
+                        waiting = True
+                        self.on_log(f">> Esperando turno de subida "
+                                    f"({len(self._uploads)} en curso)")
+                    self._cond.wait(1)
+            finally:
+                del self._waiting[key]
+                self._cond.notify_all()
+            self._uploads[key] = size
+            changed = self._rebalance()
+        self._send(changed)
+        return True
+
+    def release_upload(self, key):
+        """Fin de la subida: cede el turno y su parte del límite"""
+        changed = []
+        with self._cond:
+            if self._uploads.pop(key, None) is not None:
+                self._cond.notify_all()
+                changed = self._rebalance()
+        self._send(changed)
+
+    def start_download(self, key):
+        changed = []
+        with self._cond:
+            if key not in self._downloads:
+                self._downloads.add(key)
+                changed = self._rebalance()
+        self._send(changed)
+
+    def finish(self, key):
+        """Fin del trabajo del worker `key` (termine como termine)"""
+        with self._cond:
+            released = self._uploads.pop(key, None) is not None
+            if released or key in self._downloads:
+                self._downloads.discard(key)
+                self._cond.notify_all()
+            changed = self._rebalance()
+        self._send(changed)
+
+    def _rebalance(self):
+        """
+        Calcula la nueva parte de cada transferencia (bajo `_cond`) y
+        devuelve las claves cuyo límite cambió
+        """
+        upload_limit, download_limit = self.limits()
+        upload = _share(upload_limit, len(self._uploads))
+        download = _share(download_limit, len(self._downloads))
+        changed = []
+        for key in set(self._uploads) | self._downloads | set(self._applied):
+            wanted = (upload if key in self._uploads else UNLIMITED,
+                      download if key in self._downloads else UNLIMITED)
+            if self._applied.get(key, (UNLIMITED, UNLIMITED)) == wanted:
+                continue
+            if wanted == (UNLIMITED, UNLIMITED):
+                self._applied.pop(key, None)
+            else:
+                self._applied[key] = wanted
+            changed.append(key)
+        return changed
+
+    def _send(self, keys):
+        """
+        Llama a `apply` fuera de `_cond`: un worker lento al recibir el
+        límite no frena los turnos del resto. Los envíos a una misma clave
+        van de uno en uno y con su valor vigente, así uno que llegue tarde
+        no pisa otro más reciente.
+        """
+        for key in keys:
+            with self._cond:
+                lock = self._send_locks.setdefault(key, threading.Lock())
+            with lock:
+                with self._cond:
+                    upload, download = self._applied.get(key, (UNLIMITED, UNLIMITED))
+                try:
+                    self.apply(key, upload, download)
+                except Exception as e:
+                    self.on_log(f">> No se pudo aplicar el límite de ancho de banda: {e}")
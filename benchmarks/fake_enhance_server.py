@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Servicio de mejora simulado
+Página local que imita el flujo subida → procesamiento → sliders → Download
+
+Uso:
+    python benchmarks/fake_enhance_server.py --port 8765 --latency 3 --failure-rate 0.1
+    python benchmarks/fake_enhance_server.py --upload-mbps 20 --download-mbps 50
+    node automation.js --url http://127.0.0.1:8765/enhance ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# La página reproduce lo que automation.js busca en la real: un
+# input[type=file] (sesión iniciada), un mensaje de error cerca de
+# "processing", sliders con etiqueta Speech/Background y un botón Download.
+# El script va en <head>: detectProcessingState lee body.textContent y los
+# textos del script se tomarían por un error en pantalla.
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Enhance Speech (simulado)</title>
+  <script>
+  document.addEventListener('DOMContentLoaded', () => {
+    const input = document.getElementById('file');
+    const status = document.getElementById('status');
+    const result = document.getElementById('result');
+    input.addEventListener('change', async () => {
+      const file = input.files[0];
+      if (!file) return;
+      status.textContent = 'Uploading ' + file.name + '...';
+      const upload = await fetch('/upload?name=' + encodeURIComponent(file.name),
+                                 {method: 'POST', body: file});
+      const job = await upload.json();
+      status.textContent = 'Processing...';
+      setTimeout(() => {
+        if (!job.ok) {
+          status.textContent = 'Error: processing of the upload failed';
+          return;
+        }
+        status.textContent = 'Enhanced';
+        result.innerHTML =
+          '<label>Speech <input type="range" min="0" max="100" value="90"></label>' +
+          '<label>Background <input type="range" min="0" max="100" value="0"></label>' +
+          '<button id="download">Download</button>';
+        document.getElementById('download').addEventListener('click', () => {
+          window.location.href = '/download/' + job.id;
+        });
+      }, job.ready_in_ms);
+    });
+  });
+  </script>
+</head>
+<body>
+  <h1>Enhance Speech</h1>
+  <input type="file" id="file">
+  <p id="status">Drop a file to enhance</p>
+  <div id="result"></div>
+</body>
+</html>
+"""
+
+
+# Bloque de lectura/escritura al limitar la velocidad
+CHUNK = 64 * 1024
+
+
+class Link:
+    """
+    Enlace simulado de `mbps` Mbit/s compartido por todas las conexiones
+    de un sentido (0 = sin límite): cada bloque reserva su hueco en la
+    línea, así varias transferencias a la vez se reparten la velocidad
+    como en un enlace saturado.
+    """
+
+    def __init__(self, mbps=0):
+        self.rate = mbps * 1000 * 1000 / 8
+        self._free_at = 0.0
+        self._lock = threading.Lock()
+
+    def transfer(self, size):
+        """Espera lo que tardaría en pasar `size` bytes por el enlace"""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._free_at = max(self._free_at, now) + size / self.rate
+            wait = self._free_at - now
+        time.sleep(wait)
+
+
+class FakeEnhanceServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP con la página simulada y los trabajos en memoria.
+
+    `latency` son los segundos de "procesamiento" por archivo (± `jitter`),
+    `failure_rate` la probabilidad de que la página muestre un error y
+    `download_delay` los segundos antes de empezar a servir la descarga.
+    `upload_mbps` y `download_mbps` limitan el enlace de cada sentido
+    (ver Link). El resultado descargado es el propio archivo subido.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=2.0, jitter=0.5, failure_rate=0.0,
+                 download_delay=0.0, seed=None, upload_mbps=0, download_mbps=0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.uplink = Link(upload_mbps)
+        self.downlink = Link(download_mbps)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.download_delay = download_delay
+        self.random = random.Random(seed)
+        self.jobs = {}
+        self.stats = {'uploads': 0, 'failures': 0, 'downloads': 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/enhance"
+
+    def start(self):
+        """Atiende peticiones en un thread de fondo"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def new_job(self, name, data):
+        with self._lock:
+            ok = self.random.random() >= self.failure_rate
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter,
+                                                                self.jitter))
+            job_id = uuid.uuid4().hex[:12]
+            self.stats['uploads'] += 1
+            if ok:
+                self.jobs[job_id] = (name, data)
+            else:
+                self.stats['failures'] += 1
+        return {'id': job_id, 'ok': ok, 'ready_in_ms': int(delay * 1000)}
+
+    def take_job(self, job_id):
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+            if job:
+                self.stats['downloads'] += 1
+            return job
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Sin ruido en la salida del benchmark
+
+    def _send(self, status, body, content_type, headers=None, link=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if link is None:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), CHUNK):
+            block = body[start:start + CHUNK]
+            link.transfer(len(block))
+            self.wfile.write(block)
+
+    def _receive(self, length, link):
+        blocks = []
+        while length > 0:
+            block = self.rfile.read(min(CHUNK, length))
+            if not block:
+                break
+            link.transfer(len(block))
+            blocks.append(block)
+            length -= len(block)
+        return b''.join(blocks)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path in ('/', '/enhance'):
+            self._send(200, PAGE.encode('utf-8'), 'text/html; charset=utf-8')
+        elif path.startswith('/download/'):
+            job = self.server.take_job(path.rsplit('/', 1)[-1])
+            if not job:
+                self._send(404, b'not found', 'text/plain')
+                return
+            time.sleep(self.server.download_delay)
+            name, data = job
+            filename = f"{Path(name).stem}-enhanced{Path(name).suffix or '.wav'}"
+            self._send(200, data, 'application/octet-stream', {
+                'Content-Disposition': f'attachment; filename="{filename}"'
+            }, link=self.server.downlink)
+        else:
+            self._send(404, b'not found', 'text/plain')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/upload':
+            self._send(404, b'not found', 'text/plain')
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self._receive(length, self.server.uplink)
+        name = parse_qs(url.query).get('name', ['audio.wav'])[0]
+        body = json.dumps(self.server.new_job(name, data)).encode('utf-8')
+        self._send(200, body, 'application/json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio de mejora simulado")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help="Segundos de procesamiento por archivo")
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--download-delay', type=float, default=0.0)
+    parser.add_argument('--upload-mbps', type=float, default=0,
+                        help="Velocidad del enlace de subida (0 = sin límite)")
+    parser.add_argument('--download-mbps', type=float, default=0,
+                        help="Velocidad del enlace de descarga (0 = sin límite)")
+    args = parser.parse_args()
+
+    server = FakeEnhanceServer(args.port, args.latency, args.jitter,
+                               args.failure_rate, args.download_delay,
+                               upload_mbps=args.upload_mbps,
+                               download_mbps=args.download_mbps)
+    print(f"Servicio simulado en {server.url} (Ctrl+C para salir)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
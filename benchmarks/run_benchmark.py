@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Benchmark sin conexión
+Ejecuta el pipeline real (Pipeline + automation.js) contra el servicio simulado
+
+Uso:
+    python benchmarks/run_benchmark.py
+    python benchmarks/run_benchmark.py --files 1,10 --concurrency 1,3 --latency 5
+    python benchmarks/run_benchmark.py --link-mbps 20 --upload-limit 16 --max-uploads 1
+
+Requiere Node.js con las dependencias instaladas (npm install); Chrome o el
+Chromium de Puppeteer se lanzan en modo headless con perfiles propios.
+
+Limitación: durante el desarrollo el harness se validó con un worker
+simulado (tests/fake_worker.js) en lugar de Chrome, así que sus cifras no
+incluyen el coste real del arranque, el login ni el renderizado de la
+página. Antes de comparar con producción hay que repetir la medición con
+el navegador real.
+"""
+
+import argparse
+import csv
+import json
+import math
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_enhance_server import FakeEnhanceServer  # noqa: E402
+from job_pool import DONE  # noqa: E402
+from metrics import RunMetrics  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SAMPLE_RATE = 16000
+
+
+def make_wav(path, seconds, frequency):
+    """WAV mono de 16 bits con un tono (contenido distinto por archivo)"""
+    frames = int(SAMPLE_RATE * seconds)
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(b''.join(
+            struct.pack('<h', int(8000 * math.sin(2 * math.pi * frequency * i
+                                                  / SAMPLE_RATE)))
+            for i in range(frames)))
+
+
+def make_inputs(directory, count, seconds):
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(count):
+        path = directory / f"bench_{i:03d}.wav"
+        if not path.exists():
+            make_wav(path, seconds, 220 + i)
+        files.append(str(path))
+    return files
+
+
+def run_scenario(server, workdir, files, concurrency, quiet=True, extra=None):
+    """Un lote completo; devuelve sus números principales"""
+    name = f"{len(files)}f-c{concurrency}"
+    download_path = workdir / "downloads" / name
+    settings = {
+        'email': 'benchmark@example.com',
+        'password': 'benchmark',
+        'url': server.url,
+        'headless': True,
+        'profile_prefix': 'BenchProfile',
+        'download_path': str(download_path),
+        'speech_level': 70,
+        'background_level': 10,
+        'concurrency': concurrency,
+        'chunk_minutes': 0,
+        'retry_backoff_seconds': 1
+    }
+    settings.update(extra or {})
+    metrics = RunMetrics(f"bench-{time.strftime('%Y%m%d-%H%M%S')}-{name}",
+                         directory=workdir / "metrics")
+    download_path.mkdir(parents=True, exist_ok=True)
+    pipeline = Pipeline(settings,
+                        on_log=(lambda message: None) if quiet else print,
+                        cache=ResultCache(workdir / "cache" / name, max_bytes=0),
+                        metrics=metrics)
+
+    started = time.monotonic()
+    try:
+        jobs = pipeline.prepare_jobs(files)
+        pipeline.run(jobs)
+    finally:
+        if pipeline.pool:
+            pipeline.pool.shutdown()
+    wall = time.monotonic() - started
+
+    summary = metrics.summary()
+    done = sum(1 for job in jobs if job.status == DONE)
+    latencies = sorted(job.elapsed for job in jobs if job.elapsed is not None)
+    speeds = summary.get('throughput_mbps', {})
+    return {
+        'scenario': name,
+        'files': len(files),
+        'concurrency': concurrency,
+        'done': done,
+        'failed': len(files) - done,
+        'attempts': summary['attempts'],
+        'wall_seconds': round(wall, 2),
+        'files_per_minute': round(done * 60 / wall, 2) if wall else None,
+        'job_p50': round(latencies[len(latencies) // 2], 2) if latencies else None,
+        'job_p95': round(latencies[int(0.95 * (len(latencies) - 1))], 2) if latencies else None,
+        'browser_launch': round(summary['phases'].get('browser_launch', {}).get('mean', 0), 2),
+        'upload_mbps': round(speeds.get('upload', {}).get('mean', 0), 2),
+        'download_mbps': round(speeds.get('download', {}).get('mean', 0), 2),
+        'metrics_file': str(metrics.path)
+    }
+
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sin conexión")
+    parser.add_argument('--files', type=parse_list, default=[1, 10, 100],
+                        help="Tamaños de lote separados por comas")
+    parser.add_argument('--concurrency', type=parse_list, default=[1, 2, 4],
+                        help="Sesiones en paralelo separadas por comas")
+    parser.add_argument('--seconds', type=float, default=5,
+                        help="Duración de cada archivo sintético")
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help="Segundos de procesamiento simulado por archivo")
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--link-mbps', type=float, default=0,
+                        help="Enlace simulado de subida y descarga (0 = sin límite)")
+    parser.add_argument('--upload-limit', type=float, default=0,
+                        help="upload_limit_mbps del pipeline (0 = sin límite)")
+    parser.add_argument('--download-limit', type=float, default=0,
+                        help="download_limit_mbps del pipeline (0 = sin límite)")
+    parser.add_argument('--max-uploads', type=int, default=0,
+                        help="max_concurrent_uploads del pipeline (0 = sin límite)")
+    parser.add_argument('--workdir', type=Path,
+                        default=Path(tempfile.gettempdir()) / "AdobePodcastBenchmark")
+    parser.add_argument('--output', type=Path, default=RESULTS_DIR)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    server = FakeEnhanceServer(latency=args.latency, jitter=args.jitter,
+                               failure_rate=args.failure_rate,
+                               seed=args.seed, upload_mbps=args.link_mbps,
+                               download_mbps=args.link_mbps).start()
+    extra = {'upload_limit_mbps': args.upload_limit,
+             'download_limit_mbps': args.download_limit,
+             'max_concurrent_uploads': args.max_uploads}
+    print(f"Servicio simulado en {server.url}")
+
+    results = []
+    try:
+        for count in args.files:
+            files = make_inputs(args.workdir / "inputs", count, args.seconds)
+            for concurrency in args.concurrency:
+                if concurrency > count:
+                    continue
+                result = run_scenario(server, args.workdir, files, concurrency,
+                                      quiet=not args.verbose, extra=extra)
+                results.append(result)
+                print(f"{result['scenario']:>10}: {result['done']}/{count} en "
+                      f"{result['wall_seconds']:.1f}s "
+                      f"({result['files_per_minute']} archivos/min, "
+                      f"p50 {result['job_p50']}s, p95 {result['job_p95']}s, "
+                      f"subida {result['upload_mbps']} Mbit/s)")
+    finally:
+        server.stop()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    json_path = args.output / f"benchmark-{stamp}.json"
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'config': {k: str(v) if isinstance(v, Path) else v
+                              for k, v in vars(args).items()},
+                   'server': server.stats, 'results': results}, f, indent=2)
+    if results:
+        csv_path = json_path.with_suffix('.csv')
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    print(f"Resultados: {json_path}")
+    return 0 if all(r['failed'] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - División de grabaciones largas
+Corta el audio en segmentos solapados y los une con crossfade al volver
+"""
+
+from pathlib import Path
+
+import media
+
+# Valores por defecto (configurables en settings.json)
+CHUNK_MINUTES = 20
+CHUNK_OVERLAP_SECONDS = 2
+
+
+def plan_segments(duration, segment_seconds, overlap_seconds):
+    """
+    Lista de (inicio, duración) de cada segmento.
+
+    Cada segmento salvo el último se extiende `overlap_seconds` sobre el
+    siguiente; al unirlos, `acrossfade` consume exactamente ese solape y la
+    duración total vuelve a ser la original. Un resto final más corto que
+    medio segmento se añade al anterior para no generar trabajos mínimos.
+    """
+    starts = []
+    start = 0.0
+    while start < duration:
+        starts.append(start)
+        start += segment_seconds
+    if len(starts) > 1 and duration - starts[-1] < segment_seconds / 2:
+        starts.pop()
+
+    segments = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] + overlap_seconds if i + 1 < len(starts) else duration
+        segments.append((start, min(end, duration) - start))
+    return segments
+
+
+def split_audio(audio_path, segments, out_dir=None):
+    """Extrae cada segmento a un archivo independiente"""
+    audio_path = Path(audio_path)
+    out_dir = Path(out_dir) if out_dir else media.TEMP_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for i, (start, length) in enumerate(segments, 1):
+        part = out_dir / f"{media.unique_stem(audio_path)}_part{i:03d}{media.AUDIO_EXTENSION}"
+        media.run_ffmpeg([
+            '-ss', f"{start:.3f}",
+            '-t', f"{length:.3f}",
+            '-i', str(audio_path),
+            '-vn', '-ac', '1',
+            '-ar', str(media.AUDIO_SAMPLE_RATE),
+            '-c:a', media.AUDIO_CODEC,
+            '-b:a', media.AUDIO_BITRATE,
+            str(part)
+        ])
+        paths.append(part)
+    return paths
+
+
+def merge_segments(parts, overlap_seconds, output_path):
+    """Une los segmentos mejorados con un crossfade en cada frontera"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    args = []
+    for part in parts:
+        args += ['-i', str(part)]
+
+    if len(parts) == 1:
+        args += ['-map', '0:a:0']
+    elif overlap_seconds <= 0:
+        inputs = ''.join(f'[{i}:a]' for i in range(len(parts)))
+        args += ['-filter_complex', f"{inputs}concat=n={len(parts)}:v=0:a=1[out]",
+                 '-map', '[out]']
+    else:
+        chain = []
+        previous = '[0:a]'
+        for i in range(1, len(parts)):
+            label = f'[a{i}]'
+            chain.append(f"{previous}[{i}:a]acrossfade=d={overlap_seconds}"
+                         f":c1=tri:c2=tri{label}")
+            previous = label
+        args += ['-filter_complex', ';'.join(chain), '-map', previous]
+
+    args += ['-c:a', media.AUDIO_CODEC, '-b:a', media.AUDIO_BITRATE,
+             str(output_path)]
+    media.run_ffmpeg(args)
+    return output_path
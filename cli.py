@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Modo línea de comandos
+Procesa lotes sin interfaz gráfica (servidores, cron, carpetas compartidas)
+
+Uso:
+    python cli.py "clases/*.mp4" grabaciones/ --concurrency 3 -o salida/
+    python cli.py --watch /compartido/grabaciones
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from config import load_settings, load_credentials, load_accounts
+from job_pool import DONE, FAILED
+from job_store import JobStore
+from media import TEMP_DIR, VIDEO_EXTENSIONS
+from media_scan import MediaScanner, describe, estimate_batch, format_duration
+from metrics import describe_summary
+from pipeline import Pipeline
+from scheduler import POLICIES, PRIORITIES
+from watch_folder import FolderWatcher, ProcessedIndex
+
+# Códigos de salida
+EXIT_OK = 0
+EXIT_FAILED = 1   # Algún archivo no se pudo procesar
+EXIT_USAGE = 2    # Argumentos o configuración no válidos
+
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.aac', '.flac', '.ogg'}
+MEDIA_EXTENSIONS = VIDEO_EXTENSIONS | AUDIO_EXTENSIONS
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def expand_inputs(patterns, recursive=False):
+    """Archivos de medios a partir de rutas, globs y directorios"""
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=recursive) or [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.is_dir():
+                walker = path.rglob('*') if recursive else path.iterdir()
+                files.extend(sorted(p for p in walker if p.is_file()
+                                    and p.suffix.lower() in MEDIA_EXTENSIONS))
+            elif path.is_file():
+                files.append(path)
+    # Sin duplicados, conservando el orden
+    seen = set()
+    unique = []
+    for path in files:
+        key = str(path.resolve())
+        if key not in seen:
+            seen.add(key)
+            unique.append(str(path))
+    return unique
+
+
+def build_parser():
+    settings = load_settings()
+    parser = argparse.ArgumentParser(
+        description="Adobe Podcast Enhancer sin interfaz gráfica")
+    parser.add_argument('inputs', nargs='*',
+                        help="Archivos, globs o directorios a procesar")
+    parser.add_argument('-m', '--manifest',
+                        help="Archivo con una ruta por línea ('-' = stdin); los "
+                             "trabajos empiezan mientras se sigue leyendo")
+    parser.add_argument('-o', '--output-dir',
+                        default=settings['download_path'],
+                        help="Carpeta de descarga (por defecto la de settings.json)")
+    parser.add_argument('-c', '--concurrency', type=int,
+                        default=settings['concurrency'],
+                        help="Sesiones de navegador en paralelo")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Buscar también en subdirectorios")
+    parser.add_argument('--speech-level', type=int,
+                        default=settings['speech_level'])
+    parser.add_argument('--background-level', type=int,
+                        default=settings['background_level'])
+    parser.add_argument('--owner', default=settings['owner'] or None,
+                        help="Usuario del lote para el reparto justo de la cola "
+                             "(por defecto el del sistema)")
+    parser.add_argument('--priority', choices=list(PRIORITIES),
+                        default=settings['priority'])
+    parser.add_argument('--schedule', choices=POLICIES,
+                        default=settings['schedule_policy'],
+                        help="Orden dentro de cada usuario: fifo o sjf "
+                             "(primero el más corto)")
+    parser.add_argument('--email', default=os.environ.get('ADOBE_EMAIL'),
+                        help="Email de Adobe (o ADOBE_EMAIL / credentials.json)")
+    parser.add_argument('--url', help="URL alternativa de la página de mejora")
+    parser.add_argument('--show-browser', action='store_true',
+                        help="Mostrar la ventana de Chrome")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar los trabajos sin terminar del último lote")
+    parser.add_argument('-w', '--watch', action='store_true',
+                        help="Vigilar los directorios dados y procesar los "
+                             "archivos nuevos cuando terminen de copiarse")
+    parser.add_argument('--estimate', action='store_true',
+                        help="Solo analizar los archivos y estimar el lote, "
+                             "sin procesarlos")
+    parser.add_argument('--stable-seconds', type=int, default=15,
+                        help="Segundos sin cambios para considerar un archivo "
+                             "completo (modo --watch)")
+    return parser
+
+
+def build_settings(args):
+    """Configuración del pipeline a partir de settings.json y argumentos"""
+    settings = load_settings()
+    saved_email, saved_password = load_credentials()
+    settings.update({
+        "email": args.email or saved_email,
+        # La contraseña nunca se pasa como argumento (quedaría en el historial)
+        "password": os.environ.get('ADOBE_PASSWORD') or saved_password,
+        # Cuentas adicionales de config/accounts.json (se reparten los trabajos)
+        "accounts": load_accounts(),
+        "download_path": args.output_dir,
+        "speech_level": args.speech_level,
+        "background_level": args.background_level,
+        "concurrency": args.concurrency,
+        "owner": args.owner or "",
+        "priority": args.priority,
+        "schedule_policy": args.schedule,
+        "headless": not args.show_browser
+    })
+    if args.url:
+        settings["url"] = args.url
+    return settings
+
+
+def on_status(job):
+    if job.status == FAILED:
+        log(f">> [{job.name}] error: {job.error}")
+    elif job.status == DONE:
+        elapsed = f" en {job.elapsed:.0f}s" if job.elapsed else ""
+        output = f" → {job.output_path}" if job.output_path else ""
+        log(f">> [{job.name}] completado{elapsed}{output}")
+
+
+def estimate(files, concurrency):
+    """Imprime los metadatos de cada archivo y la estimación del lote"""
+    results = {}
+    MediaScanner().scan(files, on_done=lambda infos: results.update(infos=infos)).join()
+    infos = results['infos']
+    for info in infos:
+        log(f"   {describe(info)}")
+    batch = estimate_batch(infos, concurrency)
+    log(f">> {batch['files']} archivo(s), {format_duration(batch['duration'])} "
+        f"de audio, {batch['upload_bytes'] / (1024 * 1024):.0f} MB a subir")
+    log(f">> Tiempo estimado con {concurrency} sesión(es): "
+        f"~{format_duration(batch['seconds'])}")
+    return EXIT_OK
+
+
+def read_manifest(stream):
+    """Rutas de un manifiesto, una por línea (se ignoran vacías y comentarios #)"""
+    for line in stream:
+        path = line.strip()
+        if path and not path.startswith('#'):
+            yield path
+
+
+def run_manifest(args, pipeline):
+    """
+    Procesa los archivos del manifiesto a medida que se leen: el primero
+    abre el lote y los siguientes se suman a su cola con Pipeline.add(),
+    así un `find ... | cli.py -m -` empieza a subir sin esperar a la lista
+    completa. Devuelve (trabajos, éxito).
+    """
+    stream = sys.stdin if args.manifest == '-' else open(args.manifest, encoding='utf-8')
+    pipeline.prepare_batch()
+    jobs = []
+    runner = None
+    try:
+        paths = itertools.chain(expand_inputs(args.inputs, args.recursive),
+                                read_manifest(stream))
+        for path in paths:
+            if not Path(path).is_file():
+                log(f">> No existe, se omite: {path}")
+                continue
+            job = pipeline.prepare_job(path)
+            jobs.append(job)
+            if runner is not None and pipeline.add([job]):
+                continue
+            if runner is not None:
+                runner.join()
+            runner = threading.Thread(target=pipeline.run, args=([job],), daemon=True)
+            runner.start()
+            # Hasta que el lote arranca, add() no puede sumarle trabajos
+            while runner.is_alive() and not pipeline.running:
+                time.sleep(0.05)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if runner is not None:
+        while runner.is_alive():
+            runner.join(1)
+    return jobs, all(job.status == DONE for job in jobs)
+
+
+def watch(args, pipeline):
+    """Procesa indefinidamente los archivos nuevos de los directorios"""
+    directories = [Path(d) for d in args.inputs if Path(d).is_dir()]
+    if not directories:
+        log(">> --watch requiere al menos un directorio existente")
+        return EXIT_USAGE
+
+    index = ProcessedIndex()
+    watcher = FolderWatcher(directories, MEDIA_EXTENSIONS, index=index,
+                            recursive=args.recursive,
+                            stable_seconds=args.stable_seconds,
+                            exclude=[pipeline.download_path, TEMP_DIR])
+    watcher.start()
+    log(f">> Vigilando {len(directories)} directorio(s)... (Ctrl+C para salir)")
+    try:
+        for files in watcher.watch():
+            log(f">> {len(files)} archivo(s) nuevo(s)")
+            jobs = pipeline.prepare_jobs(files)
+            pipeline.run(jobs)
+            for job in jobs:
+                if job.status == DONE:
+                    index.add(job.source)
+            pipeline.store.compact()
+    except KeyboardInterrupt:
+        log(">> Vigilancia detenida")
+    finally:
+        watcher.stop()
+        if pipeline.pool:
+            pipeline.pool.shutdown()
+    return EXIT_OK
+
+
+def main(argv=None):
+    """Punto de entrada; devuelve el código de salida del lote"""
+    args = build_parser().parse_args(argv)
+    if args.estimate:
+        files = expand_inputs(args.inputs, args.recursive)
+        if not files:
+            log(">> No se encontraron archivos para procesar")
+            return EXIT_USAGE
+        return estimate(files, args.concurrency)
+
+    settings = build_settings(args)
+    if not settings['email'] or not settings['password']:
+        log(">> Faltan credenciales: usa ADOBE_EMAIL/ADOBE_PASSWORD "
+            "o guárdalas desde la interfaz gráfica")
+        return EXIT_USAGE
+
+    store = JobStore()
+    pipeline = Pipeline(settings, on_log=log, on_status=on_status,
+                        store=store)
+    if args.watch:
+        return watch(args, pipeline)
+    if args.manifest:
+        jobs = None
+    elif args.resume:
+        entries = [entry for entry in store.unfinished()
+                   if Path(entry['source']).exists()]
+        jobs = [pipeline.resume_job(entry) for entry in entries]
+        if not jobs:
+            log(">> No hay trabajos pendientes para reanudar")
+            return EXIT_OK
+    else:
+        files = expand_inputs(args.inputs, args.recursive)
+        if not files:
+            log(">> No se encontraron archivos para procesar")
+            return EXIT_USAGE
+        log(f">> {len(files)} archivo(s) encontrado(s)")
+        jobs = pipeline.prepare_jobs(files)
+
+    try:
+        if jobs is None:
+            jobs, success = run_manifest(args, pipeline)
+            if not jobs:
+                log(">> El manifiesto no contiene archivos")
+                return EXIT_USAGE
+        else:
+            success = pipeline.run(jobs)
+    except KeyboardInterrupt:
+        log(">> Interrumpido: usa --resume para continuar")
+        return EXIT_FAILED
+    finally:
+        if pipeline.pool:
+            pipeline.pool.shutdown()
+    store.compact()
+
+    failed = [job for job in jobs if job.status == FAILED]
+    log(f">> {len(jobs) - len(failed)}/{len(jobs)} archivo(s) procesado(s)")
+    for line in describe_summary(pipeline.metrics.summary()):
+        log(f"   {line}")
+    log(f">> Métricas del lote: {pipeline.metrics.path}")
+    return EXIT_OK if success else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Configuración compartida
+Rutas y carga de settings.json / credentials.json / accounts.json sin
+depender de Tkinter
+"""
+
+import base64
+import json
+from pathlib import Path
+
+CONFIG_DIR = Path(__file__).parent / "config"
+CONFIG_DIR.mkdir(exist_ok=True)
+CONFIG_FILE = CONFIG_DIR / "settings.json"
+CREDENTIALS_FILE = CONFIG_DIR / "credentials.json"
+ACCOUNTS_FILE = CONFIG_DIR / "accounts.json"
+JOBS_FILE = CONFIG_DIR / "jobs.jsonl"
+
+DEFAULT_SETTINGS = {
+    "download_path": str(Path.home() / "Downloads" / "AdobePodcast"),
+    "auto_download": True,
+    "keep_original": True,
+    "speech_level": 70,
+    "background_level": 10,
+    "concurrency": 1,
+    "account_jobs_per_hour": 0,
+    "owner": "",
+    "priority": "normal",
+    "schedule_policy": "fifo",
+    "cache_max_gb": 20,
+    "chunk_minutes": 20,
+    "chunk_overlap_seconds": 2,
+    "retry_attempts": 3,
+    "retry_backoff_seconds": 30,
+    "upload_timeout": 300,
+    "processing_timeout": 900,
+    "download_timeout": 300,
+    "breaker_threshold": 5,
+    "breaker_cooldown_seconds": 120,
+    "local_mode": "off",
+    "local_latency_threshold": 600,
+    "local_workers": 0,
+    "post_loudness": None,
+    "post_sample_rate": 0,
+    "post_format": "",
+    "remux_video": True,
+    "post_workers": 2,
+    "vad_trim": False,
+    "vad_min_silence_seconds": 3,
+    "vad_padding_seconds": 0.5,
+    "vad_threshold_db": 12,
+    "max_in_flight_mb": 2048,
+    "max_concurrent_uploads": 0,
+    "upload_limit_mbps": 0,
+    "download_limit_mbps": 0,
+    "temp_max_gb": 10,
+    "min_free_disk_mb": 1024,
+    "browser_recycle_jobs": 50,
+    "browser_memory_mb": 2048,
+    "profile_max_mb": 1024,
+    "artifact_retention_days": 7
+}
+
+
+def load_settings():
+    """settings.json combinado con los valores por defecto"""
+    settings = dict(DEFAULT_SETTINGS)
+    if CONFIG_FILE.exists():
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def save_settings(settings):
+    """Guarda settings.json"""
+    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2, ensure_ascii=False)
+
+
+def load_credentials():
+    """Devuelve (email, password) guardados, o ("", "") si no se recuerdan"""
+    if not CREDENTIALS_FILE.exists():
+        return "", ""
+    with open(CREDENTIALS_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not data.get("remember"):
+        return "", ""
+    email_b64 = data.get("email", "")
+    password_b64 = data.get("password", "")
+    return (base64.b64decode(email_b64).decode('utf-8') if email_b64 else "",
+            base64.b64decode(password_b64).decode('utf-8') if password_b64 else "")
+
+
+def save_credentials(email, password, remember):
+    """Guarda las credenciales (base64) o las borra si no se recuerdan"""
+    if remember:
+        data = {
+            "email": base64.b64encode(email.encode('utf-8')).decode('utf-8'),
+            "password": base64.b64encode(password.encode('utf-8')).decode('utf-8'),
+            "remember": True
+        }
+    else:
+        data = {"email": "", "password": "", "remember": False}
+
+    with open(CREDENTIALS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def load_accounts():
+    """Cuentas adicionales de accounts.json (lista de dicts, ver accounts.py)"""
+    if not ACCOUNTS_FILE.exists():
+        return []
+    with open(ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    accounts = []
+    for entry in data:
+        entry = dict(entry)
+        entry["password"] = base64.b64decode(entry.get("password", "")).decode('utf-8')
+        accounts.append(entry)
+    return accounts
+
+
+def save_accounts(accounts):
+    """Guarda las cuentas adicionales (contraseñas en base64, como credentials.json)"""
+    data = []
+    for entry in accounts:
+        entry = dict(entry)
+        entry["password"] = base64.b64encode(
+            entry.get("password", "").encode('utf-8')).decode('utf-8')
+        data.append(entry)
+    with open(ACCOUNTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,818 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Pool de workers
+Procesa los archivos en paralelo con N sesiones de navegador independientes
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import media
+import protocol
+from accounts import AccountPool
+from bandwidth import BandwidthManager, describe_rate, rate
+from node_worker import NodeWorker, WorkerError
+from resources import ResourceGovernor, ResourceError
+from retries import RetryPolicy, CircuitBreaker, PHASE_TIMEOUTS
+from scheduler import JobScheduler
+
+# Estados de un trabajo
+QUEUED = 'queued'
+UPLOADING = 'uploading'
+PROCESSING = 'processing'
+DOWNLOADING = 'downloading'
+DONE = 'done'
+FAILED = 'failed'
+# Asignado por el pipeline entre la descarga verificada y el resultado final
+POSTPROCESSING = 'postprocessing'
+
+# Fases reportadas por automation.js con eventos "phase"
+PHASES = (UPLOADING, PROCESSING, DOWNLOADING)
+
+# Tramo del progreso total (0-100) que ocupa cada fase
+PHASE_SPANS = {
+    UPLOADING: (0, 20),
+    PROCESSING: (20, 90),
+    DOWNLOADING: (90, 100)
+}
+
+MAX_CONCURRENCY = 5
+HEALTH_INTERVAL = 60
+
+# Margen sobre el límite de fase de automation.js antes de matar el worker
+PHASE_GRACE = 30
+
+# Mejora local de respaldo (local_mode: off / auto / always)
+LOCAL = 'local'
+LOCAL_LATENCY_THRESHOLD = 600
+LOCAL_RECHECK_SECONDS = 5
+LATENCY_SMOOTHING = 0.3
+
+# Un carril cede un trabajo a otra cuenta menos cargada y lo reintenta tras esto
+LANE_YIELD_SECONDS = 0.2
+
+
+class Job:
+    """Un archivo a procesar y su estado dentro del pool"""
+
+    def __init__(self, source, upload_path=None, job_id=None, cache_key=None):
+        self.id = job_id or uuid.uuid4().hex[:8]
+        self.source = str(source)
+        self.upload_path = str(upload_path or source)
+        self.cache_key = cache_key
+        self.output_path = None
+        self.downloaded_path = None
+        self.parent = None
+        self.parts = []
+        self.status = QUEUED
+        self.error = None
+        self.worker = None
+        self.started_at = None
+        self.finished_at = None
+        self.percent = 0
+        self.bytes = None
+        self.output_bytes = None
+        self.timings = {}
+        self.phase_started = {}
+        self.attempts = 0
+        # Planificación (ver scheduler.py)
+        self.owner = None
+        self.priority = 0
+        self.estimate = None  # Segundos de audio, si se conocen
+        self.held = False
+        self.levels = None  # (speech, background) del lote; None = los del pool
+        self.seq = 0
+        self.rank = 0
+        # Silencios recortados antes de subir (ver vad.py)
+        self.edit_map = None
+        self.account = None  # Cuenta de Adobe del intento en curso
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'upload_path': self.upload_path,
+            'cache_key': self.cache_key,
+            'parent': self.parent.id if self.parent else None,
+            'status': self.status,
+            'error': self.error,
+            'owner': self.owner,
+            'priority': self.priority,
+            'edit_map': self.edit_map,
+            'estimate': self.estimate,
+            'output_path': str(self.output_path) if self.output_path else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye un trabajo guardado, de nuevo en cola"""
+        job = cls(data['source'], data.get('upload_path'), data['id'],
+                  data.get('cache_key'))
+        job.owner = data.get('owner')
+        job.priority = data.get('priority', 0)
+        job.estimate = data.get('estimate')
+        if data.get('output_path'):
+            job.output_path = Path(data['output_path'])
+        if data.get('edit_map'):
+            job.edit_map = [tuple(cut) for cut in data['edit_map']]
+        return job
+
+    @property
+    def name(self):
+        return Path(self.source).name
+
+    @property
+    def elapsed(self):
+        """Segundos de procesamiento (o None si no ha empezado)"""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobPool:
+    """
+    Cola compartida de trabajos atendida por N workers persistentes.
+
+    Cada worker es un `automation.js --serve` con su propio perfil de Chrome,
+    de modo que las sesiones no compiten por el bloqueo del directorio de
+    perfil. Los workers sobreviven entre lotes: el navegador y la sesión
+    quedan abiertos hasta `shutdown()`, y se relanzan si dejan de responder.
+    `on_log(job, mensaje)`, `on_status(job)` y `on_progress(job)` se llaman
+    desde los threads de los workers (job es None para mensajes del worker).
+    Si se pasa un `store`, cada transición queda registrada en disco para
+    poder reanudar el lote.
+
+    `verify(job)`, si se asigna, comprueba el resultado descargado antes de
+    dar el trabajo por terminado y devuelve el motivo del rechazo (o None).
+    Un trabajo fallido vuelve a la cola tras un backoff (ver retries.py) en
+    lugar de dar el lote por perdido, y si el servicio falla repetidamente
+    el cortacircuitos pausa a todos los workers.
+
+    Con `local_mode` en "auto", unos carriles locales (local_enhancer.py,
+    en procesos aparte) toman trabajos de la misma cola mientras el
+    cortacircuitos esté abierto o Adobe tarde más de
+    `local_latency_threshold` segundos por trabajo; con "always" todo se
+    procesa localmente.
+
+    La cola es un JobScheduler (prioridades, reparto justo entre usuarios,
+    SJF opcional con `schedule_policy`). Se pueden añadir trabajos con
+    `submit()` mientras `run()` está en marcha: los workers los atienden
+    en el mismo lote, y `pause()`, `hold()` y `move()` reordenan o
+    detienen la cola en caliente.
+
+    Con varias cuentas (ver accounts.py) cada una tiene `concurrency`
+    workers (o los `sessions` de la cuenta) con perfiles propios. Un
+    trabajo libre va al carril inactivo de la cuenta menos cargada, y una
+    cuenta que llega a su límite por hora o falla repetidamente deja de
+    tomar trabajos sin frenar a las demás.
+
+    `resources` (ver resources.py) limita los bytes subiéndose a la vez,
+    comprueba el espacio en disco antes de cada trabajo y recicla los
+    navegadores tras N trabajos o si consumen demasiada memoria.
+    `bandwidth` (ver bandwidth.py) da los turnos de subida y reparte el
+    límite de subida y descarga entre los navegadores.
+    """
+
+    def __init__(self, settings, concurrency=1, on_log=None, on_status=None,
+                 store=None, on_progress=None):
+        self.settings = settings
+        self.concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+        self.on_log = on_log or (lambda job, message: None)
+        self.on_status = on_status or (lambda job: None)
+        self.on_progress = on_progress or (lambda job: None)
+        self.store = store
+        self.verify = None
+        self.workers = {}
+        self.retry_policy = RetryPolicy.from_settings(settings)
+        self.breaker = CircuitBreaker.from_settings(
+            settings, on_change=lambda state, message: self.on_log(None, message))
+        self.resources = ResourceGovernor(
+            settings, on_log=lambda message: self.on_log(None, message))
+        self.bandwidth = BandwidthManager(
+            settings, apply=self._throttle,
+            on_log=lambda message: self.on_log(None, message))
+        self.queue = JobScheduler(settings.get('schedule_policy', 'fifo'))
+        self.accounts = AccountPool.from_settings(settings)
+        self._lanes = {}  # clave del carril -> thread en marcha
+        self._idle = set()  # carriles remotos esperando trabajo
+        self._delayed = []  # heap de (instante, orden, job) para reintentos
+        self._order = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._health_thread = None
+        self._lock = threading.Lock()
+        self._executor = None
+        self._remote_jobs = set()
+        self.remote_latency = None  # Media móvil de segundos por trabajo en Adobe
+
+    def submit(self, job):
+        """Encola un trabajo"""
+        with self._cond:
+            self.queue.push(job)
+            self._cond.notify()
+        if self.store:
+            self.store.record(job)
+        self.on_status(job)
+        return job
+
+    def add(self, jobs):
+        """Añade trabajos al lote en curso (o al siguiente) y arranca carriles"""
+        for job in jobs:
+            self.submit(job)
+        self._start_lanes()
+
+    def run(self, jobs=()):
+        """
+        Encola los trabajos dados y bloquea hasta que la cola se vacía
+        (incluidos los añadidos con `add()` mientras tanto).
+        """
+        self._stopped.clear()
+        with self._cond:
+            # Descartar lo que quedó en cola si el lote anterior se detuvo
+            self.queue.clear()
+            self._delayed.clear()
+            self.queue.set_policy(self.settings.get('schedule_policy', 'fifo'))
+        jobs = list(jobs)
+        for job in jobs:
+            self.submit(job)
+        self._start_lanes()
+        self.wait_idle()
+        return all(job.status == DONE for job in jobs)
+
+    def _busy(self):
+        return bool(self._in_flight or self._lanes or (
+            not self._stopped.is_set() and (self.queue or self._delayed)))
+
+    def idle(self):
+        """True si no queda nada en cola ni en curso (o el lote se detuvo)"""
+        with self._cond:
+            return not self._busy()
+
+    def wait_idle(self):
+        """Bloquea hasta que idle()"""
+        with self._cond:
+            while self._busy():
+                self._cond.wait(1)
+
+    def _start_lanes(self):
+        """Arranca los carriles (workers y procesos locales) que falten"""
+        local = self.local_lanes()
+        with self._cond:
+            pending = len(self.queue) + len(self._delayed)
+            lanes = [(LOCAL, i) for i in range(min(local, pending))]
+            if not (lanes and self.local_mode() == 'always'):
+                lanes += list(range(min(len(self.remote_lanes()), max(1, pending))))
+            for key in lanes:
+                if key in self._lanes:
+                    continue
+                if isinstance(key, tuple):
+                    thread = threading.Thread(target=self._local_loop, args=(key,),
+                                              daemon=True)
+                else:
+                    thread = threading.Thread(target=self._worker_loop, args=(key,),
+                                              daemon=True)
+                self._lanes[key] = thread
+                thread.start()
+
+    def queued_jobs(self, limit=None):
+        """Trabajos en espera, en el orden en que se atenderán (los `limit` primeros)"""
+        with self._cond:
+            return self.queue.snapshot(limit)
+
+    def queue_view(self, limit=None):
+        """
+        (trabajos en espera hasta `limit`, total en espera, cola en pausa),
+        leídos a la vez bajo el lock para la vista de la cola
+        """
+        with self._cond:
+            return self.queue.snapshot(limit), len(self.queue), self.queue.paused
+
+    @property
+    def paused(self):
+        with self._cond:
+            return self.queue.paused
+
+    def pause(self, paused=True):
+        """Pausa (o reanuda) la entrega de trabajos; los que están en curso siguen"""
+        with self._cond:
+            self.queue.paused = paused
+            self._cond.notify_all()
+        self.on_log(None, ">> Cola en pausa" if paused else ">> Cola reanudada")
+
+    def hold(self, job, held=True):
+        """Retiene (o libera) un trabajo en espera"""
+        with self._cond:
+            self.queue.hold(job, held)
+            self._cond.notify_all()
+        self.on_status(job)
+
+    def move(self, job, offset):
+        """Adelanta o retrasa un trabajo en espera (ver JobScheduler.move)"""
+        with self._cond:
+            return self.queue.move(job, offset)
+
+    def reload_accounts(self):
+        """
+        Relee las cuentas de settings. Los workers inactivos que ya no
+        corresponden a ningún carril se cierran; los carriles que pasan a
+        otra cuenta relanzan su worker al tomar el siguiente trabajo.
+        """
+        with self._cond:
+            self.accounts.update(self.settings)
+            lanes = self.remote_lanes()
+            self._cond.notify_all()
+        with self._lock:
+            stale = [self.workers.pop(index) for index, worker in list(self.workers.items())
+                     if index >= len(lanes) and not worker.busy]
+        for worker in stale:
+            worker.stop()
+            self.resources.trim_profile(worker.profile)
+
+    def remote_lanes(self):
+        """(cuenta, navegador) de cada carril remoto; el índice es el del worker"""
+        return self.accounts.lanes(self.concurrency)
+
+    def worker(self, index):
+        """Worker `index`, creándolo si aún no existe"""
+        account, slot = self.remote_lanes()[index]
+        stale = None
+        with self._lock:
+            worker = self.workers.get(index)
+            if worker and (worker.account is not account or worker.slot != slot):
+                # Las cuentas cambiaron: el carril ahora es de otra
+                stale = self.workers.pop(index)
+            if index not in self.workers:
+                self.workers[index] = NodeWorker(
+                    self.settings, index,
+                    on_log=lambda message: self.on_log(None, message),
+                    account=account, slot=slot)
+            worker = self.workers[index]
+        if stale:
+            stale.stop()
+        return worker
+
+    def warm_up(self):
+        """Arranca en segundo plano los workers (navegador + login)"""
+        def start(index):
+            try:
+                self.worker(index).ensure_alive()
+            except WorkerError as e:
+                self.on_log(None, f">> Worker {index + 1}: {e}")
+
+        for index in range(len(self.remote_lanes())):
+            threading.Thread(target=start, args=(index,), daemon=True).start()
+        self.start_health_checks()
+
+    def start_health_checks(self, interval=HEALTH_INTERVAL):
+        """Comprueba periódicamente los workers inactivos y relanza los caídos"""
+        if self._health_thread and self._health_thread.is_alive():
+            return
+
+        def loop():
+            while not self._stopped.wait(interval):
+                for worker in list(self.workers.values()):
+                    if worker.busy or worker.process is None:
+                        continue
+                    try:
+                        worker.ensure_alive()
+                    except WorkerError as e:
+                        self.on_log(None, f">> Worker {worker.index + 1}: {e}")
+
+        self._health_thread = threading.Thread(target=loop, daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        """Deja de tomar trabajos de la cola"""
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def shutdown(self):
+        """Detiene los workers y cierra sus navegadores"""
+        self.stop()
+        for worker in list(self.workers.values()):
+            worker.stop()
+            self.resources.trim_profile(worker.profile)
+        self.workers.clear()
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown()
+                self._executor = None
+
+    def local_mode(self):
+        mode = self.settings.get('local_mode', 'off')
+        return mode if mode in ('auto', 'always') else 'off'
+
+    def local_lanes(self):
+        """Procesos de mejora local para este lote (0 si está desactivada)"""
+        if self.local_mode() == 'off':
+            return 0
+        # Importado aquí: carga NumPy, que sin mejora local sobra al arrancar
+        import local_enhancer
+        if not local_enhancer.available():
+            self.on_log(None, ">> Mejora local no disponible: instala NumPy "
+                              "(pip install numpy)")
+            return 0
+        return int(self.settings.get('local_workers') or
+                   local_enhancer.default_workers())
+
+    def prefer_local(self):
+        """True si ahora conviene procesar localmente en lugar de en Adobe"""
+        mode = self.local_mode()
+        if mode != 'auto':
+            return mode == 'always'
+        if self.breaker.state == self.breaker.OPEN:
+            return True
+        # Los trabajos aún en curso también cuentan: un servicio colgado
+        # no termina ninguno y la media no llegaría a subir
+        latencies = [job.elapsed for job in list(self._remote_jobs)
+                     if job.elapsed is not None]
+        if self.remote_latency is not None:
+            latencies.append(self.remote_latency)
+        threshold = self.settings.get('local_latency_threshold',
+                                      LOCAL_LATENCY_THRESHOLD)
+        return bool(latencies) and max(latencies) > threshold
+
+    def _next_job(self, lane, local=False):
+        """
+        Siguiente trabajo listo, esperando a reintentos pendientes, a que se
+        cierre el cortacircuitos o a que se reanude la cola. None cuando ya
+        no queda nada por hacer (el carril `lane` se da de baja).
+        Los carriles locales (`local`) solo toman trabajos si prefer_local().
+        """
+        with self._cond:
+            if not local:
+                self._idle.add(lane)
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self.queue.push(heapq.heappop(self._delayed)[2])
+
+                account = None
+                if not local:
+                    lanes = self.remote_lanes()
+                    if lane >= len(lanes):
+                        break  # Sobra tras cambiar las cuentas o la concurrencia
+                    account = lanes[lane][0]
+
+                if self.queue:
+                    if local:
+                        wait = 0 if self.prefer_local() else LOCAL_RECHECK_SECONDS
+                    else:
+                        wait = self._remote_wait(lane, lanes)
+                    if not wait:
+                        job = self.queue.pop()
+                        if job:
+                            self._in_flight += 1
+                            self._idle.discard(lane)
+                            if account:
+                                account.started()
+                                job.account = account
+                            if not local:
+                                # La prueba del cortacircuitos solo se gasta
+                                # con un trabajo real
+                                self.breaker.claim_probe(job)
+                            return job
+                        # Cola en pausa o todo retenido: esperar a un cambio
+                        wait = self._delayed[0][0] - now if self._delayed else None
+                elif self._delayed:
+                    wait = self._delayed[0][0] - now
+                elif self._in_flight:
+                    # Un trabajo en curso aún puede volver como reintento
+                    wait = None
+                else:
+                    break
+                self._cond.wait(wait)
+            # Baja bajo el mismo bloqueo: un add() posterior arranca otro carril
+            self._lanes.pop(lane, None)
+            self._idle.discard(lane)
+            self._cond.notify_all()
+            return None
+
+    def _remote_wait(self, lane, lanes):
+        """
+        Segundos que el carril remoto `lane` debe esperar antes de tomar un
+        trabajo: límites de su cuenta, otra cuenta menos cargada con un
+        carril libre (que se despierta para tomarlo) y el cortacircuitos.
+        """
+        account = lanes[lane][0]
+        wait = account.wait_time()
+        if wait:
+            return wait
+
+        def key(index):
+            return (lanes[index][0].load(self.concurrency), index)
+
+        for other in self._idle:
+            if (other != lane and other < len(lanes) and key(other) < key(lane)
+                    and not lanes[other][0].wait_time()):
+                self._cond.notify_all()
+                return LANE_YIELD_SECONDS
+        return self.breaker.wait_time()
+
+    def _job_finished(self, job):
+        """Reencola con backoff un trabajo fallido si le quedan intentos"""
+        retry = (job.status == FAILED and not self._stopped.is_set()
+                 and Path(job.upload_path).exists()
+                 and self.retry_policy.should_retry(job.attempts))
+        if retry:
+            delay = self.retry_policy.delay(job.attempts)
+            self.on_log(job, f">> Reintento {job.attempts + 1}/"
+                             f"{self.retry_policy.attempts} en {delay:.0f}s: "
+                             f"{job.error}")
+            job.percent = 0
+            self._set_status(job, QUEUED, job.error)
+        with self._cond:
+            if job.account:
+                job.account.finished()
+                job.account = None
+            if retry:
+                heapq.heappush(self._delayed, (time.monotonic() + delay,
+                                               next(self._order), job))
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _worker_loop(self, index):
+        while True:
+            job = self._next_job(index)
+            if job is None:
+                return
+            try:
+                self._run_job(job, index)
+            finally:
+                # Si era la prueba del cortacircuitos y terminó sin resultado
+                # del servicio (sin disco, lote detenido), otro la retoma
+                self.breaker.release_probe(job)
+                self._job_finished(job)
+            worker = self.workers.get(index)
+            if worker and not self._stopped.is_set():
+                self.resources.maybe_recycle(worker)
+
+    def _local_loop(self, lane):
+        while True:
+            job = self._next_job(lane, local=True)
+            if job is None:
+                return
+            try:
+                self._run_local(job)
+            finally:
+                self._job_finished(job)
+
+    def _local_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.local_lanes())
+            return self._executor
+
+    def _run_local(self, job):
+        """Procesa un trabajo con local_enhancer en el pool de procesos"""
+        import local_enhancer
+        job.worker = LOCAL
+        job.attempts += 1
+        job.timings = {}
+        job.phase_started = {PROCESSING: time.time()}
+        if job.started_at is None:
+            job.started_at = time.time()
+        output = (Path(self.settings['download_path'])
+                  / f"{media.unique_stem(job.upload_path)}_enhanced"
+                    f"{local_enhancer.LOCAL_EXTENSION}")
+        self.on_log(job, ">> Procesando localmente")
+        self._set_status(job, PROCESSING)
+        started = time.monotonic()
+        try:
+            self.resources.check_disk()
+            job.bytes = Path(job.upload_path).stat().st_size
+            future = self._local_executor().submit(
+                local_enhancer.enhance_file, job.upload_path, str(output),
+                *self.levels(job))
+            job.downloaded_path = future.result()
+            job.timings[LOCAL] = time.monotonic() - started
+            job.output_bytes = output.stat().st_size
+            problem = self.verify(job) if self.verify else None
+            if problem:
+                self._set_status(job, FAILED, problem)
+            else:
+                self._set_status(job, DONE)
+        except BrokenProcessPool as e:
+            # Un proceso murió (p. ej. sin memoria): el siguiente intento crea otro pool
+            with self._lock:
+                self._executor = None
+            self._set_status(job, FAILED, f"Mejora local: {e}")
+        except Exception as e:
+            self._set_status(job, FAILED, f"Mejora local: {e}")
+
+    def _set_status(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        if status == UPLOADING and job.started_at is None:
+            job.started_at = time.time()
+        elif status in (DONE, FAILED):
+            job.finished_at = time.time()
+            if status == DONE:
+                job.percent = 100
+        if status in PHASE_SPANS:
+            job.percent = max(job.percent, PHASE_SPANS[status][0])
+        if self.store:
+            self.store.record(job)
+        self.on_status(job)
+
+    def job_message(self, job):
+        """Mensaje "job" para el worker, con los ajustes actuales"""
+        settings = self.settings
+        return {
+            'id': job.id,
+            'file': job.upload_path,
+            'download_path': settings['download_path'],
+            'speech_level': self.levels(job)[0],
+            'background_level': self.levels(job)[1],
+            # Nombre determinista de la descarga: <nombre subido>_<hash>_enhanced.<ext>
+            'output_stem': f"{media.unique_stem(job.upload_path)}_enhanced",
+            'timeouts': {phase: int(seconds * 1000)
+                         for phase, seconds in self.phase_timeouts().items()}
+        }
+
+    def levels(self, job):
+        """Speech y background con los que se procesa el trabajo"""
+        return job.levels or (self.settings['speech_level'],
+                              self.settings['background_level'])
+
+    def phase_timeouts(self):
+        """Límite en segundos de cada fase según la configuración"""
+        settings = self.settings
+        return {
+            UPLOADING: settings.get('upload_timeout', PHASE_TIMEOUTS[UPLOADING]),
+            PROCESSING: settings.get('processing_timeout', PHASE_TIMEOUTS[PROCESSING]),
+            DOWNLOADING: settings.get('download_timeout', PHASE_TIMEOUTS[DOWNLOADING])
+        }
+
+    def _handle_event(self, job, event, outcome):
+        """Aplica un evento de automation.js al estado del trabajo"""
+        kind = event.get('event')
+        if kind == protocol.PHASE:
+            previous = event.get('previous')
+            if previous in PHASES and event.get('previous_ms') is not None:
+                job.timings[previous] = event['previous_ms'] / 1000
+            if event.get('bytes') is not None:
+                job.bytes = event['bytes']
+            outcome['phase_ts'] = event.get('ts')
+            phase = event.get('phase')
+            if phase in PHASES and event.get('ts'):
+                job.phase_started[phase] = event['ts'] / 1000
+            if phase in PHASES and phase != job.status:
+                outcome['phase_started'] = time.monotonic()
+                self._set_status(job, phase)
+                # Subida terminada: el turno pasa a otro trabajo mientras
+                # este espera al servidor
+                if phase != UPLOADING:
+                    self.bandwidth.release_upload(job.worker)
+                    self._release_in_flight(outcome)
+                if phase == DOWNLOADING:
+                    self.bandwidth.start_download(job.worker)
+        elif kind == protocol.PROGRESS:
+            span = PHASE_SPANS.get(event.get('phase'))
+            if span:
+                low, high = span
+                percent = low + (high - low) * event.get('percent', 0) / 100
+                job.percent = max(job.percent, percent)
+                self.on_progress(job)
+        elif kind == protocol.ERROR:
+            outcome['error'] = event.get('message')
+            self.on_log(job, f"Error ({event.get('phase')}): "
+                             f"{event.get('message')}")
+        elif kind == protocol.DONE:
+            # Duración de la última fase (la cierra el evento done)
+            if outcome.get('phase_ts') and event.get('ts'):
+                job.timings[job.status] = (event['ts'] - outcome['phase_ts']) / 1000
+            if event.get('output'):
+                job.downloaded_path = event['output']
+            if event.get('output_bytes') is not None:
+                job.output_bytes = event['output_bytes']
+            outcome['success'] = bool(event.get('success'))
+            outcome['failed_phase'] = event.get('failed_phase')
+        elif kind in (protocol.LOG, protocol.STDERR):
+            self.on_log(job, event.get('message', ''))
+
+    def _record_account(self, job, success):
+        """Resultado de un trabajo para la cuenta que lo procesó"""
+        account = job.account
+        if account is None:
+            return
+        pause = 0
+        with self._cond:
+            if success:
+                account.record_success()
+            elif len(self.accounts) > 1:
+                # Con una sola cuenta ya la detiene el cortacircuitos global
+                pause = account.record_failure()
+        if pause:
+            self.on_log(None, f">> Cuenta {account.email} en pausa {pause:.0f}s "
+                              "por fallos seguidos; siguen las demás")
+
+    def _throttle(self, index, upload, download):
+        """Envía al navegador del worker su parte del ancho de banda"""
+        worker = self.workers.get(index)
+        if worker is not None and worker.alive:
+            worker.throttle(upload, download)
+
+    def _log_throughput(self, job):
+        """Velocidad conseguida en cada transferencia del trabajo"""
+        parts = []
+        for label, size, phase in (('subida', job.bytes, UPLOADING),
+                                   ('descarga', job.output_bytes, DOWNLOADING)):
+            speed = rate(size, job.timings.get(phase))
+            if speed:
+                parts.append(f"{label} {size / (1024 * 1024):.1f} MB a {describe_rate(speed)}")
+        if parts:
+            self.on_log(job, ">> Transferencia: " + ", ".join(parts))
+
+    def _release_in_flight(self, outcome):
+        """Devuelve los bytes en vuelo del trabajo (una sola vez)"""
+        size = outcome.pop('in_flight', None)
+        if size is not None:
+            self.resources.release(size)
+
+    def _record_latency(self, seconds):
+        if self.remote_latency is None:
+            self.remote_latency = seconds
+        else:
+            self.remote_latency += LATENCY_SMOOTHING * (seconds - self.remote_latency)
+
+    def _run_job(self, job, index):
+        job.worker = index
+        job.attempts += 1
+        job.timings = {}
+        job.phase_started = {}
+        outcome = {'success': False, 'error': None, 'started': time.monotonic()}
+        timeouts = self.phase_timeouts()
+
+        def expired():
+            # Red de seguridad si automation.js no respeta su propio límite
+            limit = timeouts.get(job.status)
+            started = outcome.get('phase_started')
+            return (limit is not None and started is not None
+                    and time.monotonic() - started > limit + PHASE_GRACE)
+
+        try:
+            size = Path(job.upload_path).stat().st_size
+        except OSError:
+            size = 0
+        try:
+            self.resources.check_disk()
+        except ResourceError as e:
+            # No es un fallo del servicio: no cuenta para el cortacircuitos
+            self._set_status(job, FAILED, str(e))
+            return
+        if not self.resources.acquire(size, self._stopped):
+            self._set_status(job, QUEUED)
+            return
+        outcome['in_flight'] = size
+
+        try:
+            worker = self.worker(index)
+            worker.ensure_alive()
+            if not self.bandwidth.acquire_upload(index, size, self._stopped):
+                self._set_status(job, QUEUED)
+                return
+            # La espera del turno de subida no cuenta como latencia de Adobe
+            outcome['started'] = outcome['phase_started'] = time.monotonic()
+            self._set_status(job, UPLOADING)
+            self._remote_jobs.add(job)
+            try:
+                worker.run_job(self.job_message(job),
+                               lambda event: self._handle_event(job, event, outcome),
+                               expired=expired)
+            finally:
+                self._remote_jobs.discard(job)
+                self.bandwidth.finish(index)
+
+            if outcome['success'] and self.verify:
+                problem = self.verify(job)
+                if problem:
+                    outcome.update(success=False, error=problem,
+                                   failed_phase=DOWNLOADING)
+            if outcome['success']:
+                self.breaker.record_success()
+                self._record_account(job, True)
+                self._record_latency(time.monotonic() - outcome['started'])
+                self._log_throughput(job)
+                self._set_status(job, DONE)
+            else:
+                self.breaker.record_failure()
+                self._record_account(job, False)
+                error = outcome['error'] or "El archivo no se pudo procesar"
+                if outcome.get('failed_phase'):
+                    error = f"{error} (fase {outcome['failed_phase']})"
+                self._set_status(job, FAILED, error)
+        except Exception as e:
+            self.breaker.record_failure()
+            self._record_account(job, False)
+            self._set_status(job, FAILED, str(e))
+        finally:
+            self._release_in_flight(outcome)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Registro persistente de trabajos
+Log JSONL de solo-anexado para reanudar un lote tras un cierre inesperado
+"""
+
+import json
+import threading
+import time
+
+from config import JOBS_FILE
+from job_pool import DONE
+
+
+class JobStore:
+    """
+    Guarda cada cambio de estado de un trabajo como una línea JSON.
+
+    Anexar una línea por transición es barato y sobrevive a un cierre
+    abrupto (como mucho se pierde la última línea a medio escribir). Al
+    cargar, el último registro de cada id es el estado vigente.
+    """
+
+    def __init__(self, path=JOBS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, job):
+        """Anexa el estado actual de un trabajo"""
+        entry = dict(job.to_dict(), ts=time.time())
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def load(self):
+        """Devuelve {id: último registro} reproduciendo el log"""
+        with self._lock:
+            return self._read()
+
+    def _read(self):
+        records = {}
+        if not self.path.exists():
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Línea truncada por un cierre abrupto
+                records[entry['id']] = entry
+        return records
+
+    @staticmethod
+    def _unfinished(records):
+        parts = {}
+        for entry in records.values():
+            if entry.get('parent'):
+                parts.setdefault(entry['parent'], []).append(entry)
+        return [dict(entry, parts=sorted(parts.get(entry['id'], []),
+                                         key=lambda part: part['id']))
+                for entry in records.values()
+                if entry['status'] != DONE and not entry.get('parent')]
+
+    def unfinished(self):
+        """
+        Registros de los trabajos que no terminaron con éxito.
+
+        Los segmentos de una grabación larga no se reanudan por separado:
+        van en la clave `parts` del registro de su trabajo padre, que al
+        reanudarse reutiliza los ya descargados (ver Pipeline.resume_job).
+        """
+        return self._unfinished(self.load())
+
+    def compact(self):
+        """
+        Reescribe el log conservando solo los trabajos sin terminar (y los
+        segmentos de estos).
+
+        La lectura y el reemplazo van bajo el mismo bloqueo: una transición
+        anexada entre ambos se perdería al reemplazar el archivo.
+        """
+        tmp_path = self.path.with_suffix('.tmp')
+        with self._lock:
+            pending = self._unfinished(self._read())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in pending:
+                    parts = entry.pop('parts')
+                    for record in [entry] + parts:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            tmp_path.replace(self.path)
+
+    def clear(self):
+        """Descarta todo el historial"""
+        with self._lock:
+            if self.path.exists():
+                self.path.unlink()
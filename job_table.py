@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Tabla de trabajos
+Vista virtualizada para lotes de miles de archivos: solo existen las filas
+visibles, los cambios de estado se aplican en su sitio y el orden y el
+filtro se recalculan sin reconstruir el widget
+"""
+
+import itertools
+import time
+import tkinter as tk
+from pathlib import Path
+from tkinter import ttk
+
+from job_pool import (QUEUED, UPLOADING, PROCESSING, DOWNLOADING,
+                      POSTPROCESSING, DONE, FAILED)
+from media_scan import format_duration
+
+# Estados previos al pool
+SCANNING = 'scanning'
+SELECTED = 'selected'
+
+# Orden y texto de cada estado
+STATUS_ORDER = (SCANNING, SELECTED, QUEUED, UPLOADING, PROCESSING,
+                DOWNLOADING, POSTPROCESSING, DONE, FAILED)
+STATUS_LABELS = {
+    SCANNING: 'analizando...',
+    SELECTED: 'seleccionado',
+    QUEUED: 'en cola',
+    UPLOADING: 'subiendo',
+    PROCESSING: 'procesando',
+    DOWNLOADING: 'descargando',
+    POSTPROCESSING: 'postproceso',
+    DONE: 'completado',
+    FAILED: 'error'
+}
+
+# Filtros de la barra de la tabla
+STATUS_FILTERS = {
+    'Todos': None,
+    'Pendientes': (SCANNING, SELECTED, QUEUED),
+    'En curso': (UPLOADING, PROCESSING, DOWNLOADING, POSTPROCESSING),
+    'Completados': (DONE,),
+    'Con error': (FAILED,)
+}
+LENGTH_FILTERS = {
+    'Cualquier duración': None,
+    'Menos de 5 min': (0, 300),
+    '5 a 30 min': (300, 1800),
+    '30 a 60 min': (1800, 3600),
+    'Más de 1 h': (3600, None)
+}
+
+COLUMNS = ('name', 'status', 'size', 'duration', 'elapsed', 'progress')
+HEADINGS = {'name': 'Archivo', 'status': 'Estado', 'size': 'Tamaño',
+            'duration': 'Duración', 'elapsed': 'Tiempo', 'progress': '%'}
+WIDTHS = {'name': 260, 'status': 150, 'size': 80, 'duration': 80,
+          'elapsed': 70, 'progress': 50}
+
+# Filas visibles, filas por paso de rueda y reordenación como mucho cada tanto
+TABLE_ROWS = 12
+WHEEL_ROWS = 3
+RESORT_MS = 500
+
+
+class JobRows:
+    """
+    Filas de la tabla de trabajos, con su filtro y su orden.
+
+    Vive en la aplicación y no en el widget: al reconstruir la pantalla
+    (p. ej. tras volver a iniciar sesión) la tabla nueva muestra las mismas
+    filas sin volver a insertarlas. `listener(clave, reordenar)` avisa a la
+    tabla de cada cambio; `reordenar` es True si puede mover la fila o
+    sacarla del filtro. Se usa solo desde el thread de Tk.
+    """
+
+    def __init__(self):
+        self.rows = {}  # ruta del archivo -> dict de la fila
+        self.view = []  # claves tras el filtro y el orden
+        self.sort_column = None  # None = orden de llegada
+        self.descending = False
+        self.status_filter = 'Todos'
+        self.length_filter = 'Cualquier duración'
+        self.listener = None
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _notify(self, key, reorder):
+        if self.listener:
+            self.listener(key, reorder)
+
+    def _new_row(self, key, status):
+        return {'key': key, 'name': Path(key).name, 'seq': next(self._order),
+                'status': status, 'error': None, 'size': None,
+                'duration': None, 'started': None, 'finished': None,
+                'percent': 0}
+
+    def set_files(self, files):
+        """
+        Sustituye la selección por `files` (en análisis). Los trabajos en
+        curso de un lote anterior se conservan.
+        """
+        keep = {key: row for key, row in self.rows.items()
+                if row['status'] not in (SCANNING, SELECTED, DONE, FAILED)}
+        for file in files:
+            key = str(file)
+            if key not in keep:
+                keep[key] = self._new_row(key, SCANNING)
+        self.rows = keep
+        self._notify(None, True)
+
+    def scanned(self, info):
+        """Tamaño y duración de un archivo analizado por MediaScanner"""
+        row = self.rows.get(str(info['path']))
+        if row is None:
+            return  # La selección cambió mientras se analizaba
+        fields = {'size': info['size'], 'duration': info['duration']}
+        if row['status'] == SCANNING:
+            fields['status'] = SELECTED
+        if info['error'] and info['size'] is None:
+            fields['error'] = info['error']
+        self.update(row['key'], **fields)
+
+    def update_job(self, job):
+        """Aplica el estado actual de un trabajo del pipeline a su fila"""
+        self.update(job.source, status=job.status, error=job.error,
+                    percent=job.percent, started=job.started_at,
+                    finished=job.finished_at)
+
+    def update(self, key, **fields):
+        row = self.rows.get(key)
+        new = row is None
+        if new:
+            row = self.rows[key] = self._new_row(key, SELECTED)
+        changed = {field for field, value in fields.items() if row.get(field) != value}
+        if not changed and not new:
+            return
+        row.update(fields)
+        watched = {'status', 'duration', self._sort_field()}
+        self._notify(key, new or bool(changed & watched))
+
+    def _sort_field(self):
+        column = self.sort_column
+        return {'progress': 'percent', 'elapsed': 'started'}.get(column, column)
+
+    def elapsed(self, row):
+        if row['started'] is None:
+            return None
+        return (row['finished'] or time.time()) - row['started']
+
+    def _sort_key(self, row):
+        column = self.sort_column
+        if column == 'name':
+            return row['name'].lower()
+        if column == 'status':
+            return STATUS_ORDER.index(row['status']) if row['status'] in STATUS_ORDER else -1
+        if column == 'elapsed':
+            value = self.elapsed(row)
+        elif column == 'progress':
+            value = row['percent']
+        else:
+            value = row[column] if column else row['seq']
+        return -1 if value is None else value
+
+    def _visible(self, row):
+        statuses = STATUS_FILTERS.get(self.status_filter)
+        if statuses and row['status'] not in statuses:
+            return False
+        bounds = LENGTH_FILTERS.get(self.length_filter)
+        if bounds:
+            low, high = bounds
+            duration = row['duration']
+            if duration is None or duration < low or (high and duration >= high):
+                return False
+        return True
+
+    def refresh(self):
+        """Recalcula `view` con el filtro y el orden actuales"""
+        rows = [row for row in self.rows.values() if self._visible(row)]
+        rows.sort(key=lambda row: (self._sort_key(row), row['seq']),
+                  reverse=self.descending)
+        self.view = [row['key'] for row in rows]
+
+    def values(self, key):
+        """Textos de las columnas de una fila"""
+        row = self.rows[key]
+        status = STATUS_LABELS.get(row['status'], row['status'])
+        if row['error']:
+            status = f"{status}: {row['error']}"
+        elapsed = self.elapsed(row)
+        return (row['name'], status,
+                f"{row['size'] / (1024 * 1024):.1f} MB" if row['size'] is not None else '',
+                format_duration(row['duration']) if row['duration'] else '',
+                format_duration(elapsed) if elapsed is not None else '',
+                f"{row['percent']:.0f}%")
+
+
+class JobTable(tk.Frame):
+    """
+    Tabla de trabajos sobre un ttk.Treeview con TABLE_ROWS filas fijas.
+
+    El Treeview solo contiene las filas visibles: la barra de scroll y la
+    rueda mueven `offset` sobre `rows.view` y se reescriben esas filas. Un
+    cambio que no afecta al orden actualiza solo su fila si está a la
+    vista; uno que sí (estado, columna ordenada) reordena como mucho cada
+    RESORT_MS. Clic en una cabecera ordena por esa columna (otra vez,
+    invierte el orden).
+    """
+
+    def __init__(self, parent, rows, height=TABLE_ROWS, bg=None, fg=None):
+        super().__init__(parent, bg=bg)
+        self.rows = rows
+        self.height = height
+        self.offset = 0
+        self.selected = None
+        self._visible = {}  # clave -> iid de las filas a la vista
+        self._resort_id = None
+
+        toolbar = tk.Frame(self, bg=bg)
+        toolbar.pack(fill='x', pady=(0, 5))
+        self.status_var = tk.StringVar(value=rows.status_filter)
+        self.length_var = tk.StringVar(value=rows.length_filter)
+        for variable, options in ((self.status_var, STATUS_FILTERS),
+                                  (self.length_var, LENGTH_FILTERS)):
+            ttk.Combobox(toolbar, textvariable=variable, values=list(options),
+                         state='readonly', width=18).pack(side='left', padx=(0, 5))
+            variable.trace_add('write', self._on_filter)
+        self.count_label = tk.Label(toolbar, text="", bg=bg, fg=fg,
+                                    font=('Segoe UI', 9))
+        self.count_label.pack(side='right')
+
+        body = tk.Frame(self, bg=bg)
+        body.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(body, columns=COLUMNS, show='headings',
+                                 height=height, selectmode='browse')
+        for column in COLUMNS:
+            self.tree.heading(column, text=HEADINGS[column],
+                              command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=WIDTHS[column],
+                             stretch=column == 'name',
+                             anchor='w' if column in ('name', 'status') else 'e')
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical', command=self.yview)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        # "break" evita que la rueda llegue también al canvas de la ventana
+        self.tree.bind('<MouseWheel>', lambda e: self._scroll(
+            -WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        self.tree.bind('<Button-4>', lambda e: self._scroll(-WHEEL_ROWS))
+        self.tree.bind('<Button-5>', lambda e: self._scroll(WHEEL_ROWS))
+        for key, step in (('<Up>', -1), ('<Down>', 1),
+                          ('<Prior>', -height), ('<Next>', height)):
+            self.tree.bind(key, lambda e, s=step: self._move_selection(s))
+        self.bind('<Destroy>', self._on_destroy)
+
+        rows.listener = self._on_row_change
+        self._update_headings()
+        self.refresh()
+
+    def _on_destroy(self, event):
+        if event.widget is not self:
+            return
+        if self._resort_id:
+            self.after_cancel(self._resort_id)
+            self._resort_id = None
+        if self.rows.listener == self._on_row_change:
+            self.rows.listener = None
+
+    def _on_row_change(self, key, reorder):
+        if reorder:
+            if key is None:
+                self.offset = 0
+                self.refresh()
+            elif self._resort_id is None:
+                self._resort_id = self.after(RESORT_MS, self.refresh)
+        elif key in self._visible:
+            self.tree.item(self._visible[key], values=self.rows.values(key))
+
+    def _on_filter(self, *_):
+        self.rows.status_filter = self.status_var.get()
+        self.rows.length_filter = self.length_var.get()
+        self.offset = 0
+        self.refresh()
+
+    def sort_by(self, column):
+        if self.rows.sort_column == column:
+            self.rows.descending = not self.rows.descending
+        else:
+            self.rows.sort_column, self.rows.descending = column, False
+        self._update_headings()
+        self.refresh()
+
+    def _update_headings(self):
+        for column in COLUMNS:
+            arrow = ''
+            if column == self.rows.sort_column:
+                arrow = ' ▼' if self.rows.descending else ' ▲'
+            self.tree.heading(column, text=HEADINGS[column] + arrow)
+
+    def refresh(self):
+        """Reordena y refiltra, y vuelve a pintar las filas visibles"""
+        if self._resort_id:
+            self.after_cancel(self._resort_id)
+            self._resort_id = None
+        self.rows.refresh()
+        self.render()
+
+    def render(self):
+        """Escribe en el Treeview las filas de `offset` en adelante"""
+        view = self.rows.view
+        self.offset = max(0, min(self.offset, len(view) - self.height))
+        keys = view[self.offset:self.offset + self.height]
+        items = self.tree.get_children()
+        if len(items) > len(keys):
+            self.tree.delete(*items[len(keys):])
+        for index in range(len(items), len(keys)):
+            self.tree.insert('', tk.END, iid=f"row{index}")
+        self._visible = {}
+        for index, key in enumerate(keys):
+            iid = f"row{index}"
+            self._visible[key] = iid
+            self.tree.item(iid, values=self.rows.values(key))
+        if self.selected in self._visible:
+            self.tree.selection_set(self._visible[self.selected])
+        elif self.tree.selection():
+            self.tree.selection_set(())
+        if view:
+            self.scrollbar.set(self.offset / len(view),
+                               min(1.0, (self.offset + self.height) / len(view)))
+        else:
+            self.scrollbar.set(0, 1)
+        self.count_label.config(text=f"{len(view)} de {len(self.rows)} archivo(s)")
+
+    def refresh_visible(self):
+        """Repinta solo las filas visibles (p. ej. el tiempo de las que están en curso)"""
+        for key, iid in self._visible.items():
+            self.tree.item(iid, values=self.rows.values(key))
+
+    def yview(self, *args):
+        """Comando de la barra de scroll (moveto / scroll)"""
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self.rows.view))
+            self.render()
+        elif args[0] == 'scroll':
+            step = self.height if args[2] == 'pages' else 1
+            self._scroll(int(args[1]) * step)
+
+    def _scroll(self, rows):
+        self.offset += rows
+        self.render()
+        return 'break'
+
+    def _on_select(self, _event):
+        keys = {iid: key for key, iid in self._visible.items()}
+        selection = self.tree.selection()
+        if selection and selection[0] in keys:
+            self.selected = keys[selection[0]]
+
+    def _move_selection(self, step):
+        """Flechas y avance de página sobre toda la vista, no solo lo visible"""
+        view = self.rows.view
+        if not view:
+            return 'break'
+        try:
+            index = view.index(self.selected) + step
+        except ValueError:
+            index = self.offset
+        index = max(0, min(index, len(view) - 1))
+        self.selected = view[index]
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.height:
+            self.offset = index - self.height + 1
+        self.render()
+        return 'break'
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Mejora local de respaldo
+Reducción de ruido, balance voz/fondo y normalización de sonoridad con NumPy
+
+Se usa cuando el servicio de Adobe está lento o no disponible (ver
+`local_mode` en settings.json). El audio se procesa por bloques, así la
+memoria no crece con la duración del archivo.
+"""
+
+import os
+import subprocess
+import tempfile
+import wave
+from pathlib import Path
+
+import media
+
+# NumPy es opcional: sin él la mejora local no está disponible
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BLOCK_SECONDS = 10
+SAMPLE_RATE = 48000
+LOCAL_EXTENSION = '.wav'
+
+# Sonoridad objetivo (aprox. LUFS, sin ponderación K) y techo de picos
+TARGET_LOUDNESS = -16.0
+MAX_GAIN_DB = 20.0
+PEAK_CEILING = 0.89  # -1 dBFS
+
+# Reducción máxima del fondo con background_level = 0
+MAX_REDUCTION_DB = 30.0
+NOISE_PERCENTILE_BIAS = 0.105
+
+
+class LocalEnhancerError(Exception):
+    """No se pudo procesar el archivo localmente"""
+
+
+def available():
+    """True si NumPy está instalado"""
+    return np is not None
+
+
+def default_workers():
+    """Procesos por defecto: la mitad de los núcleos (al menos uno)"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# --- Lectura y escritura por bloques ---------------------------------------
+
+def _read_blocks(path, block_seconds=BLOCK_SECONDS):
+    """
+    (frecuencia de muestreo, generador de bloques float32 mono).
+
+    Con FFmpeg se decodifica cualquier formato; sin él solo WAV PCM de 16 bits.
+    """
+    ffmpeg = media.find_ffmpeg()
+    if ffmpeg:
+        return SAMPLE_RATE, _ffmpeg_blocks(ffmpeg, path, block_seconds)
+    if Path(path).suffix.lower() != '.wav':
+        raise LocalEnhancerError("Sin FFmpeg solo se pueden procesar archivos WAV")
+    reader = wave.open(str(path), 'rb')
+    if reader.getsampwidth() != 2:
+        reader.close()
+        raise LocalEnhancerError("Sin FFmpeg solo se admite WAV PCM de 16 bits")
+    return reader.getframerate(), _wave_blocks(reader, block_seconds)
+
+
+def _ffmpeg_blocks(ffmpeg, path, block_seconds):
+    process = subprocess.Popen(
+        [ffmpeg, '-v', 'error', '-i', str(path), '-vn', '-ac', '1',
+         '-ar', str(SAMPLE_RATE), '-f', 'f32le', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    block_bytes = int(SAMPLE_RATE * block_seconds) * 4
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 4 * 4], dtype='<f4')
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise LocalEnhancerError(f"FFmpeg no pudo decodificar {Path(path).name}")
+
+
+def _wave_blocks(reader, block_seconds):
+    channels = reader.getnchannels()
+    frames = int(reader.getframerate() * block_seconds)
+    try:
+        while True:
+            data = reader.readframes(frames)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768
+            yield samples.reshape(-1, channels).mean(axis=1)
+    finally:
+        reader.close()
+
+
+class _Writer:
+    """Escribe bloques float32 mono como WAV de 16 bits (vía FFmpeg si existe)"""
+
+    def __init__(self, path, sample_rate):
+        ffmpeg = media.find_ffmpeg()
+        self._process = None
+        self._wave = None
+        if ffmpeg:
+            self._process = subprocess.Popen(
+                [ffmpeg, '-v', 'error', '-y', '-f', 'f32le', '-ar', str(sample_rate),
+                 '-ac', '1', '-i', '-', '-c:a', 'pcm_s16le', str(path)],
+                stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        else:
+            self._wave = wave.open(str(path), 'wb')
+            self._wave.setnchannels(1)
+            self._wave.setsampwidth(2)
+            self._wave.setframerate(sample_rate)
+
+    def write(self, block):
+        if self._process:
+            self._process.stdin.write(block.astype('<f4').tobytes())
+        else:
+            pcm = np.clip(block * 32767, -32768, 32767).astype('<i2')
+            self._wave.writeframes(pcm.tobytes())
+
+    def close(self):
+        if self._process:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise LocalEnhancerError("FFmpeg no pudo escribir el resultado")
+        else:
+            self._wave.close()
+
+
+# --- Procesado -------------------------------------------------------------
+
+class SpectralDenoiser:
+    """
+    Supresión de ruido por STFT (filtro de Wiener) con estado entre bloques.
+
+    El ruido se estima por bin a partir del percentil 10 de la potencia de
+    cada bloque, suavizado entre bloques (baja rápido, sube despacio). Con
+    `speech` (0-1) crece la agresividad de la supresión y la mezcla con la
+    señal procesada; `background` (0-1) fija cuánto fondo se conserva.
+    Ventana raíz de Hann con solape del 50 %: análisis y síntesis suman 1.
+    """
+
+    def __init__(self, sample_rate, speech=0.7, background=0.1):
+        self.n_fft = 2048 if sample_rate > 24000 else 1024
+        self.hop = self.n_fft // 2
+        self.window = np.sqrt(np.hanning(self.n_fft + 1)[:-1]).astype(np.float32)
+        self.speech = speech
+        self.floor = 10 ** (-(1 - background) * MAX_REDUCTION_DB / 20)
+        self.noise = None
+        # Relleno inicial para reconstruir también la primera media ventana
+        self._input = np.zeros(self.n_fft - self.hop, dtype=np.float32)
+        self._overlap = np.zeros(self.n_fft - self.hop, dtype=np.float32)
+        self._skip = self.n_fft - self.hop
+        self._pending = 0  # Muestras de entrada aún no emitidas
+
+    def _gains(self, power):
+        # Para ruido estacionario la potencia por bin sigue una exponencial:
+        # su percentil 10 es ~0.105 veces la media
+        block_noise = np.percentile(power, 10, axis=0) / NOISE_PERCENTILE_BIAS
+        if self.noise is None:
+            self.noise = block_noise
+        else:
+            self.noise = np.minimum(block_noise, 0.8 * self.noise + 0.2 * block_noise)
+        snr = power / (self.noise + 1e-12)
+        wiener = np.maximum(1 - (1 + self.speech) / np.maximum(snr, 1e-6), 0)
+        gains = np.maximum(wiener, self.floor)
+        # Suavizado temporal: menos "ruido musical"
+        if len(gains) > 2:
+            gains[1:-1] = 0.5 * gains[1:-1] + 0.25 * (gains[:-2] + gains[2:])
+        return 1 - self.speech * (1 - gains)
+
+    def process(self, block):
+        """Procesa un bloque y devuelve las muestras ya completas"""
+        self._pending += len(block)
+        return self._emit(self._overlap_add(block))
+
+    def flush(self):
+        """Procesa el final pendiente del archivo"""
+        return self._emit(self._overlap_add(np.zeros(self.n_fft, dtype=np.float32)))
+
+    def _overlap_add(self, block):
+        buffer = np.concatenate([self._input, block.astype(np.float32)])
+        count = (len(buffer) - self.n_fft) // self.hop + 1
+        if count <= 0:
+            self._input = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        frames = np.lib.stride_tricks.sliding_window_view(
+            buffer, self.n_fft)[::self.hop][:count]
+        spectra = np.fft.rfft(frames * self.window, axis=1)
+        spectra *= self._gains(np.abs(spectra) ** 2)
+        frames_out = np.fft.irfft(spectra, n=self.n_fft, axis=1) * self.window
+
+        # Overlap-add de todas las tramas del bloque a la vez
+        output = np.zeros((count - 1) * self.hop + self.n_fft, dtype=np.float32)
+        output[:len(self._overlap)] += self._overlap
+        for offset in range(2):
+            chunk = frames_out[offset::2].reshape(-1)
+            start = offset * self.hop
+            output[start:start + len(chunk)] += chunk[:len(output) - start]
+        self._overlap = output[count * self.hop:]
+        self._input = buffer[count * self.hop:]
+        return output[:count * self.hop]
+
+    def _emit(self, samples):
+        # Se descarta el relleno inicial y nunca se emite más que la entrada
+        if self._skip:
+            dropped = min(self._skip, len(samples))
+            samples = samples[dropped:]
+            self._skip -= dropped
+        samples = samples[:self._pending]
+        self._pending -= len(samples)
+        return samples
+
+
+def _loudness(energies):
+    """Sonoridad (dB) con puertas absoluta -70 dB y relativa -10 dB"""
+    energies = np.asarray(energies)
+    gated = energies[energies > 10 ** (-70 / 10)]
+    if not len(gated):
+        return None
+    relative = 10 * np.log10(gated.mean()) - 10
+    gated = gated[gated > 10 ** (relative / 10)]
+    return 10 * np.log10(gated.mean())
+
+
+def _limit(samples):
+    """Limitador suave: por encima del techo los picos se comprimen con tanh"""
+    threshold = PEAK_CEILING * 0.9
+    magnitude = np.abs(samples)
+    over = magnitude > threshold
+    if over.any():
+        knee = PEAK_CEILING - threshold
+        samples = samples.copy()
+        samples[over] = np.sign(samples[over]) * (
+            threshold + knee * np.tanh((magnitude[over] - threshold) / knee))
+    return samples
+
+
+def enhance_file(source, output, speech_level=70, background_level=10,
+                 block_seconds=BLOCK_SECONDS):
+    """
+    Mejora un archivo y escribe el resultado en `output` (WAV).
+
+    Dos pasadas por bloques: la primera reduce ruido y mide la sonoridad
+    escribiendo a un temporal float32; la segunda aplica la ganancia de
+    normalización y el limitador. Pensada para ejecutarse en un proceso
+    aparte (ProcessPoolExecutor), devuelve la ruta de salida.
+    """
+    if not available():
+        raise LocalEnhancerError("NumPy no está instalado (pip install numpy)")
+
+    sample_rate, blocks = _read_blocks(source, block_seconds)
+    denoiser = SpectralDenoiser(sample_rate, speech_level / 100,
+                                background_level / 100)
+    window = int(sample_rate * 0.4)
+    energies = []
+    media.TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(suffix='.f32', dir=media.TEMP_DIR)
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            def keep(samples):
+                samples.astype('<f4').tofile(temp)
+                usable = len(samples) // window * window
+                if usable:
+                    energies.extend(np.mean(samples[:usable].reshape(-1, window) ** 2,
+                                            axis=1))
+            for block in blocks:
+                keep(denoiser.process(block))
+            keep(denoiser.flush())
+
+        loudness = _loudness(energies)
+        gain_db = 0.0 if loudness is None else min(MAX_GAIN_DB,
+                                                   TARGET_LOUDNESS - loudness)
+        gain = 10 ** (gain_db / 20)
+
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        writer = _Writer(output, sample_rate)
+        try:
+            block_size = int(sample_rate * block_seconds)
+            with open(temp_path, 'rb') as temp:
+                while True:
+                    samples = np.fromfile(temp, dtype='<f4', count=block_size)
+                    if not len(samples):
+                        break
+                    writer.write(_limit(samples * gain))
+        finally:
+            writer.close()
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return str(output)
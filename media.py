@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Utilidades de medios con FFmpeg
+Extracción de la pista de audio antes de subir (el remux está en postprocess.py)
+"""
+
+import hashlib
+import json
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Extensiones que se tratan como video (se extrae el audio antes de subir)
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v'}
+
+# Formato de audio intermedio: AAC mono 48 kHz es suficiente para voz y
+# reduce el volumen de subida en un orden de magnitud frente al video
+AUDIO_CODEC = 'aac'
+AUDIO_BITRATE = '160k'
+AUDIO_SAMPLE_RATE = 48000
+AUDIO_EXTENSION = '.m4a'
+
+TEMP_DIR = Path(tempfile.gettempdir()) / "AdobePodcastEnhancer"
+
+# Caracteres del hash de la ruta que distingue archivos homónimos
+PATH_TAG_LENGTH = 6
+
+
+class MediaError(Exception):
+    """Error al ejecutar FFmpeg sobre un archivo"""
+
+
+def find_ffmpeg():
+    """Devuelve la ruta de ffmpeg o None si no está instalado"""
+    return shutil.which('ffmpeg')
+
+
+def find_ffprobe():
+    """Devuelve la ruta de ffprobe o None si no está instalado"""
+    return shutil.which('ffprobe')
+
+
+def is_video(path):
+    """Indica si el archivo es un contenedor de video"""
+    return Path(path).suffix.lower() in VIDEO_EXTENSIONS
+
+
+def run_ffmpeg(args):
+    """Ejecuta ffmpeg y lanza MediaError con el final de stderr si falla"""
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise MediaError("FFmpeg no está instalado o no está en el PATH")
+
+    result = subprocess.run(
+        [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y'] + args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    if result.returncode != 0:
+        raise MediaError(result.stderr.strip()[-500:] or
+                         f"FFmpeg terminó con código {result.returncode}")
+
+
+def probe_duration(path):
+    """Duración en segundos leída de la cabecera del contenedor (ffprobe)"""
+    ffprobe = find_ffprobe()
+    if not ffprobe:
+        raise MediaError("FFprobe no está instalado o no está en el PATH")
+
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'default=noprint_wrappers=1:nokey=1', str(path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        raise MediaError(result.stderr.strip()[-500:] or
+                         f"No se pudo leer la duración de {Path(path).name}")
+
+
+def probe_media(path):
+    """
+    Duración y primer stream de audio leídos de las cabeceras (ffprobe).
+
+    No decodifica el contenido, por lo que es rápido incluso en recursos de
+    red. Devuelve un dict con duration, has_video y audio
+    ({codec, sample_rate, channels} o None).
+    """
+    ffprobe = find_ffprobe()
+    if not ffprobe:
+        raise MediaError("FFprobe no está instalado o no está en el PATH")
+
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-show_entries',
+         'format=duration:stream=codec_type,codec_name,sample_rate,channels',
+         '-of', 'json', str(path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    try:
+        data = json.loads(result.stdout)
+        duration = float(data['format']['duration'])
+    except (ValueError, KeyError):
+        raise MediaError(result.stderr.strip()[-500:] or
+                         f"No se pudo leer {Path(path).name}")
+
+    streams = data.get('streams', [])
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    return {
+        'duration': duration,
+        'has_video': any(s.get('codec_type') == 'video' for s in streams),
+        'audio': {
+            'codec': audio.get('codec_name'),
+            'sample_rate': int(audio.get('sample_rate') or 0),
+            'channels': audio.get('channels')
+        } if audio else None
+    }
+
+
+def unique_stem(path):
+    """
+    Nombre base de los temporales y descargas de un archivo.
+
+    Lleva un hash corto de la ruta completa para que dos archivos con el
+    mismo nombre en carpetas distintas no se pisen. Los archivos de
+    TEMP_DIR ya se crearon con él y conservan su nombre.
+    """
+    path = Path(path)
+    if path.parent == TEMP_DIR:
+        return path.stem
+    digest = hashlib.sha1(str(path.resolve()).encode('utf-8')).hexdigest()
+    return f"{path.stem}_{digest[:PATH_TAG_LENGTH]}"
+
+
+def extract_audio(video_path, out_dir=None):
+    """
+    Extrae la pista de audio de un video a un archivo temporal compacto.
+
+    Solo se demuxea/transcodifica el primer stream de audio; el video no
+    se decodifica. Devuelve la ruta del archivo de audio generado.
+    """
+    video_path = Path(video_path)
+    out_dir = Path(out_dir) if out_dir else TEMP_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    audio_path = out_dir / f"{unique_stem(video_path)}{AUDIO_EXTENSION}"
+
+    run_ffmpeg([
+        '-i', str(video_path),
+        '-vn', '-map', '0:a:0',
+        '-ac', '1',
+        '-ar', str(AUDIO_SAMPLE_RATE),
+        '-c:a', AUDIO_CODEC,
+        '-b:a', AUDIO_BITRATE,
+        str(audio_path)
+    ])
+    return audio_path
+
+
+def enhanced_output_path(source_path, download_path, suffix=None):
+    """Ruta de salida `<nombre>_<hash>_enhanced` del archivo mejorado"""
+    source_path = Path(source_path)
+    suffix = suffix or source_path.suffix
+    return Path(download_path) / f"{unique_stem(source_path)}_enhanced{suffix}"
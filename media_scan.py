@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Análisis de archivos seleccionados
+Tamaño, duración y audio de cada archivo en segundo plano, y estimación del lote
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import media
+
+# ffprobe pasa casi todo el tiempo esperando E/S: varios a la vez ocultan
+# la latencia de los recursos de red
+SCAN_WORKERS = 8
+
+# Estimación aproximada; sirve para planificar, no como garantía
+UPLOAD_MBPS = 20                    # Ancho de subida supuesto (Mbit/s)
+PROCESSING_SECONDS_PER_MINUTE = 15  # Procesamiento en Adobe por minuto de audio
+JOB_OVERHEAD_SECONDS = 20           # Recarga de página, descarga y remux
+
+
+def scan_file(path):
+    """Metadatos de un archivo; los errores quedan en la clave `error`"""
+    info = {'path': str(path), 'name': Path(path).name, 'size': None,
+            'duration': None, 'audio': None, 'has_video': media.is_video(path),
+            'error': None}
+    try:
+        info['size'] = os.stat(path).st_size
+    except OSError as e:
+        info['error'] = str(e)
+        return info
+    if media.find_ffprobe():
+        try:
+            info.update(media.probe_media(path))
+        except media.MediaError as e:
+            info['error'] = str(e)
+    return info
+
+
+def upload_bytes(info, extract_audio=None):
+    """Bytes que se subirán para un archivo (solo el audio si es un video)"""
+    if extract_audio is None:
+        extract_audio = media.find_ffmpeg() is not None
+    if info['has_video'] and extract_audio and info['duration']:
+        bitrate = int(media.AUDIO_BITRATE.rstrip('k')) * 1000
+        return int(info['duration'] * bitrate / 8)
+    return info['size'] or 0
+
+
+def estimate_batch(infos, concurrency=1):
+    """
+    Volumen de subida y tiempo estimado de un lote.
+
+    Los archivos sin duración conocida (sin FFprobe) solo cuentan el tiempo
+    de subida y el fijo por trabajo.
+    """
+    total_bytes = 0
+    total_duration = 0
+    work_seconds = 0
+    for info in infos:
+        size = upload_bytes(info)
+        duration = info['duration'] or 0
+        total_bytes += size
+        total_duration += duration
+        work_seconds += (size * 8 / (UPLOAD_MBPS * 1_000_000)
+                         + duration / 60 * PROCESSING_SECONDS_PER_MINUTE
+                         + JOB_OVERHEAD_SECONDS)
+    return {
+        'files': len(infos),
+        'upload_bytes': total_bytes,
+        'duration': total_duration,
+        'seconds': work_seconds / max(1, concurrency)
+    }
+
+
+def format_duration(seconds):
+    """1h 05m / 3m 20s"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds:02d}s"
+
+
+def describe(info):
+    """Línea de resumen de un archivo para listas y logs"""
+    parts = []
+    if info['size'] is not None:
+        parts.append(f"{info['size'] / (1024 * 1024):.2f} MB")
+    if info['duration']:
+        parts.append(format_duration(info['duration']))
+    audio = info['audio']
+    if audio:
+        parts.append(f"{audio['codec']} {audio['sample_rate'] // 1000} kHz")
+    elif info['duration'] is not None:
+        parts.append("sin audio")
+    if info['error'] and info['size'] is None:
+        parts.append(f"error: {info['error']}")
+    return f"{info['name']} ({', '.join(parts)})" if parts else info['name']
+
+
+class MediaScanner:
+    """
+    Analiza listas de archivos en un pool de threads.
+
+    `on_result(índice, info)` se llama desde un thread de fondo en el orden
+    en que terminan los archivos, y `on_done(infos)` una vez con la lista
+    completa en el orden original.
+    Un `scan()` nuevo deja sin efecto el anterior (sus callbacks se ignoran).
+    """
+
+    def __init__(self, workers=SCAN_WORKERS):
+        self.workers = workers
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def scan(self, files, on_result=None, on_done=None):
+        """Lanza el análisis en segundo plano y devuelve su thread"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        files = list(files)
+
+        def run():
+            infos = [None] * len(files)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(scan_file, path): index
+                           for index, path in enumerate(files)}
+                for future in as_completed(futures):
+                    if generation != self._generation:
+                        for pending in futures:
+                            pending.cancel()
+                        return
+                    index = futures[future]
+                    infos[index] = future.result()
+                    if on_result:
+                        on_result(index, infos[index])
+            if on_done and generation == self._generation:
+                on_done(infos)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
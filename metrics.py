@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Métricas de ejecución
+Tiempos por fase, bytes y resultado de cada trabajo, guardados por lote
+"""
+
+import csv
+import json
+import threading
+import time
+import uuid
+
+from bandwidth import rate
+from config import CONFIG_DIR
+
+METRICS_DIR = CONFIG_DIR / "metrics"
+
+# Orden de las fases en resúmenes y exportaciones
+PHASE_ORDER = ('browser_launch', 'login', 'uploading', 'processing',
+               'downloading', 'local', 'postprocess')
+
+CSV_FIELDS = ('run', 'kind', 'id', 'parent', 'name', 'worker', 'attempt',
+              'status', 'error', 'started_at', 'finished_at', 'elapsed',
+              'upload_bytes', 'output_bytes', 'upload_mbps',
+              'download_mbps') + PHASE_ORDER
+
+# Transferencias de un trabajo: (sentido, campo de bytes, fase)
+TRANSFERS = (('upload', 'upload_bytes', 'uploading'),
+             ('download', 'output_bytes', 'downloading'))
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def transfer_mbps(record):
+    """Mbit/s conseguidos en la subida y la descarga de un registro"""
+    timings = record.get('timings') or {}
+    speeds = {}
+    for direction, field, phase in TRANSFERS:
+        speed = rate(record.get(field), timings.get(phase))
+        speeds[direction] = speed * 8 / (1000 * 1000) if speed else None
+    return speeds
+
+
+class RunMetrics:
+    """
+    Registro de métricas de un lote en `config/metrics/<run>.jsonl`.
+
+    Cada intento terminado de un trabajo (y cada arranque de worker) se anexa
+    como una línea JSON, igual que el JobStore, así un cierre abrupto no
+    pierde lo ya medido. `summary()` agrega el fichero y `export_csv()` /
+    `export_json()` lo vuelcan para hojas de cálculo u otras herramientas.
+    """
+
+    def __init__(self, run_id=None, directory=METRICS_DIR):
+        self.run_id = run_id or time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:4]
+        self.path = directory / f"{self.run_id}.jsonl"
+        self._lock = threading.Lock()
+
+    def _append(self, record):
+        record = dict(record, run=self.run_id)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+    def record_job(self, job):
+        """Anexa el resultado de un intento (estado done o failed)"""
+        self._append({
+            'kind': 'job',
+            'id': job.id,
+            'parent': job.parent.id if job.parent else None,
+            'name': job.name,
+            'worker': job.worker,
+            'attempt': job.attempts,
+            'status': job.status,
+            'error': job.error,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'elapsed': job.elapsed,
+            'upload_bytes': job.bytes,
+            'output_bytes': job.output_bytes,
+            'phase_started': job.phase_started,
+            'timings': job.timings
+        })
+
+    def record_worker(self, worker):
+        """Anexa el arranque de un worker (navegador + login) una sola vez"""
+        if worker.startup_recorded or not worker.startup_timings:
+            return
+        worker.startup_recorded = True
+        self._append({
+            'kind': 'worker',
+            'id': worker.profile,
+            'worker': worker.index,
+            'finished_at': time.time(),
+            'timings': worker.startup_timings
+        })
+
+    def records(self):
+        """Registros del lote en orden de escritura"""
+        return load_records(self.path)
+
+    def summary(self):
+        return summarize(self.records())
+
+    def export_json(self, path):
+        export_json(self.records(), path)
+
+    def export_csv(self, path):
+        export_csv(self.records(), path)
+
+
+def list_runs(directory=METRICS_DIR):
+    """Identificadores de los lotes registrados, del más reciente al más antiguo"""
+    if not directory.exists():
+        return []
+    return sorted((p.stem for p in directory.glob('*.jsonl')), reverse=True)
+
+
+def load_records(path):
+    records = []
+    if not path.exists():
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # Línea truncada por un cierre abrupto
+    return records
+
+
+def summarize(records):
+    """
+    Agregado de un lote: por fase n / media / p50 / p95 / máx en segundos,
+    más totales de archivos, intentos, bytes y rendimiento.
+    """
+    phases = {}
+    for record in records:
+        for phase, seconds in (record.get('timings') or {}).items():
+            if seconds is not None:
+                phases.setdefault(phase, []).append(seconds)
+
+    jobs = [r for r in records if r.get('kind') == 'job' and not r.get('parent')]
+    # Último intento de cada archivo = su resultado final
+    final = {}
+    for record in jobs:
+        final[record['id']] = record
+    done = [r for r in final.values() if r['status'] == 'done']
+
+    starts = [r['started_at'] for r in jobs if r.get('started_at')]
+    ends = [r['finished_at'] for r in jobs if r.get('finished_at')]
+    wall = (max(ends) - min(starts)) if starts and ends else 0
+    upload_bytes = sum(r.get('upload_bytes') or 0 for r in records
+                       if r.get('kind') == 'job')
+
+    # Velocidad de cada transferencia completada, para ajustar los límites
+    speeds = {}
+    for record in records:
+        if record.get('kind') == 'job' and record.get('status') == 'done':
+            for direction, mbps in transfer_mbps(record).items():
+                if mbps:
+                    speeds.setdefault(direction, []).append(mbps)
+
+    ordered = [p for p in PHASE_ORDER if p in phases] + \
+              sorted(p for p in phases if p not in PHASE_ORDER)
+    return {
+        'files': len(final),
+        'done': len(done),
+        'failed': len(final) - len(done),
+        'attempts': len(jobs),
+        'upload_bytes': upload_bytes,
+        'output_bytes': sum(r.get('output_bytes') or 0 for r in done),
+        'wall_seconds': wall,
+        'files_per_hour': len(done) * 3600 / wall if wall else None,
+        'upload_mb_per_minute': upload_bytes / (1024 * 1024) * 60 / wall if wall else None,
+        'phases': {
+            phase: {
+                'count': len(phases[phase]),
+                'mean': sum(phases[phase]) / len(phases[phase]),
+                'p50': _percentile(phases[phase], 0.5),
+                'p95': _percentile(phases[phase], 0.95),
+                'max': max(phases[phase])
+            }
+            for phase in ordered
+        },
+        'throughput_mbps': {
+            direction: {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': _percentile(values, 0.5),
+                'min': min(values)
+            }
+            for direction, values in speeds.items()
+        }
+    }
+
+
+def export_json(records, path):
+    """Registros y resumen en un único documento JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'summary': summarize(records), 'records': records}, f,
+                  indent=2, ensure_ascii=False)
+
+
+def export_csv(records, path):
+    """Una fila por registro, con una columna de segundos por fase"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            row = dict(record)
+            if record.get('kind') == 'job':
+                row.update({f"{direction}_mbps": mbps
+                            for direction, mbps in transfer_mbps(record).items()})
+            row.update(record.get('timings') or {})
+            writer.writerow(row)
+
+
+def describe_summary(summary):
+    """Líneas de texto con los totales y el desglose por fase"""
+    lines = [f"{summary['done']}/{summary['files']} archivo(s) en "
+             f"{summary['attempts']} intento(s), "
+             f"{summary['upload_bytes'] / (1024 * 1024):.1f} MB subidos, "
+             f"{summary['wall_seconds']:.0f}s en total"]
+    if summary['files_per_hour']:
+        lines.append(f"Rendimiento: {summary['files_per_hour']:.1f} archivos/h, "
+                     f"{summary['upload_mb_per_minute']:.1f} MB/min de subida")
+    labels = {'upload': 'subida', 'download': 'descarga'}
+    speeds = [f"{labels[direction]} media {stats['mean']:.1f} Mbit/s "
+              f"(p50 {stats['p50']:.1f}, mín {stats['min']:.1f})"
+              for direction, stats in summary.get('throughput_mbps', {}).items()]
+    if speeds:
+        lines.append("Velocidad: " + ", ".join(speeds))
+    for phase, stats in summary['phases'].items():
+        lines.append(f"{phase}: media {stats['mean']:.1f}s, p95 {stats['p95']:.1f}s, "
+                     f"máx {stats['max']:.1f}s (n={stats['count']})")
+    return lines
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Worker persistente de automation.js
+Mantiene el navegador y la sesión abiertos entre lotes (modo --serve)
+"""
+
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+
+import protocol
+
+SCRIPT_PATH = Path(__file__).parent / "automation.js"
+
+# Tiempo máximo para lanzar Chrome e iniciar sesión
+STARTUP_TIMEOUT = 180
+PING_TIMEOUT = 10
+
+# Fases de automation.js previas al primer trabajo -> nombre en las métricas
+STARTUP_PHASES = {'startup': 'browser_launch', 'login': 'login'}
+
+
+class WorkerError(Exception):
+    """El proceso de node no arrancó o murió durante un trabajo"""
+
+
+class NodeWorker:
+    """
+    Un proceso `node automation.js --serve` con su propio perfil de Chrome.
+
+    Con `account` (ver accounts.py) el worker inicia sesión con esa cuenta
+    y usa su perfil número `slot`; si no, con `email`/`password` de settings.
+    Los trabajos se envían como líneas JSON por stdin y sus eventos llegan
+    por stdout (ver protocol.py). Los eventos sin trabajo asociado (arranque,
+    login) se reenvían a `on_log(mensaje)`.
+    """
+
+    def __init__(self, settings, index, on_log=None, account=None, slot=None):
+        self.settings = settings
+        self.index = index
+        self.account = account
+        self.slot = index if slot is None else slot
+        self.on_log = on_log or (lambda message: None)
+        self.process = None
+        self._reader = None
+        self._lock = threading.Lock()
+        # Arranque, relanzamiento y cierre del proceso: el bucle del worker,
+        # el precalentamiento y la comprobación de salud pueden coincidir
+        self._process_lock = threading.RLock()
+        self._ready = threading.Event()
+        self._pong = threading.Event()
+        self._job_done = threading.Event()
+        self._job_id = None
+        self._handler = None
+        self._startup_error = None
+        # Duración (s) del arranque del navegador y del login del último start()
+        self.startup_timings = {}
+        self.startup_recorded = False
+        # Trabajos atendidos por el navegador actual (para reciclarlo)
+        self.jobs_since_start = 0
+
+    @property
+    def profile(self):
+        # profile_prefix permite aislar perfiles (p. ej. los del benchmark)
+        prefix = self.settings.get('profile_prefix', 'ChromeProfile')
+        if self.account:
+            return self.account.profile(self.slot, prefix)
+        return prefix if self.slot == 0 else f'{prefix}-{self.slot}'
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def busy(self):
+        return self._job_id is not None
+
+    def build_command(self):
+        """
+        Línea de comando del worker en modo --serve.
+
+        La contraseña no va en la línea de comando (visible para otros
+        usuarios en la lista de procesos): ver build_env().
+        """
+        settings = self.settings
+        account = self.account
+        cmd = [
+            'node',
+            str(SCRIPT_PATH),
+            '--serve',
+            '--email', account.email if account else settings['email'],
+            '--download-path', settings['download_path'],
+            '--speech-level', str(settings['speech_level']),
+            '--background-level', str(settings['background_level']),
+            '--profile', self.profile
+        ]
+        if settings.get('url'):
+            cmd += ['--url', settings['url']]
+        if settings.get('headless'):
+            cmd.append('--headless')
+        return cmd
+
+    def build_env(self):
+        """Entorno del worker, con la contraseña en ADOBE_PASSWORD"""
+        password = self.account.password if self.account else self.settings['password']
+        return dict(os.environ, ADOBE_PASSWORD=password)
+
+    def start(self):
+        """Lanza el proceso y espera a que el navegador tenga sesión"""
+        with self._process_lock:
+            self._start()
+
+    def _start(self):
+        self._ready.clear()
+        self._startup_error = None
+        self.startup_timings = {}
+        self.startup_recorded = False
+        self.jobs_since_start = 0
+        self.process = subprocess.Popen(
+            self.build_command(),
+            env=self.build_env(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+        )
+        self._reader = protocol.EventReader(self.process, self._on_event)
+
+        # Esperar el evento "ready" o la muerte del proceso
+        waited = 0
+        while not self._ready.wait(1):
+            waited += 1
+            if not self.alive or waited >= STARTUP_TIMEOUT:
+                self.kill()
+                raise WorkerError(self._startup_error or
+                                  "El worker no pudo iniciar sesión")
+        self.on_log(f">> Worker {self.index + 1} listo ({self.profile})")
+
+    def _on_event(self, event):
+        kind = event.get('event')
+        if kind == 'ready':
+            self._ready.set()
+            return
+        if kind == 'pong':
+            self._pong.set()
+            return
+        if kind == protocol.PHASE and not event.get('job'):
+            previous = STARTUP_PHASES.get(event.get('previous'))
+            if previous and event.get('previous_ms') is not None:
+                self.startup_timings[previous] = event['previous_ms'] / 1000
+            return
+
+        handler = self._handler
+        if handler and event.get('job') and event.get('job') == self._job_id:
+            handler(event)
+            if kind == protocol.DONE:
+                self._job_done.set()
+        elif kind == protocol.ERROR:
+            self._startup_error = event.get('message')
+            self.on_log(f">> [worker {self.index + 1}] {event.get('message')}")
+        elif kind in (protocol.LOG, protocol.STDERR):
+            self.on_log(f"[worker {self.index + 1}] {event.get('message', '')}")
+
+    def _send(self, message):
+        with self._lock:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+
+    def ping(self, timeout=PING_TIMEOUT):
+        """Comprueba que el worker responde"""
+        if not self.alive:
+            return False
+        self._pong.clear()
+        try:
+            self._send({'cmd': 'ping'})
+        except OSError:
+            return False
+        return self._pong.wait(timeout)
+
+    def throttle(self, upload, download):
+        """Límite de subida y descarga del navegador en bytes/s (-1 = sin límite)"""
+        try:
+            self._send({'cmd': 'throttle', 'upload': upload, 'download': download})
+        except OSError:
+            pass  # Si el proceso murió, el siguiente trabajo lo relanza
+
+    def ensure_alive(self):
+        """Relanza el worker si el proceso murió o dejó de responder"""
+        with self._process_lock:
+            if self.alive and (self.busy or self.ping()):
+                return
+            if self.process is not None:
+                self.on_log(f">> Worker {self.index + 1} sin respuesta, relanzando...")
+                self.kill()
+            self.start()
+
+    def run_job(self, message, handler, expired=None):
+        """
+        Envía un trabajo y bloquea hasta su evento "done".
+
+        `handler(evento)` recibe cada evento del trabajo. Lanza WorkerError
+        si el proceso muere antes de terminarlo, o si `expired()` devuelve
+        True (en ese caso se mata el proceso: la pestaña quedó bloqueada).
+        """
+        self._job_done.clear()
+        self._job_id = message['id']
+        self._handler = handler
+        try:
+            self._send(dict(message, cmd='job'))
+            while not self._job_done.wait(1):
+                if not self.alive:
+                    raise WorkerError("El worker terminó durante el trabajo")
+                if expired and expired():
+                    self.kill()
+                    raise WorkerError("Tiempo de espera de la fase agotado")
+        except OSError as e:
+            raise WorkerError(str(e))
+        finally:
+            self._job_id = None
+            self._handler = None
+            self.jobs_since_start += 1
+
+    def stop(self, timeout=15):
+        """Cierra el navegador ordenadamente"""
+        with self._process_lock:
+            if not self.alive:
+                return
+            try:
+                self._send({'cmd': 'shutdown'})
+                self.process.wait(timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+            # Parado a propósito: el siguiente ensure_alive() lo lanza sin avisar
+            self.process = None
+
+    def kill(self):
+        with self._process_lock:
+            if self.alive:
+                self.process.kill()
+                self.process.wait()
@@ -0,0 +1,629 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Pipeline de procesamiento
+Preparación, ejecución en el pool y entrega de resultados de cada archivo
+"""
+
+import getpass
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+import chunking
+import media
+import postprocess
+import vad
+from job_pool import Job, JobPool, DONE, FAILED, POSTPROCESSING, MAX_CONCURRENCY
+from metrics import RunMetrics
+from resources import ResourceGovernor
+from result_cache import ResultCache, cache_key
+from retries import RetryPolicy
+from scheduler import PRIORITIES
+
+# Diferencia de duración (s) admitida entre el archivo subido y el mejorado
+DURATION_TOLERANCE = 2
+
+
+class Pipeline:
+    """
+    Orquesta un lote: caché → recorte de silencios o extracción de audio →
+    segmentos → pool → unión de segmentos → reexpansión → remux → caché.
+
+    `settings` usa las mismas claves que settings.json más `email` y
+    `password`. Los callbacks `on_log(mensaje)`, `on_status(job)` y
+    `on_progress(job)` pueden llamarse desde threads de trabajo. Si se pasa
+    un `pool` existente se reutilizan sus workers (navegadores ya abiertos).
+    Cada intento terminado queda registrado en `metrics` (ver metrics.py).
+
+    El postproceso de cada descarga (sonoridad, formato, remux; ver
+    postprocess.py) corre en un pool propio, de modo que el worker pasa al
+    siguiente archivo mientras FFmpeg termina el anterior.
+
+    Los trabajos llevan el usuario (`owner`) y la prioridad del lote para
+    el planificador del pool; con `add()` se suman trabajos a un lote en
+    marcha en lugar de esperar a que termine.
+    """
+
+    def __init__(self, settings, on_log=None, on_status=None, store=None,
+                 cache=None, on_progress=None, pool=None, metrics=None):
+        self.settings = settings
+        self.on_log = on_log or (lambda message: None)
+        self.on_status = on_status or (lambda job: None)
+        self.on_progress = on_progress or (lambda job: None)
+        self.store = store
+        self.pool = pool
+        self._parts_lock = threading.Lock()
+        self._post_lock = threading.Lock()
+        self._post_executor = None
+        self._post_futures = []
+        self.cache = cache if cache is not None else ResultCache(
+            max_bytes=int(settings.get('cache_max_gb', 20) * 1024 ** 3))
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.resources = ResourceGovernor(settings, on_log=self.on_log)
+        self._running = threading.Event()
+        self._add_lock = threading.Lock()
+
+    @property
+    def download_path(self):
+        return Path(self.settings['download_path'])
+
+    def prepare_job(self, file, job_id=None):
+        """
+        Crea el trabajo de un archivo.
+
+        Si el resultado ya está en caché el trabajo se entrega de inmediato;
+        si es un video se extrae el audio para subir solo la voz, o con
+        `vad_trim` se sube el audio sin los silencios largos.
+        """
+        key = cache_key(file, self.settings['speech_level'],
+                        self.settings['background_level'], self.output_variant())
+        job = Job(file, job_id=job_id, cache_key=key)
+        self.assign_batch(job)
+        cached = self.cache.get(job.cache_key)
+        if cached:
+            job.output_path = self.deliver(file, cached)
+            job.status = DONE
+            job.percent = 100
+            self.on_log(f">> [{job.name}] recuperado de caché: "
+                        f"{job.output_path.name}")
+            return job
+
+        if not self.trim_silence(job) and media.is_video(file) and media.find_ffmpeg():
+            try:
+                # Sin duración conocida, el tamaño del video acota el del audio
+                if not self.fits_temp(job.estimate or None, os.path.getsize(file)):
+                    raise media.MediaError("límite de disco temporal alcanzado")
+                self.on_log(f">> Extrayendo audio: {job.name}")
+                job.upload_path = str(media.extract_audio(file))
+            except (media.MediaError, OSError) as e:
+                self.on_log(f">> No se pudo extraer el audio ({e}), "
+                            "se subirá el video completo")
+        self.split_if_long(job)
+        return job
+
+    def assign_batch(self, job):
+        """Usuario, prioridad, ajustes de mejora y duración estimada del trabajo"""
+        settings = self.settings
+        job.owner = job.owner or settings.get('owner') or getpass.getuser()
+        if 'priority' in settings:
+            job.priority = PRIORITIES.get(settings['priority'], 0)
+        job.levels = (settings['speech_level'], settings['background_level'])
+        if job.estimate is None and media.find_ffprobe():
+            try:
+                job.estimate = media.probe_duration(job.source)
+            except media.MediaError:
+                pass
+
+    def output_variant(self):
+        """Parte de la clave de caché que depende de los ajustes de salida"""
+        parts = [postprocess.variant(self.settings), vad.variant(self.settings)]
+        return '-'.join(part for part in parts if part) or None
+
+    def trim_silence(self, job):
+        """
+        Sube solo la parte con voz: recorta los silencios largos del
+        original (sin extraer antes el audio) y guarda el mapa de cortes en
+        el trabajo. True si se recortó.
+        """
+        options = vad.options_from_settings(self.settings)
+        if not options or not vad.available():
+            return False
+        min_silence, padding, threshold = options
+        try:
+            duration, cuts = vad.analyze(job.source, min_silence, padding, threshold)
+            if not cuts:
+                return False
+            saved = vad.removed_seconds(cuts)
+            if not self.fits_temp(duration - saved):
+                return False
+            trimmed = media.TEMP_DIR / f"{media.unique_stem(job.source)}_trimmed{media.AUDIO_EXTENSION}"
+            vad.trim(job.source, cuts, trimmed)
+        except media.MediaError as e:
+            self.on_log(f">> No se pudieron recortar los silencios de {job.name} ({e})")
+            return False
+        self.on_log(f">> [{job.name}] {len(cuts)} silencio(s) recortados: "
+                    f"{saved / 60:.1f} de {duration / 60:.1f} min "
+                    f"({saved / duration:.0%} menos a procesar)")
+        job.upload_path = str(trimmed)
+        job.edit_map = cuts
+        job.estimate = duration - saved
+        return True
+
+    def restore_timeline(self, job, enhanced):
+        """Reinserta en `enhanced` los silencios recortados al subir"""
+        enhanced = Path(enhanced)
+        temp = enhanced.with_name(f"{enhanced.stem}.tmp{enhanced.suffix}")
+        try:
+            vad.expand(enhanced, job.edit_map, temp)
+            os.replace(temp, enhanced)
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def split_if_long(self, job):
+        """
+        Divide una grabación larga en segmentos que se procesan como
+        trabajos independientes (en paralelo y reintentables por separado).
+        """
+        chunk_minutes = self.settings.get('chunk_minutes', chunking.CHUNK_MINUTES)
+        if not chunk_minutes or not media.find_ffmpeg():
+            return
+        segment_seconds = chunk_minutes * 60
+        try:
+            duration = media.probe_duration(job.upload_path)
+        except media.MediaError:
+            return
+        if duration < segment_seconds * 1.5:
+            return
+        if not self.fits_temp(duration):
+            self.on_log(f">> [{job.name}] límite de disco temporal alcanzado, "
+                        "se subirá completo")
+            return
+
+        overlap = self.settings.get('chunk_overlap_seconds',
+                                    chunking.CHUNK_OVERLAP_SECONDS)
+        segments = chunking.plan_segments(duration, segment_seconds, overlap)
+        self.on_log(f">> [{job.name}] {duration / 60:.0f} min: dividiendo en "
+                    f"{len(segments)} segmentos")
+        try:
+            paths = chunking.split_audio(job.upload_path, segments)
+        except media.MediaError as e:
+            self.on_log(f">> No se pudo dividir {job.name} ({e}), "
+                        "se subirá completo")
+            return
+        for i, (path, (start, length)) in enumerate(zip(paths, segments), 1):
+            part = Job(path, job_id=f"{job.id}-{i:03d}")
+            part.parent = job
+            part.owner, part.priority = job.owner, job.priority
+            part.levels = job.levels
+            part.estimate = length
+            job.parts.append(part)
+
+    def fits_temp(self, seconds, size=0):
+        """
+        True si el audio intermedio de `seconds` cabe en el disco temporal.
+
+        Si la duración no se conoce (None) se usa `size`, los bytes del
+        archivo de origen, como cota del audio que se va a escribir.
+        """
+        budget = self.resources.temp_budget()
+        if seconds is None:
+            needed = size
+        else:
+            needed = seconds * int(media.AUDIO_BITRATE.rstrip('k')) * 1000 / 8
+        return budget is None or needed <= budget
+
+    def resume_job(self, entry):
+        """
+        Reconstruye un trabajo guardado en el JobStore.
+
+        Los segmentos ya descargados (`entry['parts']`, ver JobStore) que
+        siguen en disco no se vuelven a subir: solo se encolan los que
+        faltan.
+        """
+        job = Job.from_dict(entry)
+        saved = {part['id']: part for part in entry.get('parts', [])}
+        if saved and Path(job.upload_path).exists() and self._restore_parts(job, saved):
+            return job
+        # El audio temporal puede haberse borrado: volver a prepararlo
+        if not Path(job.upload_path).exists():
+            job = self.prepare_job(job.source, job.id)
+        else:
+            self.split_if_long(job)
+        # Los segmentos se vuelven a cortar igual (mismos ids): los ya
+        # descargados se conservan
+        for part in job.parts:
+            record = saved.get(part.id)
+            if record and self._part_done(record):
+                part.status = DONE
+                part.percent = 100
+                part.output_path = Path(record['output_path'])
+        return job
+
+    @staticmethod
+    def _part_done(record):
+        return (record['status'] == DONE and record.get('output_path')
+                and Path(record['output_path']).is_file())
+
+    def _restore_parts(self, job, saved):
+        """Segmentos guardados; False si alguno pendiente perdió su archivo"""
+        parts = []
+        for record in saved.values():
+            part = Job.from_dict(record)
+            if self._part_done(record):
+                part.status = DONE
+                part.percent = 100
+            elif not Path(part.upload_path).exists():
+                return False
+            else:
+                part.output_path = None
+            part.parent = job
+            part.owner, part.priority = job.owner, job.priority
+            parts.append(part)
+        job.parts = sorted(parts, key=lambda part: part.id)
+        return True
+
+    def prepare_jobs(self, files):
+        """Crea un trabajo por archivo"""
+        self.prepare_batch()
+        return [self.prepare_job(file) for file in files]
+
+    def prepare_batch(self):
+        """Avisos y limpieza una vez por lote, antes de preparar sus trabajos"""
+        if not media.find_ffmpeg():
+            self.on_log(">> FFmpeg no encontrado: se subirán los videos completos")
+        if vad.options_from_settings(self.settings) and not vad.available():
+            self.on_log(">> Recorte de silencios no disponible (requiere NumPy y FFmpeg)")
+        self.resources.cleanup()
+
+    def deliver(self, source, cached):
+        """Copia un resultado en caché a la carpeta de descarga"""
+        output = media.enhanced_output_path(source, self.download_path,
+                                            cached.suffix)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # La salida de la vez anterior puede ser ya este mismo archivo
+        # (cachés antiguas enlazaban en lugar de copiar)
+        if output.exists() and os.path.samefile(output, cached):
+            return output
+        shutil.copy2(cached, output)
+        return output
+
+    def find_download(self, job):
+        """Archivo descargado más reciente que corresponde al trabajo"""
+        # Ruta reportada por automation.js en el evento "done"
+        if job.downloaded_path and Path(job.downloaded_path).is_file():
+            return Path(job.downloaded_path)
+        stem = media.unique_stem(job.upload_path)
+        candidates = [
+            f for f in self.download_path.glob(f"{stem}*")
+            if f.is_file() and f.stat().st_mtime >= job.started_at
+            and not f.name.endswith('.crdownload')
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda f: f.stat().st_mtime)
+
+    def verify_download(self, job):
+        """
+        Comprueba que la descarga de un trabajo es plausible.
+
+        Devuelve None si es válida o el motivo del rechazo; con FFprobe se
+        compara además su duración con la del archivo subido.
+        """
+        enhanced = self.find_download(job)
+        if not enhanced:
+            return "No se encontró el archivo descargado"
+        if enhanced.stat().st_size == 0:
+            return f"El archivo descargado está vacío: {enhanced.name}"
+        job.downloaded_path = str(enhanced)
+
+        if not media.find_ffprobe():
+            return None
+        try:
+            expected = media.probe_duration(job.upload_path)
+        except media.MediaError:
+            return None
+        try:
+            actual = media.probe_duration(enhanced)
+        except media.MediaError as e:
+            return f"La descarga no es un audio válido: {e}"
+        if abs(actual - expected) > max(DURATION_TOLERANCE, expected * 0.02):
+            return (f"Duración inesperada de {enhanced.name}: "
+                    f"{actual:.0f}s en lugar de {expected:.0f}s")
+        return None
+
+    def finalize(self, job):
+        """Localiza el resultado descargado y lo entrega (MediaError si falla)"""
+        enhanced = self.find_download(job)
+        if not enhanced:
+            raise media.MediaError("No se encontró el archivo descargado")
+        self.deliver_enhanced(job, enhanced)
+
+    def deliver_enhanced(self, job, enhanced):
+        """
+        Postproceso del audio mejorado (sonoridad, formato), remux en el
+        video original y alta en caché.
+
+        `keep_original` decide si el audio descargado de Adobe se conserva
+        junto al resultado final cuando este es un archivo distinto. Si se
+        recortaron silencios al subir, antes se devuelve el audio a la
+        duración original. Un error de FFmpeg se propaga como MediaError y
+        el resultado no entra en caché.
+        """
+        job.output_path = enhanced
+        temporary = job.upload_path != job.source
+        video = job.source if (temporary and media.is_video(job.source)
+                               and self.settings.get('remux_video', True)) else None
+        options = postprocess.options_from_settings(self.settings)
+        try:
+            if job.edit_map:
+                self.restore_timeline(job, enhanced)
+            if video or options:
+                suffix = None if video else postprocess.output_suffix(
+                    options, Path(enhanced).suffix)
+                output = media.enhanced_output_path(job.source, self.download_path,
+                                                    suffix)
+                if video:
+                    self.on_log(f">> Reinsertando audio en {output.name}")
+                else:
+                    self.on_log(f">> Postproceso: {output.name}")
+                job.output_path = postprocess.finalize_output(
+                    enhanced, output, video, options,
+                    self.settings.get('keep_original', True))
+            elif job.edit_map or Path(enhanced).parent == media.TEMP_DIR:
+                # Sin postproceso: el audio reexpandido o los segmentos unidos
+                # se entregan con el nombre del original
+                output = media.enhanced_output_path(job.source, self.download_path,
+                                                    Path(enhanced).suffix)
+                output.parent.mkdir(parents=True, exist_ok=True)
+                job.output_path = Path(shutil.move(str(enhanced), str(output)))
+        finally:
+            if temporary:
+                Path(job.upload_path).unlink(missing_ok=True)
+
+        if job.cache_key:
+            self.cache.put(job.cache_key, job.output_path)
+
+    def merge_parts(self, job):
+        """Une los segmentos mejorados de un trabajo y lo entrega"""
+        outputs = [part.output_path for part in job.parts]
+        if not all(outputs):
+            raise media.MediaError("Falta el resultado de algún segmento")
+
+        overlap = self.settings.get('chunk_overlap_seconds',
+                                    chunking.CHUNK_OVERLAP_SECONDS)
+        self.on_log(f">> [{job.name}] uniendo {len(outputs)} segmentos")
+        if job.upload_path != job.source:
+            merged = media.TEMP_DIR / f"{media.unique_stem(job.source)}_merged{media.AUDIO_EXTENSION}"
+        else:
+            merged = media.enhanced_output_path(job.source, self.download_path,
+                                                media.AUDIO_EXTENSION)
+        chunking.merge_segments(outputs, overlap, merged)
+
+        # Los segmentos son intermedios: no deben quedar en la descarga
+        for part in job.parts:
+            Path(part.upload_path).unlink(missing_ok=True)
+            Path(part.output_path).unlink(missing_ok=True)
+
+        self.deliver_enhanced(job, merged)
+        if merged != job.output_path and merged.parent == media.TEMP_DIR:
+            merged.unlink(missing_ok=True)
+
+    def _finish_parent(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        started = [part.started_at for part in job.parts if part.started_at]
+        job.started_at = min(started) if started else None
+        job.finished_at = time.time()
+        job.percent = 100
+        if self.store:
+            self.store.record(job)
+        self.metrics.record_job(job)
+        self.on_status(job)
+
+    def _on_part_status(self, part):
+        parent = part.parent
+        if part.status == DONE:
+            part.output_path = self.find_download(part)
+            if self.store:
+                # Con la ruta del resultado, para reutilizarlo al reanudar
+                self.store.record(part)
+        if part.status in (DONE, FAILED):
+            self.metrics.record_job(part)
+        self.on_status(part)
+
+        with self._parts_lock:
+            if parent.status in (DONE, FAILED, POSTPROCESSING):
+                return
+            if part.status == FAILED:
+                parent.status = FAILED
+            elif any(p.status != DONE for p in parent.parts):
+                return
+            else:
+                parent.status = POSTPROCESSING
+
+        if parent.status == FAILED:
+            self._finish_parent(parent, FAILED,
+                                f"Segmento {part.name}: {part.error}")
+            return
+        self.on_status(parent)
+        self.submit_postprocess(self._merge_parent, parent)
+
+    def _merge_parent(self, parent):
+        try:
+            started = time.monotonic()
+            self.merge_parts(parent)
+            parent.timings['postprocess'] = time.monotonic() - started
+            self._finish_parent(parent, DONE)
+        except (media.MediaError, OSError) as e:
+            self._finish_parent(parent, FAILED, f"Error uniendo segmentos: {e}")
+
+    def _on_status(self, job):
+        if job.parent:
+            self._on_part_status(job)
+            return
+        if job.status == DONE:
+            # El pool ya verificó la descarga; el resto sigue fuera del worker
+            job.status = POSTPROCESSING
+            if self.store:
+                self.store.record(job)
+            self.on_status(job)
+            self.submit_postprocess(self._postprocess_job, job)
+            return
+        if job.status == FAILED:
+            self.metrics.record_job(job)
+        self.on_status(job)
+
+    def _postprocess_job(self, job):
+        started = time.monotonic()
+        try:
+            self.finalize(job)
+            job.status = DONE
+            job.error = None
+        except Exception as e:
+            # El usuario no tiene el resultado final (p. ej. el video
+            # remuxado): el trabajo cuenta como fallido
+            self.on_log(f">> Error en postproceso de {job.name}: {e}")
+            job.status = FAILED
+            job.error = f"Postproceso: {e}"
+        job.timings['postprocess'] = time.monotonic() - started
+        if self.store:
+            self.store.record(job)
+        self.metrics.record_job(job)
+        self.on_status(job)
+
+    def submit_postprocess(self, function, job):
+        """Encola `function(job)` en el pool de postproceso"""
+        with self._post_lock:
+            if self._post_executor is None:
+                workers = self.settings.get('post_workers') or postprocess.POST_WORKERS
+                self._post_executor = ThreadPoolExecutor(
+                    max_workers=int(workers), thread_name_prefix='postprocess')
+            future = self._post_executor.submit(function, job)
+            self._post_futures.append(future)
+        return future
+
+    def wait_postprocess(self):
+        """Espera a los postprocesos pendientes y libera su pool"""
+        while True:
+            with self._post_lock:
+                futures, self._post_futures = self._post_futures, []
+                if not futures:
+                    if self._post_executor:
+                        self._post_executor.shutdown(wait=False)
+                        self._post_executor = None
+                    return
+            wait(futures)
+
+    def _on_progress(self, job):
+        parent = job.parent
+        if parent:
+            parent.percent = sum(p.percent for p in parent.parts) / len(parent.parts)
+            job = parent
+        self.on_progress(job)
+
+    def _log_job(self, job, line):
+        self.on_log(f"[{job.name}] {line}" if job else line)
+
+    def attach_pool(self):
+        """Crea el pool o adapta el existente a este lote"""
+        concurrency = self.settings.get('concurrency', 1)
+        if self.pool is None:
+            self.pool = JobPool(self.settings, concurrency=concurrency)
+        pool = self.pool
+        pool.settings.update(self.settings)
+        pool.concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+        pool.retry_policy = RetryPolicy.from_settings(pool.settings)
+        pool.reload_accounts()
+        pool.on_log = self._log_job
+        pool.on_status = self._on_status
+        pool.on_progress = self._on_progress
+        pool.verify = self.verify_download
+        pool.resources = self.resources
+        pool.store = self.store
+        return pool
+
+    def _pending(self, jobs):
+        """Trabajos a enviar al pool: los largos se envían como sus segmentos"""
+        pending = []
+        for job in jobs:
+            if job.status == DONE:
+                # Recuperado de caché
+                self.metrics.record_job(job)
+                self.on_status(job)
+                continue
+            if job.parts:
+                if self.store:
+                    self.store.record(job)
+                missing = [part for part in job.parts if part.status != DONE]
+                if not missing and job.status != POSTPROCESSING:
+                    # Reanudado con todos los segmentos ya descargados
+                    job.status = POSTPROCESSING
+                    self.on_status(job)
+                    self.submit_postprocess(self._merge_parent, job)
+                pending.extend(missing)
+            else:
+                pending.append(job)
+        return pending
+
+    def run(self, jobs):
+        """Procesa los trabajos pendientes; True si todos terminan bien"""
+        pending = self._pending(jobs)
+        if not pending:
+            self.wait_postprocess()
+            return all(job.status == DONE for job in jobs)
+
+        pool = self.attach_pool()
+        if pool.local_mode() == 'always':
+            self.on_log(f">> {len(pending)} trabajo(s) con mejora local")
+        else:
+            accounts = (f" de {len(pool.accounts)} cuentas"
+                        if len(pool.accounts) > 1 else "")
+            self.on_log(f">> {len(pending)} trabajo(s) con "
+                        f"{len(pool.remote_lanes())} sesión(es) en paralelo{accounts}")
+        self._running.set()
+        try:
+            pool.run(pending)
+            while True:
+                self.wait_postprocess()
+                # Trabajos añadidos justo cuando el pool terminaba
+                with self._add_lock:
+                    if pool.idle():
+                        self._running.clear()
+                        break
+                pool.wait_idle()
+        finally:
+            self.wait_postprocess()
+            self._running.clear()
+            for worker in list(pool.workers.values()):
+                self.metrics.record_worker(worker)
+        return all(job.status == DONE for job in jobs)
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def add(self, jobs):
+        """
+        Suma trabajos (preparados por cualquier Pipeline) al lote en marcha.
+
+        Se entregan con los callbacks y métricas de este pipeline; devuelve
+        False si el lote ya terminó y hay que lanzarlos con `run()`.
+        """
+        with self._add_lock:
+            if not self.running:
+                return False
+            pending = self._pending(jobs)
+            if pending:
+                self.on_log(f">> {len(pending)} trabajo(s) añadidos a la cola "
+                            f"({pending[0].owner})")
+                self.pool.add(pending)
+        return True
+
+    def wait_jobs(self, jobs, interval=1):
+        """Espera a que los trabajos dados terminen o a que acabe el lote"""
+        while self.running and any(job.status not in (DONE, FAILED) for job in jobs):
+            time.sleep(interval)
+        return all(job.status == DONE for job in jobs)
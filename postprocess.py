@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Postproceso de descargas
+Normalización de sonoridad, conversión de formato y remux tras cada descarga
+"""
+
+import json
+import os
+import re
+import subprocess
+from pathlib import Path
+
+import media
+
+# Postprocesos simultáneos: cada uno es un proceso FFmpeg aparte
+POST_WORKERS = 2
+
+# El resultado de Adobe se conserva con este sufijo si el final lo reemplaza
+ADOBE_SUFFIX = '_adobe'
+
+# loudnorm: pico real máximo (dBTP) y rango de sonoridad
+LOUDNESS_TRUE_PEAK = -1.5
+LOUDNESS_RANGE = 11
+
+# Formatos de salida de audio: nombre → (extensión, argumentos del códec)
+FORMATS = {
+    'wav': ('.wav', ['-c:a', 'pcm_s16le']),
+    'flac': ('.flac', ['-c:a', 'flac']),
+    'mp3': ('.mp3', ['-c:a', 'libmp3lame', '-b:a', '192k']),
+    'm4a': ('.m4a', ['-c:a', media.AUDIO_CODEC, '-b:a', media.AUDIO_BITRATE])
+}
+
+
+def options_from_settings(settings):
+    """Opciones de postproceso activas en settings (dict vacío si ninguna)"""
+    options = {}
+    if settings.get('post_loudness'):
+        options['loudness'] = float(settings['post_loudness'])
+    if settings.get('post_sample_rate'):
+        options['sample_rate'] = int(settings['post_sample_rate'])
+    fmt = (settings.get('post_format') or '').lower().lstrip('.')
+    if fmt in FORMATS:
+        options['format'] = fmt
+    return options
+
+
+def variant(settings):
+    """Sufijo de la clave de caché para los ajustes que cambian la salida"""
+    options = options_from_settings(settings)
+    parts = [f"{key[0]}{value}" for key, value in sorted(options.items())]
+    if not settings.get('remux_video', True):
+        parts.append('novideo')
+    return '-'.join(parts) or None
+
+
+def output_suffix(options, default):
+    """Extensión del resultado final según el formato elegido"""
+    if options.get('format'):
+        return FORMATS[options['format']][0]
+    return default
+
+
+def _codec_args(suffix):
+    for extension, args in FORMATS.values():
+        if extension == suffix.lower():
+            return args
+    return ['-c:a', media.AUDIO_CODEC, '-b:a', media.AUDIO_BITRATE]
+
+
+def loudnorm_filter(target, measured=None):
+    """Filtro loudnorm; con las mediciones de la primera pasada es lineal"""
+    text = f"loudnorm=I={target}:TP={LOUDNESS_TRUE_PEAK}:LRA={LOUDNESS_RANGE}"
+    if measured:
+        text += (f":measured_I={measured['input_i']}"
+                 f":measured_TP={measured['input_tp']}"
+                 f":measured_LRA={measured['input_lra']}"
+                 f":measured_thresh={measured['input_thresh']}"
+                 f":offset={measured['target_offset']}:linear=true")
+    return text
+
+
+def measure_loudness(path, target):
+    """
+    Primera pasada de loudnorm: lee el audio completo en streaming (sin
+    escribir nada) y devuelve sus mediciones, o None si no se pudieron leer.
+    """
+    ffmpeg = media.find_ffmpeg()
+    if not ffmpeg:
+        raise media.MediaError("FFmpeg no está instalado o no está en el PATH")
+    result = subprocess.run(
+        [ffmpeg, '-hide_banner', '-nostats', '-i', str(path), '-vn',
+         '-af', loudnorm_filter(target) + ':print_format=json',
+         '-f', 'null', '-'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    if result.returncode != 0:
+        raise media.MediaError(result.stderr.strip()[-500:])
+    match = re.search(r'\{[^{}]*"input_i"[^{}]*\}', result.stderr)
+    if not match:
+        return None
+    measured = json.loads(match.group(0))
+    # Silencio total: loudnorm devuelve -inf y la pasada lineal fallaría
+    if 'inf' in str(measured.get('input_i')):
+        return None
+    return measured
+
+
+def render(audio, output, video=None, options=None):
+    """
+    Escribe el resultado final en una pasada de FFmpeg.
+
+    Con `video` el audio reemplaza la pista del video original (el video se
+    copia sin recodificar); si no, se convierte al formato de `output`.
+    FFmpeg procesa el audio en streaming, la memoria no depende de la duración.
+    """
+    options = options or {}
+    args = []
+    if video:
+        args += ['-i', str(video)]
+    args += ['-i', str(audio)]
+    if video:
+        args += ['-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy',
+                 '-c:a', media.AUDIO_CODEC, '-b:a', media.AUDIO_BITRATE,
+                 '-shortest']
+    else:
+        args += ['-map', '0:a:0'] + _codec_args(Path(output).suffix)
+
+    if options.get('loudness') is not None:
+        measured = measure_loudness(audio, options['loudness'])
+        args += ['-af', loudnorm_filter(options['loudness'], measured)]
+        # loudnorm remuestrea internamente a 192 kHz
+        args += ['-ar', str(options.get('sample_rate') or media.AUDIO_SAMPLE_RATE)]
+    elif options.get('sample_rate'):
+        args += ['-ar', str(options['sample_rate'])]
+    media.run_ffmpeg(args + [str(output)])
+    return Path(output)
+
+
+def finalize_output(audio, output, video=None, options=None, keep_original=True):
+    """
+    Genera `output` a partir del audio descargado de Adobe.
+
+    Con `keep_original` el audio descargado se conserva (renombrado con
+    ADOBE_SUFFIX si el resultado ocupa su mismo nombre); si no, se elimina
+    una vez escrito el resultado. Devuelve la ruta final.
+    """
+    audio = Path(audio)
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if audio == output and not keep_original:
+        # FFmpeg no puede escribir sobre su propia entrada
+        temp = output.with_name(f"{output.stem}.tmp{output.suffix}")
+        try:
+            render(audio, temp, video, options)
+            os.replace(temp, output)
+        finally:
+            temp.unlink(missing_ok=True)
+        return output
+
+    kept = None
+    if audio == output:
+        kept = audio.with_name(f"{audio.stem}{ADOBE_SUFFIX}{audio.suffix}")
+        os.replace(audio, kept)
+        audio = kept
+    try:
+        render(audio, output, video, options)
+    except Exception:
+        if kept:
+            os.replace(kept, output)
+        raise
+    if not keep_original:
+        audio.unlink(missing_ok=True)
+    return output
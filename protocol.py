@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Protocolo de eventos con automation.js
+Lectura no bloqueante de eventos JSON por línea desde stdout y stderr
+"""
+
+import json
+import threading
+
+# Tipos de evento emitidos por automation.js (método emit)
+LOG = 'log'          # {message}
+PHASE = 'phase'      # {phase, previous, previous_ms, file?, bytes?}
+PROGRESS = 'progress'  # {phase, percent, file?, bytes?, elapsed_ms?}
+ERROR = 'error'      # {phase, message, file?}
+DONE = 'done'        # {file, success, output, output_bytes, failed_phase, bytes, duration_ms}
+RESULT = 'result'    # {success, downloads?: [{file, output, bytes}], error?}
+STDERR = 'stderr'    # Generado en Python para cada línea de stderr
+
+
+def parse_event(line):
+    """
+    Convierte una línea de salida en un evento.
+
+    Las líneas que no son JSON (p. ej. avisos de Node o Chrome) se tratan
+    como eventos de log para no perder información.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = None
+        if isinstance(event, dict) and 'event' in event:
+            return event
+    return {'event': LOG, 'message': line}
+
+
+class EventReader:
+    """
+    Drena stdout y stderr de un proceso en dos threads a la vez.
+
+    Leer ambos pipes en paralelo evita que el hijo se bloquee al llenar el
+    buffer de stderr mientras el padre solo lee stdout. `on_event(evento)`
+    se llama desde los threads lectores.
+    """
+
+    def __init__(self, process, on_event):
+        self.process = process
+        self.on_event = on_event
+        self._threads = []
+        if process.stdout:
+            self._start(process.stdout, self._handle_stdout)
+        if process.stderr:
+            self._start(process.stderr, self._handle_stderr)
+
+    def _start(self, stream, handler):
+        thread = threading.Thread(target=self._drain, args=(stream, handler),
+                                  daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _drain(self, stream, handler):
+        try:
+            for line in stream:
+                handler(line)
+        except ValueError:
+            pass  # Pipe cerrado mientras se leía
+        finally:
+            stream.close()
+
+    def _handle_stdout(self, line):
+        event = parse_event(line)
+        if event:
+            self.on_event(event)
+
+    def _handle_stderr(self, line):
+        line = line.strip()
+        if line:
+            self.on_event({'event': STDERR, 'message': line})
+
+    def wait(self):
+        """Espera a que el proceso termine y se hayan leído ambos pipes"""
+        returncode = self.process.wait()
+        for thread in self._threads:
+            thread.join()
+        return returncode
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Límites de recursos
+Bytes en vuelo, disco temporal, memoria y reciclado de navegadores, y
+limpieza de artefactos viejos (capturas de error, temporales, cachés de perfil)
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import media
+
+# psutil es opcional: sin él no se mide la memoria de los navegadores
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Valores por defecto (configurables en settings.json)
+MAX_IN_FLIGHT_MB = 2048
+TEMP_MAX_GB = 10
+MIN_FREE_DISK_MB = 1024
+BROWSER_RECYCLE_JOBS = 50
+BROWSER_MEMORY_MB = 2048
+PROFILE_MAX_MB = 1024
+ARTIFACT_RETENTION_DAYS = 7
+
+# Artefactos de automation.js y descargas interrumpidas en la carpeta de descarga
+ARTIFACT_PATTERNS = ('error_*.png', 'debug_*.png', '*.crdownload', '*.tmp.*')
+
+# Descargas sin renombrar: con allowAndName Chrome guarda cada una como
+# <carpeta>/<guid>, sin extensión, hasta que automation.js le da su nombre
+DOWNLOAD_GUID = re.compile(r'[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}', re.I)
+
+# Cachés de Chrome que se pueden borrar sin perder la sesión (cookies y
+# almacenamiento local quedan intactos)
+PROFILE_CACHE_DIRS = ('Default/Cache', 'Default/Code Cache', 'Default/GPUCache',
+                      'Default/Service Worker/CacheStorage',
+                      'Default/Service Worker/ScriptCache',
+                      'ShaderCache', 'GrShaderCache', 'GraphiteDawnCache')
+
+MB = 1024 * 1024
+
+
+class ResourceError(Exception):
+    """No hay recursos para empezar un trabajo (p. ej. disco lleno)"""
+
+
+def directory_size(path):
+    """Bytes ocupados por los archivos bajo `path` (0 si no existe)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def free_space(path):
+    """Bytes libres en el disco de `path` (o de su primer ancestro existente)"""
+    path = Path(path)
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    try:
+        return shutil.disk_usage(path).free
+    except OSError:
+        return None
+
+
+def process_memory(pid):
+    """RSS en bytes de un proceso y sus descendientes (None sin psutil)"""
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+def profile_dir(profile):
+    """Directorio del perfil de Chrome, igual que en automation.js"""
+    base = (os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA')
+            or str(Path.home() / '.config'))
+    return Path(base) / 'AdobePodcastEnhancer' / profile
+
+
+def trim_profile(profile, max_bytes):
+    """
+    Borra las cachés del perfil si supera `max_bytes`.
+
+    Solo debe llamarse con el navegador cerrado. Devuelve los bytes liberados.
+    """
+    directory = profile_dir(profile)
+    if not max_bytes or directory_size(directory) <= max_bytes:
+        return 0
+    freed = 0
+    for relative in PROFILE_CACHE_DIRS:
+        cache = directory / relative
+        if cache.is_dir():
+            freed += directory_size(cache)
+            shutil.rmtree(cache, ignore_errors=True)
+    return freed
+
+
+def cleanup_artifacts(directories, retention_days, temp_dir=None):
+    """
+    Borra los artefactos de más de `retention_days` días.
+
+    En `directories` (carpetas de descarga) solo se tocan ARTIFACT_PATTERNS
+    y las descargas que quedaron con el nombre GUID de Chrome; en `temp_dir` cualquier archivo, ya que todo lo que contiene son
+    intermedios de lotes anteriores. Devuelve (archivos, bytes) borrados.
+    """
+    if retention_days is None or retention_days < 0:
+        return 0, 0
+    limit = time.time() - retention_days * 86400
+    candidates = []
+    for directory in directories:
+        directory = Path(directory)
+        if directory.is_dir():
+            for pattern in ARTIFACT_PATTERNS:
+                candidates.extend(directory.glob(pattern))
+            candidates.extend(p for p in directory.iterdir()
+                              if DOWNLOAD_GUID.fullmatch(p.name) and p.is_file())
+    if temp_dir and Path(temp_dir).is_dir():
+        candidates.extend(p for p in Path(temp_dir).rglob('*') if p.is_file())
+
+    removed = freed = 0
+    for path in set(candidates):
+        try:
+            stat = path.stat()
+            if stat.st_mtime >= limit:
+                continue
+            path.unlink()
+        except OSError:
+            continue
+        removed += 1
+        freed += stat.st_size
+    return removed, freed
+
+
+class ResourceGovernor:
+    """
+    Límites compartidos por los workers de un JobPool.
+
+    - Bytes en vuelo: un trabajo no empieza si sumado a los que se están
+      subiendo supera `max_in_flight_mb` (uno solo siempre puede empezar,
+      aunque sea más grande que el límite). Los bytes se devuelven al
+      terminar la subida, no el trabajo.
+    - Disco: con menos de `min_free_disk_mb` libres en la carpeta de
+      descarga el trabajo falla con ResourceError en lugar de llenar el
+      disco a mitad de la descarga.
+    - Navegadores: un worker se recicla (cierra y vuelve a lanzar) tras
+      `browser_recycle_jobs` trabajos o si supera `browser_memory_mb`, y
+      con el navegador cerrado se recortan las cachés del perfil.
+
+    Los límites se leen de `settings` en cada uso; 0 desactiva cada uno.
+    """
+
+    def __init__(self, settings, on_log=None):
+        self.settings = settings
+        self.on_log = on_log or (lambda message: None)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def _mb(self, key, default):
+        return int(self.settings.get(key, default) or 0) * MB
+
+    def check_disk(self):
+        """Lanza ResourceError si la carpeta de descarga se queda sin espacio"""
+        minimum = self._mb('min_free_disk_mb', MIN_FREE_DISK_MB)
+        free = free_space(self.settings['download_path'])
+        if minimum and free is not None and free < minimum:
+            raise ResourceError(f"Espacio insuficiente en disco: "
+                                f"{free / MB:.0f} MB libres")
+
+    def acquire(self, size, stopped=None):
+        """
+        Reserva `size` bytes en vuelo, esperando a que se liberen si hace
+        falta. Devuelve False si `stopped` se activa durante la espera.
+        """
+        limit = self._mb('max_in_flight_mb', MAX_IN_FLIGHT_MB)
+        with self._cond:
+            waiting = False
+            while limit and self.in_flight and self.in_flight + size > limit:
+                if stopped is not None and stopped.is_set():
+                    return False
+                if not waiting:
+                    waiting = True
+                    self.on_log(f">> Esperando a que terminen otras subidas "
+                                f"({self.in_flight / MB:.0f} MB en vuelo)")
+                self._cond.wait(1)
+            self.in_flight += size
+            return True
+
+    def release(self, size):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - size)
+            self._cond.notify_all()
+
+    def recycle_reason(self, worker):
+        """Motivo para reciclar el navegador de `worker`, o None"""
+        jobs = int(self.settings.get('browser_recycle_jobs', BROWSER_RECYCLE_JOBS) or 0)
+        if jobs and worker.jobs_since_start >= jobs:
+            return f"{worker.jobs_since_start} trabajos"
+        limit = self._mb('browser_memory_mb', BROWSER_MEMORY_MB)
+        if limit and worker.alive:
+            memory = process_memory(worker.process.pid)
+            if memory is not None and memory > limit:
+                return f"{memory / MB:.0f} MB de memoria"
+        return None
+
+    def maybe_recycle(self, worker):
+        """Cierra el navegador si toca reciclarlo; se relanza al siguiente trabajo"""
+        reason = self.recycle_reason(worker)
+        if not reason:
+            return False
+        self.on_log(f">> Reciclando el navegador del worker {worker.index + 1} "
+                    f"({reason})")
+        worker.stop()
+        self.trim_profile(worker.profile)
+        return True
+
+    def trim_profile(self, profile):
+        freed = trim_profile(profile, self._mb('profile_max_mb', PROFILE_MAX_MB))
+        if freed:
+            self.on_log(f">> Caché del perfil {profile} recortada "
+                        f"({freed / MB:.0f} MB)")
+
+    def temp_budget(self):
+        """Bytes que aún caben en el directorio temporal"""
+        limit = int(self.settings.get('temp_max_gb', TEMP_MAX_GB) or 0) * 1024 * MB
+        available = free_space(media.TEMP_DIR)
+        budget = None
+        if limit:
+            budget = limit - directory_size(media.TEMP_DIR)
+        if available is not None:
+            minimum = self._mb('min_free_disk_mb', MIN_FREE_DISK_MB)
+            available -= minimum
+            budget = available if budget is None else min(budget, available)
+        return budget
+
+    def cleanup(self):
+        """Limpieza por antigüedad de artefactos y temporales"""
+        retention = self.settings.get('artifact_retention_days',
+                                      ARTIFACT_RETENTION_DAYS)
+        removed, freed = cleanup_artifacts([self.settings['download_path']],
+                                           retention, media.TEMP_DIR)
+        if removed:
+            self.on_log(f">> Limpieza: {removed} archivo(s) de más de "
+                        f"{retention} día(s), {freed / MB:.0f} MB liberados")
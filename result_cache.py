@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Caché de resultados
+Evita volver a mejorar archivos idénticos con los mismos ajustes
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from config import CONFIG_DIR
+
+CACHE_DIR = CONFIG_DIR / "cache"
+INDEX_FILE = CACHE_DIR / "index.json"
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3  # 20 GB
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """SHA-256 del contenido leído por bloques (memoria constante)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path, speech_level, background_level, variant=None):
+    """Clave de caché: contenido del archivo + ajustes de mejora y postproceso"""
+    key = f"{file_hash(path)}-s{int(speech_level)}-b{int(background_level)}"
+    return f"{key}-{variant}" if variant else key
+
+
+class ResultCache:
+    """
+    Guarda una copia de cada salida mejorada indexada por `cache_key`.
+
+    El índice registra el tamaño y el último uso de cada entrada; cuando el
+    total supera `max_bytes` se eliminan las menos usadas recientemente.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.index_file = cache_dir / INDEX_FILE.name
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if not self.index_file.exists():
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Descartar entradas cuyo archivo ya no existe
+        return {key: entry for key, entry in index.items()
+                if (self.cache_dir / entry['file']).exists()}
+
+    def _save_index(self):
+        tmp_path = self.index_file.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        tmp_path.replace(self.index_file)
+
+    def get(self, key):
+        """Ruta del resultado guardado o None si no está en caché"""
+        with self._lock:
+            entry = self._index.get(key)
+            if not entry:
+                return None
+            path = self.cache_dir / entry['file']
+            if not path.exists():
+                del self._index[key]
+                self._save_index()
+                return None
+            entry['last_used'] = time.time()
+            self._save_index()
+            return path
+
+    def put(self, key, output_path):
+        """
+        Guarda una copia del resultado.
+
+        Copia y no hard link: el resultado entregado es del usuario, y si
+        compartiera inodo con la entrada cualquier edición posterior del
+        archivo corrompería la caché.
+        """
+        file_name = f"{key}{output_path.suffix}"
+        target = self.cache_dir / file_name
+        tmp_path = target.with_name(target.name + '.tmp')
+        with self._lock:
+            shutil.copy2(output_path, tmp_path)
+            os.replace(tmp_path, target)
+            self._index[key] = {
+                'file': file_name,
+                'size': target.stat().st_size,
+                'last_used': time.time()
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta respetar el límite"""
+        total = sum(entry['size'] for entry in self._index.values())
+        by_age = sorted(self._index.items(),
+                        key=lambda item: item[1]['last_used'])
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            (self.cache_dir / entry['file']).unlink(missing_ok=True)
+            total -= entry['size']
+            del self._index[key]
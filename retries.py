@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Reintentos y cortacircuitos
+Backoff exponencial con jitter por trabajo y pausa global si el servicio falla
+"""
+
+import random
+import threading
+import time
+
+# Valores por defecto (configurables en settings.json)
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+RETRY_BACKOFF_MAX = 600
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 120
+
+# Límites de cada fase en segundos (upload_timeout, processing_timeout, download_timeout)
+PHASE_TIMEOUTS = {
+    'uploading': 300,
+    'processing': 900,
+    'downloading': 300
+}
+
+
+class RetryPolicy:
+    """
+    Cuántas veces y cuándo se vuelve a intentar un trabajo fallido.
+
+    La espera sigue un backoff exponencial con "full jitter": un valor
+    aleatorio entre 0 y base·2^(intento-1), acotado a `max_delay`. El jitter
+    evita que varios workers reintenten a la vez contra un servicio que
+    acaba de recuperarse.
+    """
+
+    def __init__(self, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BACKOFF_SECONDS,
+                 max_delay=RETRY_BACKOFF_MAX):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('retry_attempts', RETRY_ATTEMPTS),
+                   settings.get('retry_backoff_seconds', RETRY_BACKOFF_SECONDS))
+
+    def should_retry(self, attempt):
+        """True si tras el intento número `attempt` (desde 1) queda otro"""
+        return attempt < self.attempts
+
+    def delay(self, attempt):
+        """Segundos de espera antes del intento `attempt + 1`"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Detiene el envío de trabajos cuando fallan demasiados seguidos.
+
+    Tras `threshold` fallos consecutivos el circuito se abre y nadie toma
+    trabajos durante `cooldown` segundos; después se deja pasar uno de
+    prueba (semiabierto). Si funciona el circuito se cierra; si falla se
+    vuelve a abrir con el doble de pausa (hasta `max_cooldown`).
+
+    La prueba la reserva `claim_probe(job)` una vez sacado el trabajo de la
+    cola; si el trabajo termina sin resultado del servicio (sin disco, lote
+    detenido) `release_probe(job)` la devuelve para que otro la tome.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS,
+                 max_cooldown=RETRY_BACKOFF_MAX * 3, on_change=None):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.on_change = on_change or (lambda state, message: None)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._current_cooldown = cooldown
+        self._opened_at = None
+        self._probe = None  # Trabajo de prueba en curso (semiabierto)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings, on_change=None):
+        return cls(settings.get('breaker_threshold', BREAKER_THRESHOLD),
+                   settings.get('breaker_cooldown_seconds', BREAKER_COOLDOWN_SECONDS),
+                   on_change=on_change)
+
+    def wait_time(self):
+        """
+        Segundos que hay que esperar antes de tomar un trabajo (0 = adelante).
+
+        En estado semiabierto obtiene 0 mientras nadie haya reservado la
+        prueba con `claim_probe()`; después el resto espera a su resultado.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self._current_cooldown - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self.state = self.HALF_OPEN
+                self._probe = None
+            return 1 if self._probe is not None else 0
+
+    def claim_probe(self, job):
+        """
+        Reserva la prueba para `job` si el circuito está semiabierto y libre.
+        True si `job` es ahora el trabajo de prueba.
+        """
+        with self._lock:
+            if self.state != self.HALF_OPEN or self._probe is not None:
+                return False
+            self._probe = job
+        self.on_change(self.HALF_OPEN, ">> Probando de nuevo el servicio con un trabajo")
+        return True
+
+    def release_probe(self, job):
+        """Devuelve la prueba de `job` sin contar éxito ni fallo"""
+        with self._lock:
+            if self._probe is job:
+                self._probe = None
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self._failures = 0
+            self._current_cooldown = self.cooldown
+            self._probe = None
+        if recovered:
+            self.on_change(self.CLOSED, ">> Servicio recuperado, se reanuda el lote")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                self._current_cooldown = min(self.max_cooldown,
+                                             self._current_cooldown * 2)
+            elif self.state == self.OPEN or self._failures < self.threshold:
+                return
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe = None
+            cooldown = self._current_cooldown
+        self.on_change(self.OPEN, f">> {self._failures} fallos seguidos: pausa "
+                                  f"de {cooldown:.0f}s antes de seguir")
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Planificador de la cola
+Prioridades, reparto justo entre usuarios y primero el más corto
+"""
+
+import heapq
+import itertools
+from pathlib import Path
+
+# Prioridades de un trabajo (mayor = antes)
+PRIORITIES = {'baja': -1, 'normal': 0, 'alta': 1, 'urgente': 2}
+
+# fifo: en orden de llegada; sjf: primero el de menor duración estimada
+POLICIES = ('fifo', 'sjf')
+
+# Sin duración conocida se estima por tamaño (~160 kbit/s de audio)
+BYTES_PER_SECOND = 20000
+
+
+def job_cost(job):
+    """Segundos estimados de un trabajo (para SJF y el reparto justo)"""
+    if job.estimate:
+        return job.estimate
+    try:
+        return Path(job.upload_path).stat().st_size / BYTES_PER_SECOND
+    except OSError:
+        return 1
+
+
+class JobScheduler:
+    """
+    Cola de trabajos listos con planificación por prioridad y usuario.
+
+    `pop()` elige primero la prioridad más alta presente; dentro de ella,
+    el usuario (`job.owner`) que menos trabajo estimado ha recibido, de
+    modo que un lote de horas de un usuario no bloquea los clips cortos de
+    otro; y dentro del usuario, el primero según `rank` (orden de llegada o
+    duración, según la política, salvo que se haya movido a mano).
+    Un usuario que llega a una cola ocupada empieza con el contador del
+    menos servido, así no acapara los workers para "ponerse al día".
+
+    Los trabajos retenidos (`job.held`) y toda la cola en pausa no se
+    entregan. No es thread-safe: JobPool lo usa bajo su Condition.
+    """
+
+    def __init__(self, policy='fifo'):
+        self.policy = policy if policy in POLICIES else 'fifo'
+        self.paused = False
+        self._jobs = []
+        self._order = itertools.count()
+        self._served = {}
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def _rank(self, job):
+        if self.policy == 'sjf':
+            return job_cost(job)
+        return job.seq
+
+    def push(self, job):
+        owner = job.owner
+        active = {j.owner for j in self._jobs}
+        if owner not in active:
+            floor = min((self._served.get(o, 0) for o in active), default=0)
+            self._served[owner] = max(self._served.get(owner, 0), floor)
+        job.seq = next(self._order)
+        job.rank = self._rank(job)
+        self._jobs.append(job)
+
+    def clear(self):
+        self._jobs.clear()
+
+    def set_policy(self, policy):
+        """Cambia la política y reordena (descarta los movimientos manuales)"""
+        self.policy = policy if policy in POLICIES else 'fifo'
+        for job in self._jobs:
+            job.rank = self._rank(job)
+
+    def _candidates(self):
+        return [job for job in self._jobs if not job.held]
+
+    def _choose(self, jobs, served):
+        top = max(job.priority for job in jobs)
+        band = [job for job in jobs if job.priority == top]
+        owner = min({job.owner for job in band},
+                    key=lambda o: (served.get(o, 0),
+                                   min(j.seq for j in band if j.owner == o)))
+        return min((job for job in band if job.owner == owner),
+                   key=lambda job: (job.rank, job.seq))
+
+    def pop(self):
+        """Siguiente trabajo a ejecutar, o None (cola vacía, en pausa o retenida)"""
+        if self.paused:
+            return None
+        jobs = self._candidates()
+        if not jobs:
+            return None
+        job = self._choose(jobs, self._served)
+        self._jobs.remove(job)
+        self._served[job.owner] = self._served.get(job.owner, 0) + job_cost(job)
+        return job
+
+    def snapshot(self, limit=None):
+        """
+        Trabajos en el orden en que se entregarían (retenidos al final);
+        con `limit`, solo los `limit` primeros.
+
+        Repite la elección de `pop()` sobre grupos (prioridad, usuario) ya
+        ordenados, así una cola de miles de trabajos no cuesta n² pasadas.
+        """
+        groups = {}
+        for job in self._candidates():
+            groups.setdefault((job.priority, job.owner), []).append(job)
+        # Cada grupo de mayor a menor (rank, seq) para sacar por el final, y
+        # el menor seq pendiente de cada uno (desempate entre usuarios)
+        first = {}
+        for key, jobs in groups.items():
+            jobs.sort(key=lambda job: (job.rank, job.seq), reverse=True)
+            first[key] = [job.seq for job in jobs]
+            heapq.heapify(first[key])
+        taken = set()
+
+        def first_seq(key):
+            seqs = first[key]
+            while seqs[0] in taken:
+                heapq.heappop(seqs)
+            return seqs[0]
+
+        served = dict(self._served)
+        ordered = []
+        while groups and (limit is None or len(ordered) < limit):
+            top = max(priority for priority, _ in groups)
+            key = min((k for k in groups if k[0] == top),
+                      key=lambda k: (served.get(k[1], 0), first_seq(k)))
+            job = groups[key].pop()
+            taken.add(job.seq)
+            if not groups[key]:
+                del groups[key]
+            served[job.owner] = served.get(job.owner, 0) + job_cost(job)
+            ordered.append(job)
+        if limit is not None and len(ordered) >= limit:
+            return ordered
+        held = [job for job in self._jobs if job.held]
+        return ordered + (held if limit is None else held[:limit - len(ordered)])
+
+    def move(self, job, offset):
+        """
+        Adelanta (offset < 0) o retrasa un trabajo respecto a los de su
+        mismo usuario y prioridad. True si cambió de posición.
+        """
+        group = sorted((j for j in self._jobs if j.owner == job.owner
+                        and j.priority == job.priority),
+                       key=lambda j: (j.rank, j.seq))
+        if job not in group:
+            return False
+        index = group.index(job)
+        target = index + offset
+        if offset == 0 or not 0 <= target < len(group):
+            return False
+        group.remove(job)
+        group.insert(target, job)
+        # Se reparten los mismos rangos en el nuevo orden; los repetidos
+        # (misma duración en SJF) se separan para que el orden se mantenga
+        previous = None
+        for j, rank in zip(group, sorted(j.rank for j in group)):
+            if previous is not None and rank <= previous:
+                rank = previous + 1e-6
+            j.rank = previous = rank
+        return True
+
+    def hold(self, job, held=True):
+        job.held = held
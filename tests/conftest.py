@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures comunes: rutas del proyecto, worker simulado y configuración
+mínima de un lote en un directorio temporal
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import media  # noqa: E402
+import node_worker  # noqa: E402
+
+FAKE_WORKER = Path(__file__).with_name('fake_worker.js')
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(tmp_path, monkeypatch):
+    """
+    TEMP_DIR propio de cada test: la limpieza de Pipeline.prepare_batch()
+    borra intermedios antiguos y no debe tocar los de un lote real
+    """
+    directory = tmp_path / 'temporales'
+    monkeypatch.setattr(media, 'TEMP_DIR', directory)
+    return directory
+
+
+@pytest.fixture
+def fake_worker(monkeypatch):
+    """Los NodeWorker lanzan tests/fake_worker.js en lugar de automation.js"""
+    if shutil.which('node') is None:
+        pytest.skip("requiere Node.js")
+    monkeypatch.setattr(node_worker, 'SCRIPT_PATH', FAKE_WORKER)
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return {
+        'email': 'test@example.com',
+        'password': 'secreto',
+        'download_path': str(tmp_path / 'descargas'),
+        'speech_level': 70,
+        'background_level': 10,
+        'profile_prefix': 'TestProfile',
+        'headless': True,
+    }
+
+
+def make_file(path, size):
+    """Archivo de `size` bytes (el worker simulado no lo decodifica)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'\0' * size)
+    return path
@@ -0,0 +1,143 @@
+/**
+ * Worker simulado para los tests: habla el mismo protocolo que
+ * `automation.js --serve` sin abrir ningún navegador.
+ *
+ * Sin --url el trabajo se completa al momento y la descarga es una copia
+ * del archivo subido. Con --url (un FakeEnhanceServer de benchmarks/) el
+ * archivo se sube por HTTP y se descarga el resultado; la subida respeta
+ * el límite de "throttle" como lo haría Network.emulateNetworkConditions.
+ */
+
+const fs = require('fs');
+const http = require('http');
+const path = require('path');
+const readline = require('readline');
+
+const CHUNK = 16 * 1024;
+
+const args = process.argv.slice(2);
+const option = (name) => {
+    const i = args.indexOf(name);
+    return i >= 0 ? args[i + 1] : null;
+};
+const serviceUrl = option('--url');
+
+let currentJob = null;
+let currentPhase = 'startup';
+let phaseStartedAt = Date.now();
+let uploadRate = -1;
+
+function emit(event, data = {}) {
+    process.stdout.write(JSON.stringify({ event, job: currentJob, ts: Date.now(), ...data }) + '\n');
+}
+
+function phase(name, data = {}) {
+    const now = Date.now();
+    emit('phase', { phase: name, previous: currentPhase, previous_ms: now - phaseStartedAt, ...data });
+    currentPhase = name;
+    phaseStartedAt = now;
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function request(method, url, body) {
+    return new Promise((resolve, reject) => {
+        const req = http.request(url, { method, headers: body ? { 'Content-Length': body.length } : {} }, (res) => {
+            const chunks = [];
+            res.on('data', (chunk) => chunks.push(chunk));
+            res.on('end', () => resolve({ status: res.statusCode, body: Buffer.concat(chunks) }));
+        });
+        req.on('error', reject);
+        if (!body) {
+            req.end();
+            return;
+        }
+        // Escritura por bloques al ritmo del límite actual
+        (async () => {
+            for (let start = 0; start < body.length; start += CHUNK) {
+                const block = body.subarray(start, start + CHUNK);
+                if (!req.write(block)) {
+                    await new Promise((next) => req.once('drain', next));
+                }
+                if (uploadRate > 0) {
+                    await sleep(block.length / uploadRate * 1000);
+                }
+            }
+            req.end();
+        })().catch(reject);
+    });
+}
+
+async function processJob(message) {
+    const data = fs.readFileSync(message.file);
+    const extension = path.extname(message.file) || '.wav';
+    const output = path.join(message.download_path, message.output_stem + extension);
+    fs.mkdirSync(message.download_path, { recursive: true });
+
+    phase('uploading', { file: message.file, bytes: data.length });
+    let result = data;
+    if (serviceUrl) {
+        const origin = new URL(serviceUrl).origin;
+        const name = encodeURIComponent(path.basename(message.file));
+        const upload = await request('POST', `${origin}/upload?name=${name}`, data);
+        const job = JSON.parse(upload.body.toString());
+        phase('processing');
+        await sleep(job.ready_in_ms);
+        if (!job.ok) {
+            emit('error', { phase: 'processing', message: 'Error: processing of the upload failed' });
+            emit('done', { file: message.file, success: false, failed_phase: 'processing' });
+            return;
+        }
+        phase('downloading');
+        result = (await request('GET', `${origin}/download/${job.id}`)).body;
+    } else {
+        phase('processing');
+        phase('downloading');
+    }
+    fs.writeFileSync(output, result);
+    emit('done', {
+        file: message.file, success: true, output,
+        output_bytes: result.length, bytes: data.length
+    });
+}
+
+const queue = [];
+let running = false;
+
+async function drain() {
+    if (running) return;
+    running = true;
+    while (queue.length) {
+        const message = queue.shift();
+        currentJob = message.id;
+        try {
+            await processJob(message);
+        } catch (e) {
+            emit('error', { phase: currentPhase, message: e.message });
+            emit('done', { file: message.file, success: false, failed_phase: currentPhase });
+        }
+        phase('idle');
+        currentJob = null;
+    }
+    running = false;
+}
+
+setTimeout(() => {
+    phase('login');
+    phase('idle');
+    emit('ready');
+}, 50);
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+    const message = JSON.parse(line);
+    if (message.cmd === 'ping') {
+        emit('pong');
+    } else if (message.cmd === 'shutdown') {
+        process.exit(0);
+    } else if (message.cmd === 'throttle') {
+        uploadRate = message.upload;
+    } else if (message.cmd === 'job') {
+        queue.push(message);
+        drain();
+    }
+});
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Varias cuentas de Adobe: carriles alternos, perfiles, límite por hora,
+pausa por fallos y reparto de un lote entre cuentas
+"""
+
+from collections import Counter
+
+import accounts
+from accounts import Account, AccountPool
+from conftest import make_file
+from metrics import RunMetrics
+from pipeline import Pipeline
+from result_cache import ResultCache
+
+
+def account_settings(settings, **extra):
+    settings = dict(settings, concurrency=1, chunk_minutes=0,
+                    browser_recycle_jobs=0, **extra)
+    settings.setdefault('accounts', [
+        {'email': 'segunda@example.com', 'password': 'q', 'sessions': 2},
+        {'email': 'tercera@example.com', 'password': 'r'},
+    ])
+    return settings
+
+
+def test_lanes_alternate_accounts(settings):
+    pool = AccountPool.from_settings(account_settings(settings))
+    lanes = [(account.email, slot) for account, slot in pool.lanes(1)]
+    assert lanes == [('test@example.com', 0), ('segunda@example.com', 0),
+                     ('tercera@example.com', 0), ('segunda@example.com', 1)]
+
+
+def test_duplicates_and_empty_entries_are_skipped(settings):
+    pool = AccountPool.from_settings(account_settings(settings, accounts=[
+        {'email': 'TEST@example.com', 'password': 'x'},
+        {'email': '  ', 'password': 'y'},
+        {'email': 'otra@example.com', 'password': 'z'},
+    ]))
+    assert [account.email for account in pool.accounts] == [
+        'test@example.com', 'otra@example.com']
+
+
+def test_update_keeps_state_of_remaining_accounts(settings):
+    settings = account_settings(settings)
+    pool = AccountPool.from_settings(settings)
+    second = pool.accounts[1]
+    second.started()
+    settings['accounts'] = settings['accounts'][:1]
+    pool.update(settings)
+    assert len(pool) == 2
+    assert pool.accounts[1] is second
+    assert second.active == 1
+
+
+def test_profiles_per_account():
+    primary = Account('test@example.com', 'p', primary=True)
+    other = Account('otra.persona@example.com', 'q')
+    assert primary.profile(0) == 'ChromeProfile'
+    assert primary.profile(2) == 'ChromeProfile-2'
+    assert other.profile(0).startswith('ChromeProfile-otrapersona-')
+    assert other.profile(1) == other.profile(0) + '-1'
+    # El sufijo del perfil no depende de mayúsculas en el correo
+    assert other.tag[-6:] == Account('OTRA.persona@example.com', 'r').tag[-6:]
+
+
+def test_jobs_per_hour_limit(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(accounts.time, 'monotonic', lambda: now[0])
+    account = Account('a@example.com', 'p', jobs_per_hour=2)
+    account.started()
+    now[0] += 600
+    account.started()
+    assert account.wait_time() == 3000
+    now[0] += 3000
+    assert account.wait_time() == 0
+
+
+def test_failures_pause_the_account(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(accounts.time, 'monotonic', lambda: now[0])
+    account = Account('a@example.com', 'p')
+    account.threshold, account.cooldown = 2, 30
+    assert account.record_failure() == 0
+    assert account.record_failure() == 30
+    assert account.wait_time() == 30
+    # Cada fallo más dobla la pausa hasta el máximo
+    assert account.record_failure() == 60
+    account._failures = 20
+    assert account.record_failure() == accounts.ACCOUNT_MAX_COOLDOWN
+    account.record_success()
+    assert account.wait_time() == 0
+
+
+def test_batch_is_spread_across_accounts(fake_worker, settings, tmp_path):
+    settings = account_settings(settings)
+    files = [make_file(tmp_path / 'grabaciones' / f'charla{i}.wav', 1000 + i)
+             for i in range(8)]
+    pipeline = Pipeline(settings, cache=ResultCache(tmp_path / 'cache'),
+                        metrics=RunMetrics(directory=tmp_path / 'metrics'))
+    jobs = pipeline.prepare_jobs(files)
+    try:
+        assert pipeline.run(jobs)
+        pool = pipeline.pool
+        lanes = pool.remote_lanes()
+        used = Counter(lanes[job.worker][0].email for job in jobs)
+        workers = list(pool.workers.values())
+    finally:
+        pipeline.pool.shutdown()
+    assert set(used) == {'test@example.com', 'segunda@example.com',
+                         'tercera@example.com'}
+    # Cada navegador con su propio perfil
+    profiles = {worker.profile for worker in workers}
+    assert len(profiles) == len(workers) == 4
+    assert all(profile.startswith('TestProfile') for profile in profiles)
+    assert all(job.account is None for job in jobs)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Turnos de subida y límite global de ancho de banda, contra el servicio
+simulado de benchmarks/ con un enlace lento
+"""
+
+import threading
+import time
+
+from bandwidth import UNLIMITED, BandwidthManager, mbps_to_rate
+from conftest import make_file
+from fake_enhance_server import FakeEnhanceServer, Link
+from job_pool import DONE, UPLOADING, JobPool, Job
+
+KB = 1024
+
+
+def test_smallest_upload_gets_the_next_turn():
+    manager = BandwidthManager({'max_concurrent_uploads': 1})
+    assert manager.acquire_upload('a', 1000)
+    order = []
+
+    def upload(key, size):
+        manager.acquire_upload(key, size)
+        order.append(key)
+
+    threads = []
+    for key, size in (('grande', 900), ('pequeño', 100), ('mediano', 500)):
+        thread = threading.Thread(target=upload, args=(key, size), daemon=True)
+        thread.start()
+        threads.append(thread)
+    time.sleep(0.2)
+    assert order == []
+
+    for key in ('a', 'pequeño', 'mediano'):
+        manager.release_upload(key)
+        time.sleep(0.1)
+    manager.release_upload('grande')
+    for thread in threads:
+        thread.join(5)
+    assert order == ['pequeño', 'mediano', 'grande']
+
+
+def test_limit_is_split_between_transfers():
+    applied = {}
+    manager = BandwidthManager({'upload_limit_mbps': 8, 'download_limit_mbps': 16},
+                               apply=lambda key, up, down: applied.update({key: (up, down)}))
+    manager.acquire_upload(1, 10)
+    assert applied[1] == (mbps_to_rate(8), UNLIMITED)
+    manager.acquire_upload(2, 10)
+    assert applied[1] == applied[2] == (mbps_to_rate(8) // 2, UNLIMITED)
+
+    manager.release_upload(1)
+    manager.start_download(1)
+    assert applied[1] == (UNLIMITED, mbps_to_rate(16))
+    assert applied[2] == (mbps_to_rate(8), UNLIMITED)
+
+    manager.finish(1)
+    manager.finish(2)
+    assert applied[1] == applied[2] == (UNLIMITED, UNLIMITED)
+
+
+def test_slow_apply_does_not_block_other_workers():
+    """apply() se llama sin `_cond`: un worker colgado no frena los turnos"""
+    blocked = threading.Event()
+    applied = []
+
+    def apply(key, upload, download):
+        if key == 'lento':
+            blocked.wait(5)
+        applied.append((key, upload, download))
+
+    manager = BandwidthManager({'upload_limit_mbps': 8, 'download_limit_mbps': 8},
+                               apply=apply)
+    thread = threading.Thread(target=manager.acquire_upload, args=('lento', 10),
+                              daemon=True)
+    thread.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    manager.start_download('otro')
+    manager.finish('otro')
+    assert time.monotonic() - started < 1
+    assert applied == [('otro', UNLIMITED, mbps_to_rate(8)),
+                       ('otro', UNLIMITED, UNLIMITED)]
+    blocked.set()
+    thread.join(5)
+    assert applied[-1] == ('lento', mbps_to_rate(8), UNLIMITED)
+
+
+def test_link_is_shared_by_concurrent_transfers():
+    link = Link(8)  # 1 MB/s
+    started = time.monotonic()
+    threads = [threading.Thread(target=lambda: [link.transfer(64 * KB) for _ in range(4)])
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 0.45  # 512 KB a 1 MB/s
+
+
+def test_global_upload_cap(fake_worker, settings, tmp_path):
+    """Dos sesiones subiendo a la vez no superan upload_limit_mbps entre las dos"""
+    server = FakeEnhanceServer(latency=0.1, jitter=0).start()
+    settings.update(url=server.url, upload_limit_mbps=8)  # 1 MB/s
+    files = [make_file(tmp_path / f'pista{i}.wav', 512 * KB) for i in range(2)]
+    pool = JobPool(settings, concurrency=2)
+    jobs = [Job(str(path)) for path in files]
+    try:
+        started = time.monotonic()
+        assert pool.run(jobs)
+        elapsed = time.monotonic() - started
+    finally:
+        pool.shutdown()
+        server.stop()
+
+    assert [job.status for job in jobs] == [DONE, DONE]
+    assert server.stats['uploads'] == 2
+    limit = mbps_to_rate(8)
+    assert elapsed >= 0.9 * sum(job.bytes for job in jobs) / limit
+    for job in jobs:
+        assert job.bytes / job.timings[UPLOADING] <= limit * 1.1
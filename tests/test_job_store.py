@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de trabajos: reproducción del log, compactación y reanudación
+"""
+
+import threading
+
+from job_pool import DONE, FAILED, QUEUED, UPLOADING, Job
+from job_store import JobStore
+
+
+def make_job(name, status=QUEUED, **fields):
+    job = Job(f'/grabaciones/{name}.wav', **fields)
+    job.status = status
+    return job
+
+
+def test_last_record_wins(tmp_path):
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    job = make_job('a', cache_key='clave')
+    job.owner, job.priority = 'ana', 1
+    job.edit_map = [(10.0, 20.0)]
+    store.record(job)
+    job.status = UPLOADING
+    store.record(job)
+
+    records = store.load()
+    assert list(records) == [job.id]
+    assert records[job.id]['status'] == UPLOADING
+
+    restored = Job.from_dict(records[job.id])
+    assert (restored.source, restored.cache_key, restored.owner,
+            restored.priority, restored.edit_map) == (
+        job.source, 'clave', 'ana', 1, [(10.0, 20.0)])
+    assert restored.status == QUEUED  # Se reanuda de nuevo en cola
+
+
+def test_truncated_line_is_ignored(tmp_path):
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    store.record(make_job('a', FAILED))
+    with open(store.path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "cortad')  # Cierre abrupto a media escritura
+    assert [entry['status'] for entry in store.unfinished()] == [FAILED]
+
+
+def test_compact_keeps_only_unfinished(tmp_path):
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    done, failed = make_job('hecho', DONE), make_job('fallido', FAILED)
+    for job in (done, failed, failed):
+        store.record(job)
+    store.compact()
+
+    lines = store.path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1
+    assert [entry['id'] for entry in store.unfinished()] == [failed.id]
+
+
+def test_compact_keeps_parts_of_unfinished_parents(tmp_path):
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    parent = make_job('larga', UPLOADING)
+    store.record(parent)
+    for i, status in enumerate((DONE, QUEUED), 1):
+        part = make_job(f'larga_part{i:03d}', status, job_id=f'{parent.id}-{i:03d}')
+        part.parent = parent
+        store.record(part)
+    store.compact()
+
+    entries = store.unfinished()
+    assert [entry['id'] for entry in entries] == [parent.id]
+    assert [(part['id'], part['status']) for part in entries[0]['parts']] == [
+        (f'{parent.id}-001', DONE), (f'{parent.id}-002', QUEUED)]
+
+
+def test_records_during_compaction_are_kept(tmp_path):
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    jobs = [make_job(f'j{i}', FAILED) for i in range(200)]
+    writer = threading.Thread(target=lambda: [store.record(job) for job in jobs])
+    writer.start()
+    while writer.is_alive():
+        store.compact()
+    writer.join()
+    assert len(store.unfinished()) == len(jobs)
+
+
+def test_clear(tmp_path):
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    store.record(make_job('a'))
+    store.clear()
+    assert store.unfinished() == []
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Lote completo con el worker simulado: resultado en caché al repetirlo
+"""
+
+import os
+
+from conftest import make_file
+from job_pool import DONE, FAILED, QUEUED, Job
+from job_store import JobStore
+from metrics import RunMetrics
+from pipeline import Pipeline
+from result_cache import ResultCache
+
+
+def run_batch(settings, tmp_path, files):
+    pipeline = Pipeline(settings, cache=ResultCache(tmp_path / 'cache'),
+                        metrics=RunMetrics(directory=tmp_path / 'metrics'))
+    jobs = pipeline.prepare_jobs(files)
+    try:
+        ok = pipeline.run(jobs)
+    finally:
+        if pipeline.pool:
+            pipeline.pool.shutdown()
+    return ok, jobs, pipeline
+
+
+def test_rerun_is_served_from_cache(fake_worker, settings, tmp_path):
+    source = make_file(tmp_path / 'grabaciones' / 'charla.wav', 4096)
+    ok, jobs, first = run_batch(settings, tmp_path, [source])
+    assert ok
+    output = jobs[0].output_path
+    assert output.read_bytes() == source.read_bytes()
+
+    # La entrada de caché es una copia, no el mismo archivo entregado
+    cached = first.cache.get(jobs[0].cache_key)
+    assert cached is not None
+    assert not os.path.samefile(cached, output)
+
+    ok, jobs, second = run_batch(settings, tmp_path, [source])
+    assert ok
+    assert jobs[0].status == DONE
+    assert jobs[0].output_path == output
+    assert second.pool is None  # Ningún trabajo llegó al pool
+
+
+def test_rerun_with_linked_cache_entry(fake_worker, settings, tmp_path):
+    """Cachés antiguas enlazaban la salida: repetir no debe fallar"""
+    source = make_file(tmp_path / 'grabaciones' / 'charla.wav', 4096)
+    ok, jobs, first = run_batch(settings, tmp_path, [source])
+    assert ok
+    output = jobs[0].output_path
+    cached = first.cache.get(jobs[0].cache_key)
+    cached.unlink()
+    os.link(output, cached)
+
+    ok, jobs, _ = run_batch(settings, tmp_path, [source])
+    assert ok
+    assert jobs[0].output_path == output
+    assert output.read_bytes() == source.read_bytes()
+
+
+def test_same_name_in_two_folders(fake_worker, settings, tmp_path):
+    first = make_file(tmp_path / 'a' / 'charla.wav', 1000)
+    second = make_file(tmp_path / 'b' / 'charla.wav', 2000)
+    ok, jobs, _ = run_batch(settings, tmp_path, [first, second])
+    assert ok
+    outputs = {job.output_path for job in jobs}
+    assert len(outputs) == 2
+    assert sorted(path.stat().st_size for path in outputs) == [1000, 2000]
+
+
+def test_postprocess_error_fails_the_job(fake_worker, settings, tmp_path):
+    """Sin resultado final el trabajo falla y no entra en caché"""
+    # El worker simulado devuelve bytes nulos: FFmpeg (o su ausencia) falla
+    settings['post_loudness'] = -16
+    source = make_file(tmp_path / 'grabaciones' / 'charla.wav', 4096)
+    ok, jobs, pipeline = run_batch(settings, tmp_path, [source])
+    assert not ok
+    assert jobs[0].status == FAILED
+    assert jobs[0].error.startswith("Postproceso:")
+    assert pipeline.cache.get(jobs[0].cache_key) is None
+
+
+def test_resume_reuses_finished_parts(settings, tmp_path):
+    """Tras un cierre solo se vuelven a subir los segmentos sin resultado"""
+    store = JobStore(tmp_path / 'jobs.jsonl')
+    pipeline = Pipeline(settings, store=store, cache=ResultCache(tmp_path / 'cache'),
+                        metrics=RunMetrics(directory=tmp_path / 'metrics'))
+    parent = Job(make_file(tmp_path / 'larga.wav', 3000))
+    store.record(parent)
+    for i in range(1, 4):
+        part = Job(make_file(tmp_path / 'temp' / f'larga_part{i:03d}.wav', 1000),
+                   job_id=f"{parent.id}-{i:03d}")
+        part.parent = parent
+        if i != 2:
+            part.status = DONE
+            part.output_path = tmp_path / 'descargas' / f'larga_part{i:03d}_enhanced.wav'
+        store.record(part)
+    # El resultado del tercero se perdió: hay que repetirlo
+    make_file(tmp_path / 'descargas' / 'larga_part001_enhanced.wav', 1000)
+
+    entries = store.unfinished()
+    assert [entry['id'] for entry in entries] == [parent.id]
+    job = pipeline.resume_job(entries[0])
+    assert [part.status for part in job.parts] == [DONE, QUEUED, QUEUED]
+    assert job.parts[0].output_path.is_file()
+    pending = pipeline._pending([job])
+    assert [part.id for part in pending] == [f"{parent.id}-002", f"{parent.id}-003"]
+
+
+def test_temp_guard_without_duration(settings, tmp_path):
+    """Sin duración conocida el límite de temporales se compara con el tamaño"""
+    pipeline = Pipeline(settings, cache=ResultCache(tmp_path / 'cache'),
+                        metrics=RunMetrics(directory=tmp_path / 'metrics'))
+    pipeline.resources.temp_budget = lambda: 1000
+    assert not pipeline.fits_temp(None, 5000)
+    assert pipeline.fits_temp(None, 500)
+    assert pipeline.fits_temp(0.01)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Limpieza de artefactos viejos en la carpeta de descarga y en temporales
+"""
+
+import os
+
+import resources
+
+GUID = '3f2b8c1e-9a4d-4e7b-8c2f-1d5e6a7b8c9d'
+
+
+def old_file(path, size=10):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    os.utime(path, (0, 0))
+    return path
+
+
+def test_cleanup_artifacts(tmp_path, temp_dir):
+    downloads = tmp_path / 'descargas'
+    for name in ('error_1.png', 'debug_2.png', 'a.crdownload', 'b.tmp.m4a',
+                 GUID, GUID.upper(), 'charla.wav', GUID + '.wav'):
+        old_file(downloads / name)
+    (downloads / 'error_reciente.png').write_bytes(b'x')
+    (downloads / 'f0e1d2c3-b4a5-4697-8877-665544332211').write_bytes(b'x')
+    (downloads / ('0' * 8 + '-' + '0' * 4)).mkdir()
+    old_file(temp_dir / 'lote' / 'parte.wav', 100)
+
+    removed, freed = resources.cleanup_artifacts([downloads], 7, temp_dir)
+    assert (removed, freed) == (7, 160)
+    # Salidas, descargas recientes y lo que no es un GUID se conservan
+    assert sorted(p.name for p in downloads.iterdir()) == sorted([
+        'charla.wav', GUID + '.wav', 'error_reciente.png',
+        'f0e1d2c3-b4a5-4697-8877-665544332211', '0' * 8 + '-' + '0' * 4])
+    assert not (temp_dir / 'lote' / 'parte.wav').exists()
+
+
+def test_negative_retention_disables_cleanup(tmp_path):
+    path = old_file(tmp_path / GUID)
+    assert resources.cleanup_artifacts([tmp_path], -1) == (0, 0)
+    assert path.exists()
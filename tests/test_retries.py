@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Cortacircuitos: prueba en estado semiabierto y lote con pausa y reanudación
+"""
+
+import threading
+import time
+
+from conftest import make_file
+from job_pool import DONE, JobPool, Job
+from retries import CircuitBreaker
+
+
+def open_breaker(cooldown=0.05):
+    breaker = CircuitBreaker(threshold=1, cooldown=cooldown)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(cooldown * 2)
+    # Pasado el enfriamiento la primera consulta lo deja semiabierto
+    assert breaker.wait_time() == 0
+    return breaker
+
+
+def test_wait_time_does_not_claim_the_probe():
+    breaker = open_breaker()
+    # Consultar la espera (cola vacía o en pausa) no reserva la prueba
+    assert breaker.wait_time() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    probe = object()
+    assert breaker.claim_probe(probe)
+    assert not breaker.claim_probe(object())
+    assert breaker.wait_time() > 0
+
+
+def test_released_probe_can_be_claimed_again():
+    breaker = open_breaker()
+    first, second = object(), object()
+    assert breaker.claim_probe(first)
+    breaker.release_probe(second)  # No es la prueba: no cambia nada
+    assert breaker.wait_time() > 0
+    breaker.release_probe(first)
+    assert breaker.wait_time() == 0
+    assert breaker.claim_probe(second)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_failure_reopens_with_longer_cooldown():
+    breaker = open_breaker()
+    assert breaker.claim_probe(object())
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.wait_time() > 0.05
+
+
+def test_pause_while_breaker_is_open(fake_worker, settings, tmp_path):
+    """Pausar la cola con el circuito abierto no bloquea el lote al reanudar"""
+    settings.update(breaker_threshold=1, breaker_cooldown_seconds=0.5,
+                    retry_backoff_seconds=0.1, retry_attempts=3)
+    files = [make_file(tmp_path / f'pista{i}.wav', 1000) for i in range(3)]
+    pool = JobPool(settings, concurrency=1)
+    failures = []
+
+    def verify(job):
+        if not failures:
+            # Primer resultado rechazado: el circuito se abre y la cola
+            # queda en pausa hasta después del enfriamiento
+            failures.append(job)
+            pool.pause(True)
+            threading.Timer(1.0, pool.pause, args=(False,)).start()
+            return "fallo simulado"
+        return None
+
+    pool.verify = verify
+    jobs = [Job(str(path)) for path in files]
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(ok=pool.run(jobs)),
+                              daemon=True)
+    try:
+        runner.start()
+        runner.join(20)
+        assert not runner.is_alive(), "el lote quedó bloqueado"
+    finally:
+        pool.stop()
+        pool.shutdown()
+    assert result['ok']
+    assert [job.status for job in jobs] == [DONE] * 3
+    assert pool.breaker.state == CircuitBreaker.CLOSED
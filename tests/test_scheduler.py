@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador de la cola: prioridades, reparto entre usuarios, SJF y
+movimientos manuales
+"""
+
+from job_pool import Job, JobPool
+from scheduler import PRIORITIES, JobScheduler
+
+
+def make_job(name, owner='ana', estimate=60, priority='normal'):
+    job = Job(f'/grabaciones/{name}.wav')
+    job.owner = owner
+    job.estimate = estimate
+    job.priority = PRIORITIES[priority]
+    return job
+
+
+def drain(scheduler):
+    names = []
+    job = scheduler.pop()
+    while job is not None:
+        names.append(job.name[:-4])
+        job = scheduler.pop()
+    return names
+
+
+def fill(scheduler, jobs):
+    for job in jobs:
+        scheduler.push(job)
+    return scheduler
+
+
+def test_higher_priority_first():
+    scheduler = fill(JobScheduler(), [make_job('a'), make_job('b', priority='baja'),
+                                      make_job('c', priority='urgente')])
+    assert drain(scheduler) == ['c', 'a', 'b']
+
+
+def test_fair_share_between_owners():
+    """Un lote largo de un usuario no retrasa los clips cortos de otro"""
+    jobs = [make_job(f'ana{i}', 'ana', 600) for i in range(3)]
+    jobs += [make_job(f'luis{i}', 'luis', 30) for i in range(3)]
+    scheduler = fill(JobScheduler(), jobs)
+    assert drain(scheduler) == ['ana0', 'luis0', 'luis1', 'luis2', 'ana1', 'ana2']
+
+
+def test_late_owner_starts_at_the_least_served():
+    scheduler = fill(JobScheduler(), [make_job(f'ana{i}', 'ana', 60) for i in range(4)])
+    assert scheduler.pop().name == 'ana0.wav'
+    assert scheduler.pop().name == 'ana1.wav'
+    # Luis llega con la cola ocupada: no acapara los workers para ponerse al día
+    fill(scheduler, [make_job(f'luis{i}', 'luis', 60) for i in range(3)])
+    assert drain(scheduler) == ['ana2', 'luis0', 'ana3', 'luis1', 'luis2']
+
+
+def test_shortest_job_first():
+    scheduler = fill(JobScheduler('sjf'), [make_job('largo', estimate=900),
+                                           make_job('corto', estimate=30),
+                                           make_job('medio', estimate=300)])
+    assert drain(scheduler) == ['corto', 'medio', 'largo']
+
+
+def test_move_within_owner_and_priority():
+    jobs = [make_job(name) for name in ('a', 'b', 'c')]
+    scheduler = fill(JobScheduler(), jobs)
+    assert scheduler.move(jobs[2], -2)
+    assert not scheduler.move(jobs[2], -1)  # Ya es el primero
+    assert [job.name[:-4] for job in scheduler.snapshot()] == ['c', 'a', 'b']
+    assert drain(scheduler) == ['c', 'a', 'b']
+
+
+def test_held_jobs_and_pause():
+    jobs = [make_job(name) for name in ('a', 'b')]
+    scheduler = fill(JobScheduler(), jobs)
+    scheduler.hold(jobs[0])
+    scheduler.paused = True
+    assert scheduler.pop() is None
+    scheduler.paused = False
+    # Los retenidos se muestran al final y no se entregan
+    assert [job.name for job in scheduler.snapshot()] == ['b.wav', 'a.wav']
+    assert drain(scheduler) == ['b']
+    scheduler.hold(jobs[0], False)
+    assert drain(scheduler) == ['a']
+
+
+def test_snapshot_matches_pop_order():
+    jobs = []
+    for i in range(30):
+        owner = ('ana', 'luis', 'eva')[i % 3]
+        priority = ('normal', 'alta', 'baja')[i % 7 % 3]
+        jobs.append(make_job(f'j{i}', owner, 20 + (i * 37) % 400, priority))
+    scheduler = fill(JobScheduler('sjf'), jobs)
+    expected = [job.name[:-4] for job in scheduler.snapshot()]
+    assert [job.name[:-4] for job in scheduler.snapshot(5)] == expected[:5]
+    assert drain(scheduler) == expected
+
+
+def test_pool_queue_view(settings):
+    """Vista de la cola para la GUI: trabajos, total y pausa de una vez"""
+    pool = JobPool(settings)
+    jobs = [make_job(name) for name in ('a', 'b', 'c')]
+    with pool._cond:
+        fill(pool.queue, jobs)
+    pool.pause()
+    view, total, paused = pool.queue_view(2)
+    assert [job.name for job in view] == ['a.wav', 'b.wav']
+    assert (total, paused) == (3, True)
+    assert pool.paused
+    pool.pause(False)
+    assert not pool.queue_view()[2]
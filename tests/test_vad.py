@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Recorte de silencios: plan de cortes y línea de tiempo tras reexpandir
+"""
+
+import math
+import shutil
+import struct
+import wave
+
+import pytest
+
+import media
+import vad
+from job_pool import Job
+from metrics import RunMetrics
+from pipeline import Pipeline
+from result_cache import ResultCache
+
+np = pytest.importorskip('numpy')
+
+RATE = 16000
+
+
+def voice_mask(spans, seconds):
+    """Máscara por ventana con voz en los tramos `spans` (segundos)"""
+    times = np.arange(int(round(seconds / vad.FRAME_SECONDS))) * vad.FRAME_SECONDS
+    mask = np.zeros(len(times), dtype=bool)
+    for start, end in spans:
+        mask |= (times >= start) & (times < end)
+    return mask
+
+
+def test_only_long_silences_are_cut():
+    # 0-5 voz, 5-25 silencio, 25-30 voz, pausa de 1 s, 31-40 voz
+    mask = voice_mask([(0, 5), (25, 30), (31, 40)], 40)
+    cuts = vad.plan_cuts(mask, min_silence=3, padding=0.5)
+    assert len(cuts) == 1
+    start, end = cuts[0]
+    assert start == pytest.approx(5.5, abs=vad.FRAME_SECONDS)
+    assert end == pytest.approx(24.5, abs=vad.FRAME_SECONDS)
+    assert vad.removed_seconds(cuts) == pytest.approx(19, abs=2 * vad.FRAME_SECONDS)
+
+
+def test_speech_mask_follows_the_noise_floor():
+    levels = np.array([-60.0] * 50 + [-20.0] * 50)
+    mask = vad.speech_mask(levels, threshold_db=12)
+    assert not mask[:50].any()
+    assert mask[50:].all()
+
+
+def test_kept_segments_cover_the_rest():
+    cuts = [(5.5, 24.5), (40.5, 69.5)]
+    assert vad.kept_segments(cuts) == [(0.0, 5.5), (24.5, 40.5), (69.5, None)]
+
+
+def write_tone_wav(path, spans, seconds):
+    """WAV mono con un tono en `spans` y silencio casi total en el resto"""
+    frames = bytearray()
+    for i in range(int(seconds * RATE)):
+        t = i / RATE
+        loud = any(start <= t < end for start, end in spans)
+        value = 0.3 * math.sin(2 * math.pi * 220 * t) if loud else 0.0005 * ((i * 7919) % 13 - 6)
+        frames += struct.pack('<h', int(value * 32767))
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(bytes(frames))
+
+
+def envelope(path):
+    """Energía por segundo del audio decodificado con FFmpeg"""
+    levels = vad.frame_levels(path)
+    per_second = int(round(1 / vad.FRAME_SECONDS))
+    usable = len(levels) // per_second * per_second
+    return levels[:usable].reshape(-1, per_second).mean(axis=1)
+
+
+@pytest.mark.skipif(not vad.available(), reason="requiere FFmpeg")
+def test_trim_and_restore_keep_the_timeline(settings, tmp_path):
+    """Pipeline.trim_silence + restore_timeline: la voz vuelve a su segundo"""
+    settings.update(vad_trim=True, vad_min_silence_seconds=3, vad_padding_seconds=0.5)
+    pipeline = Pipeline(settings, cache=ResultCache(tmp_path / 'cache'),
+                        metrics=RunMetrics(directory=tmp_path / 'metrics'))
+    source = tmp_path / 'entrada.wav'
+    write_tone_wav(source, [(0, 4), (20, 24), (40, 44)], 44)
+    job = Job(source)
+
+    assert pipeline.trim_silence(job)
+    assert len(job.edit_map) == 2
+    trimmed_seconds = len(vad.frame_levels(job.upload_path)) * vad.FRAME_SECONDS
+    assert trimmed_seconds == pytest.approx(44 - vad.removed_seconds(job.edit_map), abs=0.2)
+
+    # El "resultado mejorado" es el propio audio recortado
+    enhanced = tmp_path / f'mejorado{media.AUDIO_EXTENSION}'
+    shutil.copy(job.upload_path, enhanced)
+    pipeline.restore_timeline(job, enhanced)
+    original, restored = envelope(source), envelope(enhanced)
+    assert len(restored) == pytest.approx(len(original), abs=1)
+    loud = lambda levels: set(np.flatnonzero(levels > levels.max() - 20))
+    assert loud(restored) == loud(original)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Vigilancia de carpetas: índice de procesados y detección de archivos nuevos
+"""
+
+import json
+import os
+
+import pytest
+
+import watch_folder
+from conftest import make_file
+from watch_folder import FolderWatcher, ProcessedIndex
+
+
+@pytest.fixture(autouse=True)
+def polling(monkeypatch):
+    """Sin watchdog: los tests recorren los directorios en cada poll()"""
+    monkeypatch.setattr(watch_folder, 'Observer', None)
+
+
+def make_watcher(directory, index_path, **options):
+    return FolderWatcher([directory], ['.wav'], stable_seconds=0,
+                         index=ProcessedIndex(index_path, legacy_path=None),
+                         **options)
+
+
+def test_index_appends_and_compacts(tmp_path):
+    path = tmp_path / 'index.jsonl'
+    recording = make_file(tmp_path / 'a.wav', 10)
+    index = ProcessedIndex(path, legacy_path=None)
+    for _ in range(3):
+        index.add(recording)
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 3
+
+    reloaded = ProcessedIndex(path, legacy_path=None)
+    assert reloaded.contains(recording, os.stat(recording))
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+
+def test_legacy_index_is_migrated(tmp_path):
+    legacy = tmp_path / 'watch_index.json'
+    legacy.write_text(json.dumps({'/x/antiguo.wav': [1, 2]}), encoding='utf-8')
+    path = tmp_path / 'index.jsonl'
+    index = ProcessedIndex(path, legacy_path=legacy)
+    assert not legacy.exists()
+    assert index._entries == {'/x/antiguo.wav': [1, 2]}
+    assert ProcessedIndex(path, legacy_path=None)._entries == index._entries
+
+
+def test_new_files_are_delivered_once(tmp_path):
+    folder = tmp_path / 'entrada'
+    recording = make_file(folder / 'a.wav', 10)
+    watcher = make_watcher(folder, tmp_path / 'index.jsonl')
+    watcher.start()
+    assert watcher.poll() == [str(recording)]
+    assert watcher.poll() == []
+
+
+def test_processed_files_are_skipped(tmp_path):
+    folder = tmp_path / 'entrada'
+    recording = make_file(folder / 'a.wav', 10)
+    ProcessedIndex(tmp_path / 'index.jsonl', legacy_path=None).add(recording)
+    watcher = make_watcher(folder, tmp_path / 'index.jsonl')
+    watcher.start()
+    assert watcher.poll() == []
+
+
+def test_replaced_file_is_delivered_again(tmp_path):
+    folder = tmp_path / 'entrada'
+    recording = make_file(folder / 'a.wav', 10)
+    watcher = make_watcher(folder, tmp_path / 'index.jsonl')
+    watcher.start()
+    assert watcher.poll() == [str(recording)]
+
+    # Otro archivo con el mismo nombre (contenido y fecha nuevos)
+    make_file(folder / 'nuevo.tmp', 20).replace(recording)
+    watcher.notify(str(recording))
+    assert watcher.poll() == [str(recording)]
+
+
+def test_outputs_and_excluded_folders_are_ignored(tmp_path):
+    folder = tmp_path / 'entrada'
+    recording = make_file(folder / 'a.wav', 10)
+    make_file(folder / 'a_1a2b3c_enhanced.wav', 10)
+    make_file(folder / 'a_1a2b3c_enhanced_adobe.wav', 10)
+    make_file(folder / 'descargas' / 'b.wav', 10)
+    watcher = make_watcher(folder, tmp_path / 'index.jsonl', recursive=True,
+                           exclude=[folder / 'descargas'])
+    watcher.start()
+    assert watcher.poll() == [str(recording)]
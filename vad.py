@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Recorte de silencios antes de subir
+Detección de voz por energía (NumPy), mapa de cortes y reexpansión
+
+Los silencios largos (pausas, preparación, tiempo muerto) se recortan del
+audio que se sube, dejando un margen a cada lado; el mapa de cortes se
+guarda con el trabajo y al volver el resultado se reinserta la misma
+duración de silencio en cada corte, de modo que la línea de tiempo coincide
+con la del original y el remux con el video sigue sincronizado.
+"""
+
+import importlib.util
+import subprocess
+from pathlib import Path
+
+import media
+
+# NumPy es opcional: sin él no se recortan silencios. Se importa al
+# analizar, no al cargar el módulo (el CLI arranca sin pagar su carga)
+HAVE_NUMPY = importlib.util.find_spec('numpy') is not None
+
+# Valores por defecto (configurables en settings.json)
+VAD_MIN_SILENCE_SECONDS = 3.0
+VAD_PADDING_SECONDS = 0.5
+VAD_THRESHOLD_DB = 12.0
+
+# Análisis: audio mono a 16 kHz en ventanas de 30 ms
+ANALYSIS_RATE = 16000
+FRAME_SECONDS = 0.03
+READ_SECONDS = 60
+
+# No merece la pena recortar si se ahorra menos que esto
+MIN_SAVED_SECONDS = 10.0
+MIN_SAVED_RATIO = 0.05
+
+# Cada corte es una rama del filtro de FFmpeg: se conservan los más largos
+MAX_CUTS = 200
+
+
+def available():
+    """True si se puede analizar y recortar (NumPy y FFmpeg instalados)"""
+    return HAVE_NUMPY and media.find_ffmpeg() is not None
+
+
+def options_from_settings(settings):
+    """(silencio mínimo, margen, umbral dB) o None si el recorte está desactivado"""
+    if not settings.get('vad_trim'):
+        return None
+    padding = float(settings.get('vad_padding_seconds', VAD_PADDING_SECONDS))
+    return (float(settings.get('vad_min_silence_seconds', VAD_MIN_SILENCE_SECONDS)),
+            max(padding, FRAME_SECONDS),
+            float(settings.get('vad_threshold_db', VAD_THRESHOLD_DB)))
+
+
+def variant(settings):
+    """Sufijo de la clave de caché si el recorte está activo"""
+    options = options_from_settings(settings)
+    if not options:
+        return None
+    return 'vad{:g}-{:g}-{:g}'.format(*options)
+
+
+def frame_levels(path):
+    """Energía en dB de cada ventana de FRAME_SECONDS del audio de `path`"""
+    import numpy as np
+    ffmpeg = media.find_ffmpeg()
+    if not ffmpeg:
+        raise media.MediaError("FFmpeg no está instalado o no está en el PATH")
+    frame = int(ANALYSIS_RATE * FRAME_SECONDS)
+    read_bytes = frame * int(READ_SECONDS / FRAME_SECONDS) * 2
+    process = subprocess.Popen(
+        [ffmpeg, '-v', 'error', '-i', str(path), '-vn', '-ac', '1',
+         '-ar', str(ANALYSIS_RATE), '-f', 's16le', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    levels = []
+    try:
+        while True:
+            data = process.stdout.read(read_bytes)
+            if not data:
+                break
+            samples = np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2')
+            count = len(samples) // frame
+            if not count:
+                continue
+            frames = samples[:count * frame].astype(np.float32).reshape(count, frame) / 32768
+            levels.append(10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10))
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise media.MediaError(f"FFmpeg no pudo decodificar {Path(path).name}")
+    return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+
+def speech_mask(levels, threshold_db=VAD_THRESHOLD_DB):
+    """
+    True en las ventanas con voz.
+
+    El umbral es `threshold_db` sobre el ruido de fondo (percentil 10), sin
+    pasar del punto medio entre el fondo y el nivel de la voz (percentil 90)
+    para que una grabación ruidosa no se quede sin voz detectada.
+    """
+    import numpy as np
+    if not len(levels):
+        return np.zeros(0, dtype=bool)
+    floor, loud = np.percentile(levels, [10, 90])
+    threshold = min(floor + threshold_db, (floor + loud) / 2)
+    return levels > threshold
+
+
+def plan_cuts(mask, min_silence=VAD_MIN_SILENCE_SECONDS, padding=VAD_PADDING_SECONDS):
+    """
+    Tramos (inicio, fin) en segundos a eliminar del original.
+
+    Cada silencio de al menos `min_silence` se reduce a `padding` a cada
+    lado (o solo al lado de la voz, al principio y al final del archivo).
+    """
+    import numpy as np
+    silent = np.concatenate(([0], (~mask).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(silent))
+    starts, ends = edges[::2] * FRAME_SECONDS, edges[1::2] * FRAME_SECONDS
+    long_enough = ends - starts >= max(min_silence, 2 * padding + FRAME_SECONDS)
+    cuts = [(start + padding, end - padding)
+            for start, end in zip(starts[long_enough], ends[long_enough])]
+    if len(cuts) > MAX_CUTS:
+        cuts = sorted(sorted(cuts, key=lambda cut: cut[0] - cut[1])[:MAX_CUTS])
+    return [(round(float(start), 3), round(float(end), 3)) for start, end in cuts]
+
+
+def removed_seconds(cuts):
+    return sum(end - start for start, end in cuts)
+
+
+def analyze(path, min_silence=VAD_MIN_SILENCE_SECONDS, padding=VAD_PADDING_SECONDS,
+            threshold_db=VAD_THRESHOLD_DB):
+    """
+    (duración, cortes) del audio de `path`; cortes vacío si el ahorro no
+    llega a MIN_SAVED_SECONDS o MIN_SAVED_RATIO de la duración.
+    """
+    levels = frame_levels(path)
+    duration = len(levels) * FRAME_SECONDS
+    cuts = plan_cuts(speech_mask(levels, threshold_db), min_silence, padding)
+    saved = removed_seconds(cuts)
+    if saved < MIN_SAVED_SECONDS or saved < duration * MIN_SAVED_RATIO:
+        return duration, []
+    return duration, cuts
+
+
+def kept_segments(cuts):
+    """Tramos (inicio, fin) del original que se conservan; el último sin fin"""
+    segments = []
+    position = 0.0
+    for start, end in cuts:
+        segments.append((position, start))
+        position = end
+    segments.append((position, None))
+    return segments
+
+
+def _atrim(label, start, end):
+    text = f"{label}atrim=start={start:.3f}"
+    if end is not None:
+        text += f":end={end:.3f}"
+    return text + ",asetpts=PTS-STARTPTS"
+
+
+def trim(source, cuts, output):
+    """Escribe el audio de `source` sin los tramos de `cuts` (para subir)"""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    segments = kept_segments(cuts)
+    chain = [_atrim('[0:a]', start, end) + f"[s{i}]"
+             for i, (start, end) in enumerate(segments)]
+    inputs = ''.join(f"[s{i}]" for i in range(len(segments)))
+    chain.append(f"{inputs}concat=n={len(segments)}:v=0:a=1[out]")
+    media.run_ffmpeg([
+        '-i', str(source), '-vn',
+        '-filter_complex', ';'.join(chain), '-map', '[out]',
+        '-ac', '1', '-ar', str(media.AUDIO_SAMPLE_RATE),
+        '-c:a', media.AUDIO_CODEC, '-b:a', media.AUDIO_BITRATE,
+        str(output)
+    ])
+    return output
+
+
+def expand(enhanced, cuts, output):
+    """
+    Reinserta en el audio mejorado el silencio de cada corte.
+
+    Los tramos se localizan en la línea de tiempo recortada (la suma de las
+    duraciones conservadas) y cada uno se rellena con `apad` hasta el
+    siguiente, así el formato del silencio es siempre el del propio audio.
+    """
+    output = Path(output)
+    segments = kept_segments(cuts)
+    chain = []
+    position = 0.0
+    for i, (start, end) in enumerate(segments):
+        if end is None:
+            chain.append(_atrim('[0:a]', position, None) + f"[s{i}]")
+            break
+        length = end - start
+        gap = cuts[i][1] - cuts[i][0]
+        chain.append(_atrim('[0:a]', position, position + length)
+                     + f",apad=pad_dur={gap:.3f}[s{i}]")
+        position += length
+    inputs = ''.join(f"[s{i}]" for i in range(len(segments)))
+    chain.append(f"{inputs}concat=n={len(segments)}:v=0:a=1[out]")
+    media.run_ffmpeg(['-i', str(enhanced), '-filter_complex', ';'.join(chain),
+                      '-map', '[out]', str(output)])
+    return output
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Adobe Podcast Enhancer - Vigilancia de carpetas
+Detecta grabaciones nuevas y las entrega cuando terminaron de escribirse
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from config import CONFIG_DIR
+
+# watchdog es opcional: usa inotify (Linux), FSEvents (macOS) o
+# ReadDirectoryChangesW (Windows). Sin él se comparan mtimes de directorios.
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCH_INDEX_FILE = CONFIG_DIR / "watch_index.jsonl"
+# Índice de versiones anteriores (un único JSON reescrito en cada alta)
+LEGACY_INDEX_FILE = CONFIG_DIR / "watch_index.json"
+
+# Segundos sin cambios de tamaño/mtime para considerar un archivo completo
+STABLE_SECONDS = 15
+POLL_INTERVAL = 5
+
+# Resultados propios (<nombre>_<hash>_enhanced y su copia _adobe) que no
+# deben volver a procesarse si la descarga cae dentro de una carpeta vigilada
+OUTPUT_MARKERS = ('_enhanced', '_enhanced_adobe')
+
+
+def file_signature(stat):
+    """Identidad de una versión de un archivo: [tamaño, mtime_ns]"""
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ProcessedIndex:
+    """
+    Archivos ya procesados, identificados por ruta + tamaño + mtime.
+
+    Si un archivo se reemplaza por otro con el mismo nombre, el tamaño o la
+    fecha cambian y vuelve a procesarse. Cada alta se anexa como una línea
+    JSON; al cargar, el log se compacta si acumula entradas repetidas.
+    """
+
+    def __init__(self, path=WATCH_INDEX_FILE, legacy_path=LEGACY_INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        lines = self._load()
+        if legacy_path and legacy_path.exists():
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+            except (OSError, ValueError):
+                legacy = {}
+            for key, signature in legacy.items():
+                self._entries.setdefault(key, signature)
+            self._compact()
+            legacy_path.unlink(missing_ok=True)
+        elif lines > len(self._entries):
+            self._compact()
+
+    def _load(self):
+        """Reproduce el log; devuelve el número de líneas leídas"""
+        lines = 0
+        if not self.path.exists():
+            return lines
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        key, size, mtime_ns = json.loads(line)
+                    except ValueError:
+                        continue  # Línea truncada por un cierre abrupto
+                    self._entries[key] = [size, mtime_ns]
+        except OSError:
+            self._entries = {}
+        return lines
+
+    def _compact(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, signature in self._entries.items():
+                    f.write(json.dumps([key] + signature, ensure_ascii=False) + "\n")
+            tmp_path.replace(self.path)
+        except OSError:
+            pass  # Se reintenta en la próxima carga
+
+    def contains(self, path, stat):
+        return self._entries.get(str(path)) == file_signature(stat)
+
+    def add(self, path):
+        """Marca un archivo como procesado"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        signature = file_signature(stat)
+        line = json.dumps([str(path)] + signature, ensure_ascii=False)
+        with self._lock:
+            self._entries[str(path)] = signature
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Traduce los eventos de watchdog en rutas candidatas"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+
+class FolderWatcher:
+    """
+    Vigila uno o varios directorios y devuelve los archivos nuevos estables.
+
+    Con watchdog los cambios llegan como eventos; sin él solo se vuelven a
+    listar los directorios cuyo mtime cambió (añadir o renombrar archivos
+    actualiza el mtime del directorio), así un directorio con miles de
+    archivos ya procesados no se recorre en cada ciclo.
+
+    Se ignoran los archivos dentro de `exclude` (p. ej. la carpeta de
+    descarga) y los resultados `_enhanced` del propio programa.
+    """
+
+    def __init__(self, directories, extensions, index=None, recursive=False,
+                 stable_seconds=STABLE_SECONDS, interval=POLL_INTERVAL,
+                 exclude=()):
+        self.directories = [Path(d) for d in directories]
+        self.exclude = [os.path.abspath(d) for d in exclude]
+        self.extensions = {ext.lower() for ext in extensions}
+        self.index = index or ProcessedIndex()
+        self.recursive = recursive
+        self.stable_seconds = stable_seconds
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending_paths = set()
+        self._dir_mtimes = {}
+        self._candidates = {}  # ruta -> (tamaño, mtime_ns, instante del último cambio)
+        self._attempted = {}  # ruta -> [tamaño, mtime_ns] ya entregados
+        self._observer = None
+
+    def start(self):
+        """Escaneo inicial y, si está disponible, suscripción a eventos"""
+        for directory in self.directories:
+            self._scan_directory(directory)
+        if Observer is not None:
+            self._observer = Observer()
+            handler = _ChangeHandler(self)
+            for directory in self.directories:
+                self._observer.schedule(handler, str(directory),
+                                        recursive=self.recursive)
+            self._observer.start()
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+
+    def notify(self, path):
+        """Registra una ruta que cambió (llamado desde watchdog)"""
+        with self._lock:
+            self._pending_paths.add(path)
+
+    def mark_attempted(self, paths):
+        """
+        No volver a entregar estos archivos en esta sesión mientras no
+        cambien (como en ProcessedIndex, cuentan tamaño y mtime)
+        """
+        for path in paths:
+            try:
+                self._attempted[str(path)] = file_signature(os.stat(path))
+            except OSError:
+                pass
+
+    def _excluded(self, path):
+        path = os.path.abspath(path)
+        return any(path == d or path.startswith(d + os.sep) for d in self.exclude)
+
+    def _accepts(self, path):
+        path = Path(path)
+        return (path.suffix.lower() in self.extensions
+                and not path.stem.endswith(OUTPUT_MARKERS)
+                and not self._excluded(path))
+
+    def _consider(self, path, stat=None):
+        """Añade un archivo a candidatos si no está procesado"""
+        if not self._accepts(path) or path in self._candidates:
+            return
+        try:
+            stat = stat or os.stat(path)
+        except OSError:
+            return
+        if self._attempted.get(str(path)) == file_signature(stat):
+            return
+        if not self.index.contains(path, stat):
+            self._candidates[path] = (stat.st_size, stat.st_mtime_ns,
+                                      time.monotonic())
+
+    def _scan_directory(self, directory):
+        """Lista un directorio (y sus subdirectorios si es recursivo)"""
+        try:
+            self._dir_mtimes[str(directory)] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        self._consider(entry.path, entry.stat())
+                    elif entry.is_dir() and self.recursive:
+                        if (entry.path not in self._dir_mtimes
+                                and not self._excluded(entry.path)):
+                            self._scan_directory(entry.path)
+        except OSError:
+            self._dir_mtimes.pop(str(directory), None)
+
+    def _rescan_changed_directories(self):
+        for directory, mtime in list(self._dir_mtimes.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._dir_mtimes.pop(directory, None)
+                continue
+            if current != mtime:
+                self._scan_directory(directory)
+
+    def poll(self):
+        """Un ciclo de detección; devuelve los archivos listos para procesar"""
+        if self._observer is None:
+            self._rescan_changed_directories()
+        with self._lock:
+            pending, self._pending_paths = self._pending_paths, set()
+        for path in pending:
+            self._candidates.pop(path, None)
+            self._consider(path)
+
+        ready = []
+        now = time.monotonic()
+        for path, (size, mtime_ns, changed_at) in list(self._candidates.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._candidates[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                # Aún se está escribiendo
+                self._candidates[path] = (stat.st_size, stat.st_mtime_ns, now)
+            elif now - changed_at >= self.stable_seconds and stat.st_size > 0:
+                del self._candidates[path]
+                ready.append(path)
+        self.mark_attempted(ready)
+        return sorted(ready)
+
+    def watch(self, stop_event=None):
+        """Generador de lotes de archivos listos hasta que `stop_event` se active"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            ready = self.poll()
+            if ready:
+                yield ready
+            stop_event.wait(self.interval)